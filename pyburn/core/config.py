@@ -5,17 +5,41 @@ from typing import Any, Dict
 DEFAULT_CONFIG = {
     "burn_speed": "Auto",
     "verify_after_burn": True,
+    "verify_mode": "full",
+    "verify_samples": 256,
     "temp_dir": str(Path.home() / "PyBurn_Temp"),
     "audio_format": "MP3",
     "audio_bitrate": 320,
+    "rip_workers": 0,
+    "rip_layouts": {},
+    "rip_encoder_cap": 0,
+    "rip_read_offsets": {},
+    "farm_output_dir": str(Path.home() / "Music" / "PyBurn Farm"),
+    "farm_poll_seconds": 2,
+    "audio_workers": 0,
+    "audio_probe_cache": str(Path.home() / ".pyburn_audio_probe.json"),
     "video_format": "MPEG2",
     "default_device": None,
+    "devices": [],
+    "parallel_device_lanes": True,
+    "pipeline_prepare": True,
     "simulate_when_missing_tools": True,
     "auto_blank_rw": True,
     "eject_after_burn": True,
+    "stream_data_burns": False,
+    "stream_audio_burns": False,
+    "embed_checksums": True,
+    "checksum_algorithm": "sha256",
+    "image_cache_enabled": True,
+    "image_cache_max_gb": 20,
+    "backup_manifest_file": str(Path.home() / ".pyburn_backups.sqlite"),
     "history_file": str(Path.home() / ".pyburn_history.json"),
     "logs_dir": str(Path.home() / ".pyburn_logs"),
     "musicbrainz_enabled": True,
+    "musicbrainz_url": "https://musicbrainz.org",
+    "musicbrainz_cache": str(Path.home() / ".pyburn_musicbrainz.json"),
+    "musicbrainz_cache_days": 30,
+    "accuraterip_db": str(Path.home() / ".pyburn_accuraterip.json"),
 }
 class Config:
     def __init__(self, path: Path | None = None):
@@ -37,6 +61,7 @@ class Config:
                 from .devices import DeviceScanner
                 devs = DeviceScanner().scan_devices()
                 self.settings["default_device"] = devs[0].id if devs else "/dev/sr0"
+                self.settings["devices"] = [d.id for d in devs]
             except Exception:
                 self.settings["default_device"] = "/dev/sr0"
         Path(self.settings["temp_dir"]).mkdir(parents=True, exist_ok=True)
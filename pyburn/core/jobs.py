@@ -2,7 +2,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 class JobType(str, Enum):
     DATA = "data"
@@ -10,22 +10,47 @@ class JobType(str, Enum):
     VIDEO_DVD = "video_dvd"
     VIDEO_BD = "video_bd"
     RIP = "rip"
+    VERIFY = "verify"
+RIP_FORMATS = ("MP3", "FLAC", "WAV")
+def rip_formats(fmt: Union[str, List[str], None]) -> List[str]:
+    # "FLAC", "flac + mp3" or ["FLAC", "MP3"] -> ["FLAC", "MP3"]; unknown names are dropped, order kept.
+    names = fmt if isinstance(fmt, (list, tuple)) else str(fmt or "").replace(",", "+").split("+")
+    out: List[str] = []
+    for n in names:
+        n = str(n).strip().upper()
+        if n in RIP_FORMATS and n not in out:
+            out.append(n)
+    return out or ["MP3"]
 @dataclass
 class JobOptions:
     temp_dir: Path
     verify: bool = False
+    verify_mode: str = "full"  # "full" readback, "sampled" random ranges, or "mixed": one copy full, the rest sampled
+    verify_samples: int = 256
     speed: Any = "Auto"
     volume_label: str = "DATA_DISC"
     output_dir: Optional[Path] = None
-    rip_format: str = "MP3"
+    rip_format: Union[str, List[str]] = "MP3"  # or several, e.g. ["FLAC", "MP3"]: one disc read feeds every format
+    rip_layouts: Dict[str, str] = field(default_factory=dict)  # format -> output name template, see backend.RIP_LAYOUT
     rip_bitrate: int = 320
+    rip_workers: int = 0  # encoders running behind the ripping drive; 0 = one per CPU
+    rip_lookup: bool = False  # fetch track titles from MusicBrainz with the rip's TOC when none are given
+    rip_read_offset: int = 0  # the drive's read offset in samples (AccurateRip drive list), passed to cdparanoia -O
     auto_blank: bool = True
     eject_after: bool = True
     dummy: bool = False
+    stream: bool = False
+    copy_devices: List[str] = field(default_factory=list)
+    checksums: Optional[str] = None  # "sha256"/"blake2b": burn a per-file PYBURN_SUMS.TXT
+    backup_set: Optional[str] = None  # incremental backup set name; appends a session with only new/changed files
+    backup_full: bool = False  # start the backup set over on a blank disc
+    span: Optional[Dict[str, Any]] = None  # {"plan": json path, "disc": index, "count": discs, "bytes": disc bytes, "parts": split-file bytes}
     album_title: Optional[str] = None
     album_performer: Optional[str] = None
     track_titles: Optional[List[str]] = None
     track_performers: Optional[List[str]] = None
+    audio_workers: int = 0  # parallel ffmpeg conversions for audio CDs; 0 = one per CPU
+    audio_stream: bool = False  # decode audio straight into cdrdao instead of staging WAVs
 @dataclass
 class Job:
     job_type: JobType
@@ -50,15 +75,30 @@ class Job:
             "created_at": self.created_at,
         }
     @property
+    def devices(self) -> List[str]:
+        out = [self.device]
+        for d in self.options.copy_devices:
+            if d and d not in out:
+                out.append(d)
+        return out
+    @property
     def display_name(self) -> str:
+        copies = f" x{len(self.devices)}" if len(self.devices) > 1 else ""
         if self.job_type == JobType.DATA:
-            return f"Data Burn ({self.options.volume_label})"
+            if self.options.backup_set:
+                kind = "full" if self.options.backup_full else "incremental"
+                return f"Backup {self.options.backup_set} ({kind}){copies}"
+            span = self.options.span
+            part = f" disc {span['disc'] + 1}/{span['count']}" if span else ""
+            return f"Data Burn ({self.options.volume_label}){part}{copies}"
         if self.job_type == JobType.AUDIO:
-            return "Audio CD"
+            return f"Audio CD{copies}"
         if self.job_type == JobType.VIDEO_DVD:
-            return "Video DVD"
+            return f"Video DVD{copies}"
         if self.job_type == JobType.VIDEO_BD:
-            return "Blu-ray (BDMV)"
+            return f"Blu-ray (BDMV){copies}"
         if self.job_type == JobType.RIP:
-            return f"Rip CD ({self.options.rip_format})"
+            return f"Rip CD ({' + '.join(rip_formats(self.options.rip_format))})"
+        if self.job_type == JobType.VERIFY:
+            return "Verify Disc (checksums)"
         return "Job"
\ No newline at end of file
@@ -20,7 +20,6 @@ class ToolFinder:
         "dvd+rw-mediainfo": ["dvd+rw-mediainfo"],
         "dvd+rw-format": ["dvd+rw-format"],
         "eject": ["eject"],
-        "cd-discid": ["cd-discid"],
         "tsMuxeR": ["tsMuxeR", "tsmuxer"],
     }
     def __init__(self):
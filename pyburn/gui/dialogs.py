@@ -1,12 +1,15 @@
 from __future__ import annotations
 from pathlib import Path
+from typing import Dict
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QFormLayout, QLineEdit, QSpinBox, QCheckBox, QPushButton,
-    QDialogButtonBox, QFileDialog, QTextEdit, QWidget, QHBoxLayout, QComboBox, QMessageBox
+    QDialogButtonBox, QFileDialog, QTextEdit, QWidget, QHBoxLayout, QComboBox, QMessageBox,
+    QTreeWidget, QTreeWidgetItem, QLabel
 )
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from ..core.config import Config
 from ..core.devices import DeviceScanner
+from ..services.iso9660 import IsoEntry, open_disc
 class SettingsDialog(QDialog):
     def __init__(self, cfg: Config, parent: QWidget | None = None):
         super().__init__(parent)
@@ -36,18 +39,69 @@ class SettingsDialog(QDialog):
         self.chk_v = QCheckBox("Verify after burn")
         self.chk_v.setChecked(bool(cfg.settings.get("verify_after_burn", True)))
         form.addRow("", self.chk_v)
+        self.cbo_vmode = QComboBox()
+        self.cbo_vmode.addItem("Full readback", "full")
+        self.cbo_vmode.addItem("Sampled (random sectors)", "sampled")
+        self.cbo_vmode.addItem("Copies: first full, rest sampled", "mixed")
+        self.cbo_vmode.setCurrentIndex(max(0, self.cbo_vmode.findData(cfg.settings.get("verify_mode", "full"))))
+        form.addRow("Verify Level:", self.cbo_vmode)
+        self.sp_samples = QSpinBox(); self.sp_samples.setRange(16, 4096); self.sp_samples.setSuffix(" ranges of 64 KiB")
+        self.sp_samples.setValue(int(cfg.settings.get("verify_samples", 256)))
+        form.addRow("Verify Samples:", self.sp_samples)
         self.chk_blank = QCheckBox("Auto-blank RW media")
         self.chk_blank.setChecked(bool(cfg.settings.get("auto_blank_rw", True)))
         form.addRow("", self.chk_blank)
         self.chk_eject = QCheckBox("Eject after burn")
         self.chk_eject.setChecked(bool(cfg.settings.get("eject_after_burn", True)))
         form.addRow("", self.chk_eject)
+        self.chk_lanes = QCheckBox("Run jobs on different devices in parallel")
+        self.chk_lanes.setChecked(bool(cfg.settings.get("parallel_device_lanes", True)))
+        form.addRow("", self.chk_lanes)
+        self.chk_pipe = QCheckBox("Prepare the next job while the drive burns")
+        self.chk_pipe.setChecked(bool(cfg.settings.get("pipeline_prepare", True)))
+        form.addRow("", self.chk_pipe)
+        self.chk_stream = QCheckBox("Stream data burns (no temporary ISO)")
+        self.chk_stream.setChecked(bool(cfg.settings.get("stream_data_burns", False)))
+        form.addRow("", self.chk_stream)
+        self.chk_astream = QCheckBox("Stream audio CD burns (decode straight to cdrdao, no temporary WAVs)")
+        self.chk_astream.setChecked(bool(cfg.settings.get("stream_audio_burns", False)))
+        form.addRow("", self.chk_astream)
+        self.chk_cache = QCheckBox("Cache built images for retries and repeat jobs")
+        self.chk_cache.setChecked(bool(cfg.settings.get("image_cache_enabled", True)))
+        form.addRow("", self.chk_cache)
+        self.sp_cache = QSpinBox(); self.sp_cache.setRange(1, 1000); self.sp_cache.setSuffix(" GB")
+        self.sp_cache.setValue(int(cfg.settings.get("image_cache_max_gb", 20)))
+        form.addRow("Image Cache Limit:", self.sp_cache)
+        self.chk_sums = QCheckBox("Embed per-file checksums on data discs (PYBURN_SUMS.TXT)")
+        self.chk_sums.setChecked(bool(cfg.settings.get("embed_checksums", True)))
+        form.addRow("", self.chk_sums)
+        self.cbo_sums = QComboBox(); self.cbo_sums.addItems(["sha256", "blake2b"])
+        self.cbo_sums.setCurrentText(str(cfg.settings.get("checksum_algorithm", "sha256")))
+        form.addRow("Checksum Algorithm:", self.cbo_sums)
+        self.sp_audio = QSpinBox(); self.sp_audio.setRange(0, 64); self.sp_audio.setSpecialValueText("One per CPU")
+        self.sp_audio.setValue(int(cfg.settings.get("audio_workers", 0)))
+        form.addRow("Parallel Audio Conversions:", self.sp_audio)
+        self.sp_rip = QSpinBox(); self.sp_rip.setRange(0, 64); self.sp_rip.setSpecialValueText("One per CPU")
+        self.sp_rip.setValue(int(cfg.settings.get("rip_workers", 0)))
+        form.addRow("Parallel Rip Encoders:", self.sp_rip)
         self.chk_sim = QCheckBox("Simulate when tools are missing")
         self.chk_sim.setChecked(bool(cfg.settings.get("simulate_when_missing_tools", True)))
         form.addRow("", self.chk_sim)
         self.chk_mb = QCheckBox("Enable MusicBrainz lookup")
         self.chk_mb.setChecked(bool(cfg.settings.get("musicbrainz_enabled", True)))
         form.addRow("", self.chk_mb)
+        self.ed_mb = QLineEdit(str(cfg.settings.get("musicbrainz_url", "https://musicbrainz.org")))
+        form.addRow("MusicBrainz Server:", self.ed_mb)
+        self.ed_ar = QLineEdit(str(cfg.settings.get("accuraterip_db", "")))
+        self.ed_ar.setPlaceholderText("empty: no AccurateRip check")
+        form.addRow("AccurateRip Database:", self.ed_ar)
+        # Read offsets are per drive; the box edits the one for the device selected above.
+        self._offsets: Dict[str, int] = dict(cfg.settings.get("rip_read_offsets") or {})
+        self.sp_offset = QSpinBox(); self.sp_offset.setRange(-3000, 3000); self.sp_offset.setSuffix(" samples")
+        self.sp_offset.valueChanged.connect(self._offset_changed)
+        self.cbo_dev.currentIndexChanged.connect(self._show_offset)
+        self._show_offset()
+        form.addRow("Drive Read Offset:", self.sp_offset)
         lay.addLayout(form)
         bb = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         bb.accepted.connect(self.accept)
@@ -64,6 +118,7 @@ class SettingsDialog(QDialog):
         except Exception:
             devs = []
         self.cbo_dev.clear()
+        self._found = [d.id for d in devs]
         cur = self.cfg.settings.get("default_device", "")
         idx = -1
         for i, d in enumerate(devs):
@@ -72,6 +127,16 @@ class SettingsDialog(QDialog):
                 idx = i
         if idx >= 0:
             self.cbo_dev.setCurrentIndex(idx)
+    def _show_offset(self):
+        dev = self.cbo_dev.currentData()
+        self.sp_offset.blockSignals(True)
+        self.sp_offset.setValue(int(self._offsets.get(dev, 0)) if dev else 0)
+        self.sp_offset.blockSignals(False)
+        self.sp_offset.setEnabled(bool(dev))
+    def _offset_changed(self, value: int):
+        dev = self.cbo_dev.currentData()
+        if dev:
+            self._offsets[dev] = value
     def _choose(self):
         d = QFileDialog.getExistingDirectory(self, "Choose Temporary Directory")
         if d:
@@ -83,6 +148,7 @@ class SettingsDialog(QDialog):
             # Ensure we have a valid device ID and it's not the scanning placeholder
             if device_id is not None and self.cbo_dev.itemText(i) != "Scanning devices...":
                 self.cfg.settings["default_device"] = device_id
+                self.cfg.settings["devices"] = list(getattr(self, "_found", []))
         self.cfg.settings["burn_speed"] = self.spd.currentText()
         temp_path = Path(self.temp.text().strip())
         try:
@@ -96,10 +162,25 @@ class SettingsDialog(QDialog):
             return
         self.cfg.settings["temp_dir"] = str(temp_path)
         self.cfg.settings["verify_after_burn"] = self.chk_v.isChecked()
+        self.cfg.settings["verify_mode"] = self.cbo_vmode.currentData()
+        self.cfg.settings["verify_samples"] = self.sp_samples.value()
         self.cfg.settings["auto_blank_rw"] = self.chk_blank.isChecked()
         self.cfg.settings["eject_after_burn"] = self.chk_eject.isChecked()
+        self.cfg.settings["parallel_device_lanes"] = self.chk_lanes.isChecked()
+        self.cfg.settings["pipeline_prepare"] = self.chk_pipe.isChecked()
+        self.cfg.settings["stream_data_burns"] = self.chk_stream.isChecked()
+        self.cfg.settings["stream_audio_burns"] = self.chk_astream.isChecked()
+        self.cfg.settings["image_cache_enabled"] = self.chk_cache.isChecked()
+        self.cfg.settings["image_cache_max_gb"] = self.sp_cache.value()
+        self.cfg.settings["embed_checksums"] = self.chk_sums.isChecked()
+        self.cfg.settings["checksum_algorithm"] = self.cbo_sums.currentText()
+        self.cfg.settings["audio_workers"] = self.sp_audio.value()
+        self.cfg.settings["rip_workers"] = self.sp_rip.value()
         self.cfg.settings["simulate_when_missing_tools"] = self.chk_sim.isChecked()
         self.cfg.settings["musicbrainz_enabled"] = self.chk_mb.isChecked()
+        self.cfg.settings["musicbrainz_url"] = self.ed_mb.text().strip() or "https://musicbrainz.org"
+        self.cfg.settings["accuraterip_db"] = self.ed_ar.text().strip()
+        self.cfg.settings["rip_read_offsets"] = {d: v for d, v in self._offsets.items() if v}
         self.cfg.save()
         super().accept()
 class LogDialog(QDialog):
@@ -112,4 +193,100 @@ class LogDialog(QDialog):
         self.text.setReadOnly(True)
         lay.addWidget(self.text)
     def append(self, line: str):
-        self.text.append(line)
\ No newline at end of file
+        self.text.append(line)
+class _ReaderThread(QThread):
+    done = pyqtSignal(object, str)
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+    def run(self):
+        try:
+            self.done.emit(self.fn(), "")
+        except Exception as e:
+            self.done.emit(None, str(e))
+class DiscBrowserDialog(QDialog):
+    # Lists a disc or image with the built-in ISO9660/UDF reader; nothing is mounted.
+    def __init__(self, source: str, parent: QWidget | None = None):
+        super().__init__(parent)
+        self.setWindowTitle("Disc Contents")
+        self.resize(760, 520)
+        self.source = source
+        self._thread = None
+        lay = QVBoxLayout(self)
+        self.info = QLabel("")
+        lay.addWidget(self.info)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Name", "Size", "Sector"])
+        self.tree.setColumnWidth(0, 460)
+        lay.addWidget(self.tree)
+        row = QHBoxLayout()
+        b_image = QPushButton("Open Image...")
+        b_image.clicked.connect(self._choose_image)
+        self.b_extract = QPushButton("Extract Selected...")
+        self.b_extract.clicked.connect(self._extract)
+        row.addWidget(b_image)
+        row.addWidget(self.b_extract)
+        lay.addLayout(row)
+        bb = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        bb.rejected.connect(self.reject)
+        lay.addWidget(bb)
+        self._load()
+    def _run(self, fn, done):
+        self._thread = _ReaderThread(fn)
+        self._thread.done.connect(done)
+        self._thread.start()
+    def _load(self):
+        self.tree.clear()
+        self.info.setText(f"Reading {self.source}...")
+        self.b_extract.setEnabled(False)
+        source = self.source
+        def listing():
+            with open_disc(source) as r:
+                return r.volume_id, type(r).__name__, list(r.walk())
+        self._run(listing, self._loaded)
+    def _loaded(self, result, error: str):
+        self.b_extract.setEnabled(True)
+        if error:
+            self.info.setText(f"Cannot read {self.source}: {error}")
+            return
+        volume, kind, entries = result
+        items = {}
+        for e in sorted(entries, key=lambda x: x.path):
+            parent, _, name = e.path.rpartition("/")
+            item = QTreeWidgetItem([name, "" if e.is_dir else f"{e.size:,}", str(e.lba)])
+            item.setData(0, Qt.ItemDataRole.UserRole, e)
+            if parent in items:
+                items[parent].addChild(item)
+            else:
+                self.tree.addTopLevelItem(item)
+            if e.is_dir:
+                items[e.path] = item
+        files = sum(1 for e in entries if not e.is_dir)
+        self.info.setText(f"{volume or '(no label)'} - {kind.replace('Reader', '')} - {files} files, "
+                          f"{len(entries) - files} folders, {sum(e.size for e in entries if not e.is_dir) / 1e6:.1f} MB")
+    def _choose_image(self):
+        f, _ = QFileDialog.getOpenFileName(self, "Open Disc Image", "", "Disc images (*.iso *.img);;All files (*)")
+        if f:
+            self.source = f
+            self._load()
+    def _extract(self):
+        item = self.tree.currentItem()
+        entry: IsoEntry | None = item.data(0, Qt.ItemDataRole.UserRole) if item else None
+        if entry is None or entry.is_dir:
+            QMessageBox.information(self, "Extract", "Select a file to extract.")
+            return
+        out, _ = QFileDialog.getSaveFileName(self, "Extract File", entry.path.rsplit("/", 1)[-1])
+        if not out:
+            return
+        source = self.source
+        def copy():
+            with open_disc(source) as r, open(out, "wb") as f:
+                for chunk in r.iter_file(entry):
+                    f.write(chunk)
+            return out
+        self.b_extract.setEnabled(False)
+        self.info.setText(f"Extracting {entry.path}...")
+        def done(_, error: str):
+            self.b_extract.setEnabled(True)
+            self.info.setText(f"Extract failed: {error}" if error else f"Extracted {entry.path} to {out}")
+        self._run(copy, done)
\ No newline at end of file
@@ -7,7 +7,7 @@ from ..core.config import Config
 from ..core.tools import ToolFinder
 from ..services.queue import JobQueueService
 from .dialogs import SettingsDialog, LogDialog
-from .tabs import DataBurnTab, AudioCDTab, VideoDVDTab, VideoBDTab, RipCDTab
+from .tabs import DataBurnTab, AudioCDTab, VideoDVDTab, VideoBDTab, RipCDTab, RipFarmTab
 from .widgets import JobQueueWidget, HistoryWidget
 from pyburn import __version__
 class MainWindow(QMainWindow):
@@ -37,6 +37,7 @@ class MainWindow(QMainWindow):
         tabs.addTab(VideoDVDTab(self.cfg, self.tools, self.queue), "Video DVD")
         tabs.addTab(VideoBDTab(self.cfg, self.tools, self.queue), "Blu-ray")
         tabs.addTab(RipCDTab(self.cfg, self.tools, self.queue), "Rip CD")
+        tabs.addTab(RipFarmTab(self.cfg, self.tools, self.queue), "Rip Farm")
         splitter.addWidget(tabs)
         queue_panel = QTabWidget()
         queue_panel.addTab(JobQueueWidget(self.queue), "Queue")
@@ -1,22 +1,30 @@
 from __future__ import annotations
 import re
 import shutil
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QProgressBar, QFileDialog,
-    QMessageBox, QGroupBox, QFormLayout, QComboBox, QCheckBox, QLineEdit, QProgressDialog
+    QMessageBox, QGroupBox, QFormLayout, QComboBox, QCheckBox, QLineEdit, QProgressDialog,
+    QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
 from ..core.config import Config
-from ..core.jobs import Job, JobOptions, JobType
+from ..core.jobs import Job, JobOptions, JobType, rip_formats
 from ..core.tools import ToolFinder
-from .widgets import FileListWidget, CapacityGauge, compute_total_size
+from .widgets import FileListWidget, CapacityGauge, DurationGauge
+from .dialogs import DiscBrowserDialog
 from ..services.queue import JobQueueService
-from ..services.metadata import musicbrainz_lookup
+from ..services.accuraterip import checksum_db
+from ..services.farm import CD_RATE, RipFarm
+from ..services.metadata import musicbrainz_client, musicbrainz_lookup
 from ..services.media import MediaTools
 from ..services.exec import ProcessRunner
+from ..services.isosize import SECTOR
+from ..services.audioinfo import DurationIndex, msf, probe_cache, staged_bytes
+from ..services.span import INDEX_NAME, plan_span
 CD_BYTES = 737_280_000
 DVD_BYTES = 4_700_000_000
 BD25_BYTES = 25_000_000_000
@@ -26,6 +34,27 @@ def disk_free_bytes(path: Path) -> int:
         return usage.free
     except Exception:
         return 0
+class _PlanThread(QThread):
+    # Plans a disc set off the GUI thread; cancel() stops plan_span at its next check and drops the result.
+    finished_data = pyqtSignal(object)
+    def __init__(self, trees, sectors: int):
+        super().__init__()
+        self.trees = trees
+        self.sectors = sectors
+        self.cancelled = False
+    def cancel(self):
+        self.cancelled = True
+    def run(self):
+        try:
+            result = plan_span(self.trees, self.sectors, cancelled=lambda: self.cancelled)
+        except RuntimeError:
+            if not self.cancelled:
+                raise
+            return
+        except (ValueError, OSError) as e:
+            result = e
+        if not self.cancelled:
+            self.finished_data.emit(result)
 class BaseTab(QWidget):
     def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
         super().__init__()
@@ -34,10 +63,28 @@ class BaseTab(QWidget):
         self.queue = queue
         self.progress = QProgressBar()
         self.status = QLabel("Ready.")
+        self.cbo_device = QComboBox(); self.cbo_device.setEditable(True)
+        default = self.cfg.settings.get("default_device", "/dev/sr0")
+        for dev in [default] + [d for d in self.cfg.settings.get("devices", []) if d != default]:
+            self.cbo_device.addItem(dev)
+        self.ed_copies = QLineEdit(); self.ed_copies.setPlaceholderText("Extra drives for identical copies, e.g. /dev/sr1, /dev/sr2")
+        self._last_job_id: str = ""
         self.queue.sig_status_update.connect(self._status_update)
+    def _device(self) -> str:
+        return self.cbo_device.currentText().strip() or self.cfg.settings.get("default_device", "/dev/sr0")
+    def _copy_devices(self) -> List[str]:
+        main = self._device()
+        out: List[str] = []
+        for d in re.split(r"[,\s]+", self.ed_copies.text().strip()):
+            if d and d != main and d not in out:
+                out.append(d)
+        return out
+    def _enqueue(self, job: Job):
+        self._last_job_id = job.id
+        self.queue.enqueue(job)
+        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
     def _status_update(self, job_id: str, status: str, progress: int):
-        jobs = self.queue.get_list()
-        if jobs and jobs[0].id == job_id:
+        if job_id == self._last_job_id:
             if not status.startswith("LOG:"):
                 self.status.setText(status)
             self.progress.setValue(progress)
@@ -47,7 +94,7 @@ class DataBurnTab(BaseTab):
         lay = QVBoxLayout(self)
         title = QLabel("Burn Data Disc"); title.setFont(QFont("Arial", 14, QFont.Weight.Bold))
         lay.addWidget(title)
-        self.list = FileListWidget(allow_dirs=True)
+        self.list = FileListWidget(allow_dirs=True, estimate_image=True)
         lay.addWidget(QLabel("Files/Folders (drag & drop):"))
         lay.addWidget(self.list)
         row = QHBoxLayout()
@@ -63,22 +110,37 @@ class DataBurnTab(BaseTab):
         self.chk_blank = QCheckBox("Auto-blank RW media"); self.chk_blank.setChecked(bool(self.cfg.settings.get("auto_blank_rw", True)))
         self.chk_eject = QCheckBox("Eject after burn"); self.chk_eject.setChecked(bool(self.cfg.settings.get("eject_after_burn", True)))
         self.chk_dummy = QCheckBox("Dummy burn (cdrecord)"); self.chk_dummy.setChecked(False)
+        self.chk_stream = QCheckBox("Stream image to burner (no temp ISO)"); self.chk_stream.setChecked(bool(self.cfg.settings.get("stream_data_burns", False)))
         self.cbo_type = QComboBox(); self.cbo_type.addItems(["CD (700MB)", "DVD (4.7GB)", "Blu-ray (25GB)"])
+        self.chk_sums = QCheckBox("Embed per-file checksums (PYBURN_SUMS.TXT)"); self.chk_sums.setChecked(bool(self.cfg.settings.get("embed_checksums", True)))
+        self.ed_backup = QLineEdit(); self.ed_backup.setPlaceholderText("Set name, e.g. nightly-photos: append only new/changed files")
+        self.chk_full = QCheckBox("Start the backup set over on a blank disc (full)")
+        form.addRow("Device:", self.cbo_device)
+        form.addRow("Also burn on:", self.ed_copies)
         form.addRow("Volume Label:", self.ed_vol); form.addRow("Disc Type:", self.cbo_type)
         form.addRow("", self.chk_verify); form.addRow("", self.chk_blank); form.addRow("", self.chk_eject); form.addRow("", self.chk_dummy)
+        form.addRow("", self.chk_stream); form.addRow("", self.chk_sums)
+        form.addRow("Incremental backup:", self.ed_backup); form.addRow("", self.chk_full)
         opts.setLayout(form)
         lay.addWidget(opts)
         self.gauge = CapacityGauge(DVD_BYTES); lay.addWidget(self.gauge)
         self.btn = QPushButton("Queue Job: Burn Data Disc"); self.btn.clicked.connect(self._start)
-        lay.addWidget(self.btn); lay.addWidget(self.progress); lay.addWidget(self.status)
-        self.list.files_changed.connect(self._refresh)
-        self.cbo_type.currentIndexChanged.connect(lambda: self._refresh(self.list.get_file_list()))
-        self._refresh(self.list.get_file_list())
+        self.btn_verify = QPushButton("Queue Job: Verify Disc Against Its Checksums"); self.btn_verify.clicked.connect(self._verify_disc)
+        self.btn_browse = QPushButton("Browse Disc Contents..."); self.btn_browse.clicked.connect(self._browse_disc)
+        lay.addWidget(self.btn); lay.addWidget(self.btn_verify); lay.addWidget(self.btn_browse); lay.addWidget(self.progress); lay.addWidget(self.status)
+        self.list.index.sig_size.connect(self._on_size)
+        self.cbo_type.currentIndexChanged.connect(lambda: self._refresh())
+        self._refresh()
     def _capacity(self) -> int:
         return [CD_BYTES, DVD_BYTES, BD25_BYTES][self.cbo_type.currentIndex()]
-    def _refresh(self, files: List[str]):
+    def _refresh(self):
+        self.gauge.max_capacity = self._capacity()
+        self.gauge.update_size(self.gauge.current_size, scanning=not self.list.index.done)
+    def _on_size(self, raw: int, image, done: bool):
+        # Raw bytes stream in while scanning; once settled the exact -J -R image size
+        # (sector rounding, directories, path tables) replaces them.
         self.gauge.max_capacity = self._capacity()
-        self.gauge.update_size(compute_total_size(files))
+        self.gauge.update_size(image if image is not None else raw, scanning=not done)
     def _add_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Files")
         for f in files: self.list.add_path(f)
@@ -88,7 +150,6 @@ class DataBurnTab(BaseTab):
     def _rm(self):
         for it in self.list.selectedItems():
             self.list.takeItem(self.list.row(it))
-        self._refresh(self.list.get_file_list())
     def _warn_oversized_media(self, data_bytes: int, cap_bytes: int) -> bool:
         if data_bytes > 0 and cap_bytes >= 10 * data_bytes:
             r = QMessageBox.question(self, "Small Data on Large Media",
@@ -119,42 +180,114 @@ class DataBurnTab(BaseTab):
         if not files:
             QMessageBox.warning(self, "No Files", "Add files or folders.")
             return
-        if self.gauge.current_size > self.gauge.max_capacity:
-            r = QMessageBox.question(self, "Over Capacity", "Content exceeds disc capacity. Continue?",
-                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-            if r != QMessageBox.StandardButton.Yes: return
-        if not self._warn_oversized_media(self.gauge.current_size, self._capacity()):
+        if not self.list.index.done:
+            QMessageBox.information(self, "Sizing", "Still measuring the selection. Try again in a moment.")
             return
-        device = self.cfg.settings.get("default_device", "/dev/sr0")
-        if not self._confirm_blank_if_needed(device):
+        backup_set = self.ed_backup.text().strip() or None
+        split = False
+        if not backup_set and self.gauge.current_size > self.gauge.max_capacity:
+            r = QMessageBox.question(self, "Over Capacity",
+                                     "Content exceeds disc capacity.\n\n"
+                                     "Yes: split it across several discs\nNo: burn it as one disc anyway",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+            if r == QMessageBox.StandardButton.Cancel: return
+            split = r == QMessageBox.StandardButton.Yes
+        if not split and not backup_set and not self._warn_oversized_media(self.gauge.current_size, self._capacity()):
+            return
+        device = self._device()
+        appending = backup_set and not self.chk_full.isChecked()  # appended sessions never blank the disc
+        if not appending and not self._confirm_blank_if_needed(device):
             QMessageBox.information(self, "Cancelled", "Blanking cancelled. Job not queued.")
             return
         temp_dir = Path(self.cfg.settings["temp_dir"])
+        if split:
+            self._start_span(files, device, temp_dir)
+            return
         needed = max(1, self.gauge.current_size)
         free = disk_free_bytes(temp_dir)
-        # Data burns: 1.2x
+        # Data burns: 1.2x (streamed burns never touch temp_dir)
         multiplier = 1.2
-        if free < needed * multiplier:
+        if not self.chk_stream.isChecked() and not backup_set and free < needed * multiplier:
             r = QMessageBox.question(self, "Low Temp Space",
                                      f"Estimated ISO need ~ {needed*multiplier/1e9:.1f} GB; free ~ {free/1e9:.1f} GB.\nContinue?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if r != QMessageBox.StandardButton.Yes:
                 return
-        job = Job(
+        self._enqueue(self._job(files, device, temp_dir, self.ed_vol.text().strip() or "DATA_DISC"))
+    def _job(self, files: List[str], device: str, temp_dir: Path, volume: str, span=None) -> Job:
+        return Job(
             job_type=JobType.DATA,
             files=[Path(p) for p in files],
             device=device,
             options=JobOptions(
                 temp_dir=temp_dir, verify=self.chk_verify.isChecked(),
+                verify_mode=self.cfg.settings.get("verify_mode", "full"),
+                verify_samples=int(self.cfg.settings.get("verify_samples", 256)),
                 speed=self.cfg.settings.get("burn_speed", "Auto"),
-                volume_label=self.ed_vol.text().strip() or "DATA_DISC",
+                volume_label=volume,
                 auto_blank=self.chk_blank.isChecked(),
                 eject_after=self.chk_eject.isChecked(),
                 dummy=self.chk_dummy.isChecked(),
+                stream=self.chk_stream.isChecked(),
+                copy_devices=self._copy_devices(),
+                checksums=self.cfg.settings.get("checksum_algorithm", "sha256") if self.chk_sums.isChecked() else None,
+                backup_set=None if span else (self.ed_backup.text().strip() or None),
+                backup_full=self.chk_full.isChecked(),
+                span=span,
             ),
         )
-        self.queue.enqueue(job)
-        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
+    def _verify_disc(self):
+        # Works on any disc burned with embedded checksums; the source files are not needed.
+        job = Job(
+            job_type=JobType.VERIFY,
+            files=[],
+            device=self._device(),
+            options=JobOptions(temp_dir=Path(self.cfg.settings["temp_dir"]), eject_after=self.chk_eject.isChecked()),
+        )
+        self._enqueue(job)
+    def _browse_disc(self):
+        DiscBrowserDialog(self._device(), self).exec()
+    def _start_span(self, files: List[str], device: str, temp_dir: Path):
+        # Plans the set on a thread from the trees the size index already holds
+        # (their subtree costs were filled in by the gauge estimate), then queues one job per disc.
+        progress = QProgressDialog("Planning the disc set...", "Cancel", 0, 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        th = _PlanThread(self.list.index.trees(), self._capacity() // SECTOR)
+        def done(plan):
+            progress.close()
+            if isinstance(plan, Exception):
+                QMessageBox.warning(self, "Cannot Split", str(plan))
+                return
+            self._queue_span(plan, files, device, temp_dir)
+        th.finished_data.connect(done)
+        progress.canceled.connect(th.cancel)
+        progress.show()
+        th.start()
+        self._plan_thread = th  # hold ref
+    def _queue_span(self, plan, files: List[str], device: str, temp_dir: Path):
+        n = len(plan.discs)
+        parts = sum(len(d.chunks) for d in plan.discs)
+        note = f"\n{parts} part(s) of files too large for one disc will be cut into temp space." if parts else ""
+        r = QMessageBox.question(self, "Split Across Discs",
+                                 f"The selection needs {n} discs.{note}\n"
+                                 f"An index ({INDEX_NAME}) listing where every file went is written to each disc.\n\nQueue {n} burns?",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if r != QMessageBox.StandardButton.Yes:
+            return
+        base = self.ed_vol.text().strip() or "DATA_DISC"
+        set_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        try:
+            plan_path = plan.save(temp_dir / "pyburn_span", set_id, base)
+        except OSError as e:
+            QMessageBox.warning(self, "Cannot Split", f"Could not save the disc plan: {e}")
+            return
+        for i, disc in enumerate(plan.discs):
+            span = {"plan": str(plan_path), "disc": i, "count": n, "bytes": disc.bytes, "parts": disc.part_bytes}
+            job = self._job(files, device, temp_dir, f"{base[:29]}_{i + 1:02d}", span)
+            if i == 0:
+                self._last_job_id = job.id
+            self.queue.enqueue(job)
+        QMessageBox.information(self, "Queued", f"Enqueued {n} discs of {base}. Insert a new blank disc when asked.")
 class AudioCDTab(BaseTab):
     def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
         super().__init__(cfg, tools, queue)
@@ -175,14 +308,23 @@ class AudioCDTab(BaseTab):
         cdtext = QGroupBox("CD-Text"); form = QFormLayout()
         self.ed_album = QLineEdit(""); self.ed_artist = QLineEdit("")
         form.addRow("Album Title:", self.ed_album); form.addRow("Album Artist:", self.ed_artist); cdtext.setLayout(form)
+        dev_row = QHBoxLayout(); dev_row.addWidget(QLabel("Device:")); dev_row.addWidget(self.cbo_device, 1); lay.addLayout(dev_row)
+        copy_row = QHBoxLayout(); copy_row.addWidget(QLabel("Also burn on:")); copy_row.addWidget(self.ed_copies, 1); lay.addLayout(copy_row)
         lay.addWidget(cdtext)
         self.btn_guess = QPushButton("Guess Track Titles From Filenames"); self.btn_guess.clicked.connect(self._guess_titles); lay.addWidget(self.btn_guess)
-        self.gauge = CapacityGauge(CD_BYTES); lay.addWidget(self.gauge)
+        media_row = QHBoxLayout(); media_row.addWidget(QLabel("Media:"))
+        self.cbo_media = QComboBox(); self.cbo_media.addItems(["CD-R 80 min", "CD-R 74 min"])
+        self.cbo_media.currentIndexChanged.connect(lambda i: self.gauge.set_minutes(74 if i == 1 else 80))
+        media_row.addWidget(self.cbo_media, 1); lay.addLayout(media_row)
+        self.gauge = DurationGauge(80); lay.addWidget(self.gauge)
         self.chk_eject = QCheckBox("Eject after burn"); self.chk_eject.setChecked(bool(self.cfg.settings.get("eject_after_burn", True))); lay.addWidget(self.chk_eject)
+        self.chk_stream = QCheckBox("Stream decoded audio to burner (no temp WAVs)"); self.chk_stream.setChecked(bool(self.cfg.settings.get("stream_audio_burns", False))); lay.addWidget(self.chk_stream)
         self.btn = QPushButton("Queue Job: Create Audio CD"); self.btn.clicked.connect(self._start)
         lay.addWidget(self.btn); lay.addWidget(self.progress); lay.addWidget(self.status)
-        self.list.files_changed.connect(self._refresh)
-        self._refresh(self.list.get_file_list())
+        # Durations are probed in the background and cached across sessions.
+        self.durations = DurationIndex(self.tools.find("ffprobe"), probe_cache(self.cfg.settings.get("audio_probe_cache")))
+        self.durations.sig_frames.connect(self._on_frames)
+        self.list.files_changed.connect(self.durations.set_paths)
         self.track_titles: List[str] = []
     def _move_up(self):
         row = self.list.currentRow()
@@ -207,15 +349,14 @@ class AudioCDTab(BaseTab):
             self.track_titles = []
         else:
             QMessageBox.information(self, "CD-Text", f"Generated {len(self.track_titles)} track titles.")
-    def _refresh(self, files: List[str]):
-        self.gauge.update_size(compute_total_size(files))
+    def _on_frames(self, frames: int, unknown: int, done: bool):
+        self.gauge.update_frames(frames, unknown, scanning=not done)
     def _add(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Audio Files", "", "Audio (*.mp3 *.wav *.flac *.ogg *.m4a *.aac)")
         for f in files: self.list.add_path(f)
     def _rm(self):
         for it in self.list.selectedItems():
             self.list.takeItem(self.list.row(it))
-        self._refresh(self.list.get_file_list())
     def _start(self):
         cnt = self.list.count()
         if cnt == 0:
@@ -224,11 +365,18 @@ class AudioCDTab(BaseTab):
         if self.track_titles and len(self.track_titles) != cnt:
             QMessageBox.warning(self, "CD-Text", "Track titles count does not match number of files.")
             return
+        if self.gauge.frames > self.gauge.max_frames:
+            r = QMessageBox.question(self, "Too Long",
+                                     f"The tracks play for {msf(self.gauge.frames)}, longer than {msf(self.gauge.max_frames)} "
+                                     f"on {self.cbo_media.currentText()}.\nThe burn will fail unless the disc allows overburning. Continue?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if r != QMessageBox.StandardButton.Yes:
+                return
         temp_dir = Path(self.cfg.settings["temp_dir"])
-        needed = max(1, self.gauge.current_size)
+        needed = staged_bytes(self.list.get_file_list())  # CD-DA WAVs are linked, not copied
         free = disk_free_bytes(temp_dir)
-        # Audio conversion slack ~1.5x
-        if free < needed * 1.5:
+        # Converted WAVs plus slack ~1.5x (streamed burns only stage the TOC)
+        if not self.chk_stream.isChecked() and needed and free < needed * 1.5:
             r = QMessageBox.question(self, "Low Temp Space",
                                      "Audio conversion may need extra temp space.\nContinue?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -237,7 +385,7 @@ class AudioCDTab(BaseTab):
         job = Job(
             job_type=JobType.AUDIO,
             files=[Path(self.list.item(i).text()) for i in range(cnt)],
-            device=self.cfg.settings.get("default_device", "/dev/sr0"),
+            device=self._device(),
             options=JobOptions(
                 temp_dir=temp_dir,
                 speed=self.cfg.settings.get("burn_speed", "Auto"),
@@ -245,10 +393,12 @@ class AudioCDTab(BaseTab):
                 album_title=self.ed_album.text().strip() or None,
                 album_performer=self.ed_artist.text().strip() or None,
                 track_titles=self.track_titles if self.track_titles else None,
+                copy_devices=self._copy_devices(),
+                audio_workers=int(self.cfg.settings.get("audio_workers", 0)),
+                audio_stream=self.chk_stream.isChecked(),
             ),
         )
-        self.queue.enqueue(job)
-        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
+        self._enqueue(job)
 class VideoDVDTab(BaseTab):
     def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
         super().__init__(cfg, tools, queue)
@@ -261,13 +411,14 @@ class VideoDVDTab(BaseTab):
         self.gauge = CapacityGauge(DVD_BYTES); lay.addWidget(self.gauge)
         self.chk_blank = QCheckBox("Auto-blank RW media"); self.chk_blank.setChecked(bool(self.cfg.settings.get("auto_blank_rw", True)))
         self.chk_eject = QCheckBox("Eject after burn"); self.chk_eject.setChecked(bool(self.cfg.settings.get("eject_after_burn", True)))
+        dev_row = QHBoxLayout(); dev_row.addWidget(QLabel("Device:")); dev_row.addWidget(self.cbo_device, 1); lay.addLayout(dev_row)
+        copy_row = QHBoxLayout(); copy_row.addWidget(QLabel("Also burn on:")); copy_row.addWidget(self.ed_copies, 1); lay.addLayout(copy_row)
         lay.addWidget(self.chk_blank); lay.addWidget(self.chk_eject)
         self.btn = QPushButton("Queue Job: Create Video DVD"); self.btn.clicked.connect(self._start)
         lay.addWidget(self.btn); lay.addWidget(self.progress); lay.addWidget(self.status)
-        self.list.files_changed.connect(self._refresh)
-        self._refresh(self.list.get_file_list())
-    def _refresh(self, files: List[str]):
-        self.gauge.update_size(compute_total_size(files))
+        self.list.index.sig_size.connect(self._on_size)
+    def _on_size(self, raw: int, image, done: bool):
+        self.gauge.update_size(raw, scanning=not done)
     def _confirm_blank_if_needed(self, device: str) -> bool:
         if not self.chk_blank.isChecked():
             return True
@@ -290,12 +441,11 @@ class VideoDVDTab(BaseTab):
     def _rm(self):
         for it in self.list.selectedItems():
             self.list.takeItem(self.list.row(it))
-        self._refresh(self.list.get_file_list())
     def _start(self):
         if self.list.count() == 0:
             QMessageBox.warning(self, "No Files", "Add video files.")
             return
-        device = self.cfg.settings.get("default_device", "/dev/sr0")
+        device = self._device()
         if not self._confirm_blank_if_needed(device):
             QMessageBox.information(self, "Cancelled", "Blanking cancelled. Job not queued.")
             return
@@ -314,10 +464,10 @@ class VideoDVDTab(BaseTab):
             files=[Path(self.list.item(i).text()) for i in range(self.list.count())],
             device=device,
             options=JobOptions(temp_dir=temp_dir, speed=self.cfg.settings.get("burn_speed", "Auto"),
-                               auto_blank=self.chk_blank.isChecked(), eject_after=self.chk_eject.isChecked()),
+                               auto_blank=self.chk_blank.isChecked(), eject_after=self.chk_eject.isChecked(),
+                               copy_devices=self._copy_devices()),
         )
-        self.queue.enqueue(job)
-        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
+        self._enqueue(job)
 class VideoBDTab(BaseTab):
     def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
         super().__init__(cfg, tools, queue)
@@ -330,13 +480,14 @@ class VideoBDTab(BaseTab):
         self.gauge = CapacityGauge(BD25_BYTES); lay.addWidget(self.gauge)
         self.chk_blank = QCheckBox("Auto-blank RW media"); self.chk_blank.setChecked(bool(self.cfg.settings.get("auto_blank_rw", True)))
         self.chk_eject = QCheckBox("Eject after burn"); self.chk_eject.setChecked(bool(self.cfg.settings.get("eject_after_burn", True)))
+        dev_row = QHBoxLayout(); dev_row.addWidget(QLabel("Device:")); dev_row.addWidget(self.cbo_device, 1); lay.addLayout(dev_row)
+        copy_row = QHBoxLayout(); copy_row.addWidget(QLabel("Also burn on:")); copy_row.addWidget(self.ed_copies, 1); lay.addLayout(copy_row)
         lay.addWidget(self.chk_blank); lay.addWidget(self.chk_eject)
         self.btn = QPushButton("Queue Job: Create Blu-ray"); self.btn.clicked.connect(self._start)
         lay.addWidget(self.btn); lay.addWidget(self.progress); lay.addWidget(self.status)
-        self.list.files_changed.connect(self._refresh)
-        self._refresh(self.list.get_file_list())
-    def _refresh(self, files: List[str]):
-        self.gauge.update_size(compute_total_size(files))
+        self.list.index.sig_size.connect(self._on_size)
+    def _on_size(self, raw: int, image, done: bool):
+        self.gauge.update_size(raw, scanning=not done)
     def _confirm_blank_if_needed(self, device: str) -> bool:
         if not self.chk_blank.isChecked():
             return True
@@ -359,12 +510,11 @@ class VideoBDTab(BaseTab):
     def _rm(self):
         for it in self.list.selectedItems():
             self.list.takeItem(self.list.row(it))
-        self._refresh(self.list.get_file_list())
     def _start(self):
         if self.list.count() == 0:
             QMessageBox.warning(self, "No Files", "Add video files.")
             return
-        device = self.cfg.settings.get("default_device", "/dev/sr0")
+        device = self._device()
         if not self._confirm_blank_if_needed(device):
             QMessageBox.information(self, "Cancelled", "Blanking cancelled. Job not queued.")
             return
@@ -381,10 +531,10 @@ class VideoBDTab(BaseTab):
             files=[Path(self.list.item(i).text()) for i in range(self.list.count())],
             device=device,
             options=JobOptions(temp_dir=temp_dir, speed=self.cfg.settings.get("burn_speed", "Auto"),
-                               auto_blank=self.chk_blank.isChecked(), eject_after=self.chk_eject.isChecked()),
+                               auto_blank=self.chk_blank.isChecked(), eject_after=self.chk_eject.isChecked(),
+                               copy_devices=self._copy_devices()),
         )
-        self.queue.enqueue(job)
-        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
+        self._enqueue(job)
 class RipCDTab(BaseTab):
     def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
         super().__init__(cfg, tools, queue)
@@ -392,15 +542,16 @@ class RipCDTab(BaseTab):
         lay = QVBoxLayout(self)
         title = QLabel("Rip Audio CD"); title.setFont(QFont("Arial", 14, QFont.Weight.Bold)); lay.addWidget(title)
         opts = QGroupBox("Rip Options"); form = QFormLayout()
-        self.cbo_fmt = QComboBox(); self.cbo_fmt.addItems(["MP3", "FLAC", "WAV"])
+        self.cbo_fmt = QComboBox(); self.cbo_fmt.addItems(["MP3", "FLAC", "WAV", "FLAC + MP3", "FLAC + MP3 + WAV"])
         self.cbo_fmt.setCurrentText(str(self.cfg.settings.get("audio_format", "MP3")))
         self.sp_bitrate = QSpinBox(); self.sp_bitrate.setRange(128, 320); self.sp_bitrate.setValue(int(self.cfg.settings.get("audio_bitrate", 320)))
         self.ed_out = QLineEdit(str(Path.home() / "Music")); self.ed_out.setReadOnly(True)
         b_out = QPushButton("Browse"); b_out.clicked.connect(self._choose)
         row = QHBoxLayout(); row.addWidget(self.ed_out); row.addWidget(b_out)
-        form.addRow("Format:", self.cbo_fmt); form.addRow("MP3 Bitrate:", self.sp_bitrate); form.addRow("Output:", row)
+        form.addRow("Device:", self.cbo_device); form.addRow("Format:", self.cbo_fmt); form.addRow("MP3 Bitrate:", self.sp_bitrate); form.addRow("Output:", row)
         opts.setLayout(form); lay.addWidget(opts)
         self.btn_mb = QPushButton("Lookup Metadata (MusicBrainz)"); self.btn_mb.clicked.connect(self._lookup_mb); lay.addWidget(self.btn_mb)
+        self.btn_ar = QPushButton("Import AccurateRip Checksums..."); self.btn_ar.clicked.connect(self._import_ar); lay.addWidget(self.btn_ar)
         self.btn = QPushButton("Queue Job: Rip CD"); self.btn.clicked.connect(self._start)
         lay.addWidget(self.btn); lay.addWidget(self.progress); lay.addWidget(self.status); lay.addStretch(1)
         self.track_titles: List[str] = []
@@ -414,17 +565,16 @@ class RipCDTab(BaseTab):
         progress = QProgressDialog("Looking up CD metadata...", "Cancel", 0, 0, self)
         progress.setWindowModality(Qt.WindowModality.WindowModal)
         progress.show()
+        client = musicbrainz_client(self.cfg.settings.get("musicbrainz_url"), self.cfg.settings.get("musicbrainz_cache"),
+                                    float(self.cfg.settings.get("musicbrainz_cache_days", 30)))
         class MBThread(QThread):
             finished_data = pyqtSignal(object)
             def __init__(self, tools: ToolFinder, device: str):
                 super().__init__()
                 self.tools = tools; self.device = device
             def run(self):
-                try:
-                    from ..services.metadata import musicbrainz_lookup as mb
-                except Exception:
-                    mb = musicbrainz_lookup
-                result = musicbrainz_lookup(self.tools, self.device)
+                # Cached discs (found or not) answer without touching the network.
+                result = musicbrainz_lookup(self.tools, self.device, client=client)
                 self.finished_data.emit(result)
         def done(md):
             progress.close()
@@ -433,23 +583,103 @@ class RipCDTab(BaseTab):
                 return
             self.track_titles = md.get("tracks") or []
             QMessageBox.information(self, "MusicBrainz", f"Found {len(self.track_titles)} track titles.")
-        th = MBThread(self.tools, self.cfg.settings.get("default_device", "/dev/sr0"))
+        th = MBThread(self.tools, self._device())
         th.finished_data.connect(done)
         th.start()
         self._mb_thread = th  # hold ref
+    def _import_ar(self):
+        # dBAR-*.bin responses (or another checksum database) that rips are checked against offline.
+        path = self.cfg.settings.get("accuraterip_db")
+        if not path:
+            QMessageBox.information(self, "AccurateRip", "No checksum database file is configured.")
+            return
+        files, _ = QFileDialog.getOpenFileNames(self, "Select AccurateRip Data", "", "AccurateRip (*.bin *.json)")
+        if not files:
+            return
+        db = checksum_db(Path(path))
+        added = 0
+        for f in files:
+            try:
+                added += db.import_file(Path(f))
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "AccurateRip", f"Could not import {f}: {e}")
+        QMessageBox.information(self, "AccurateRip", f"Imported {added} new disc responses into {path}.")
     def _start(self):
         out = Path(self.ed_out.text())
         job = Job(
             job_type=JobType.RIP,
             files=[],
-            device=self.cfg.settings.get("default_device", "/dev/sr0"),
+            device=self._device(),
             options=JobOptions(
                 temp_dir=Path(self.cfg.settings["temp_dir"]),
                 output_dir=out,
-                rip_format=self.cbo_fmt.currentText(),
+                rip_format=rip_formats(self.cbo_fmt.currentText()),
+                rip_layouts=dict(self.cfg.settings.get("rip_layouts") or {}),
                 rip_bitrate=self.sp_bitrate.value(),
+                rip_workers=int(self.cfg.settings.get("rip_workers", 0)),
+                rip_lookup=not self.track_titles and bool(self.cfg.settings.get("musicbrainz_enabled", True)),
+                rip_read_offset=int((self.cfg.settings.get("rip_read_offsets") or {}).get(self._device(), 0)),
                 track_titles=self.track_titles if self.track_titles else None,
             ),
         )
-        self.queue.enqueue(job)
-        QMessageBox.information(self, "Queued", f"Enqueued: {job.display_name}")
\ No newline at end of file
+        self._enqueue(job)
+class RipFarmTab(BaseTab):
+    # Watches every drive and rips each audio CD put in; see services/farm.py.
+    def __init__(self, cfg: Config, tools: ToolFinder, queue: JobQueueService):
+        super().__init__(cfg, tools, queue)
+        lay = QVBoxLayout(self)
+        title = QLabel("Rip Farm"); title.setFont(QFont("Arial", 14, QFont.Weight.Bold)); lay.addWidget(title)
+        lay.addWidget(QLabel("Every drive is watched; an audio CD is ripped as soon as it is inserted and ejected when done."))
+        opts = QGroupBox("Farm Options"); form = QFormLayout()
+        self.cbo_fmt = QComboBox(); self.cbo_fmt.addItems(["FLAC", "MP3", "WAV", "FLAC + MP3", "FLAC + MP3 + WAV"])
+        self.sp_bitrate = QSpinBox(); self.sp_bitrate.setRange(128, 320); self.sp_bitrate.setValue(int(self.cfg.settings.get("audio_bitrate", 320)))
+        self.sp_cap = QSpinBox(); self.sp_cap.setRange(0, 64); self.sp_cap.setValue(int(self.cfg.settings.get("rip_encoder_cap", 0)))
+        self.sp_cap.setSpecialValueText("One per CPU")
+        self.ed_out = QLineEdit(str(self.cfg.settings.get("farm_output_dir") or Path.home() / "Music")); self.ed_out.setReadOnly(True)
+        b_out = QPushButton("Browse"); b_out.clicked.connect(self._choose)
+        row = QHBoxLayout(); row.addWidget(self.ed_out); row.addWidget(b_out)
+        form.addRow("Format:", self.cbo_fmt); form.addRow("MP3 Bitrate:", self.sp_bitrate)
+        form.addRow("Encoders (all drives):", self.sp_cap); form.addRow("Output:", row)
+        opts.setLayout(form); lay.addWidget(opts)
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Drive", "Progress", "Status"])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        lay.addWidget(self.table)
+        self.btn = QPushButton("Start Farm"); self.btn.clicked.connect(self._toggle)
+        lay.addWidget(self.btn); lay.addWidget(self.status)
+        self._rows: Dict[str, int] = {}
+        self.farm = RipFarm(queue, self.cfg.settings)
+        self.farm.sig_drive.connect(self._drive)
+        self.farm.sig_stats.connect(self._stats)
+    def _choose(self):
+        d = QFileDialog.getExistingDirectory(self, "Select Output Directory")
+        if d: self.ed_out.setText(d)
+    def _toggle(self):
+        if self.farm.running:
+            self.farm.stop()
+            self.btn.setText("Start Farm")
+            self.status.setText("Stopped watching; running rips finish and eject.")
+            return
+        self.cfg.settings["farm_output_dir"] = self.ed_out.text()
+        self.cfg.settings["rip_encoder_cap"] = self.sp_cap.value()  # read by the queue for every rip
+        self.cfg.save()
+        self.farm.start(Path(self.ed_out.text()), rip_formats(self.cbo_fmt.currentText()), self.sp_bitrate.value())
+        self.btn.setText("Stop Farm")
+        self.status.setText("Scanning drives...")
+    def _drive(self, device: str, status: str, progress: int):
+        row = self._rows.get(device)
+        if row is None:
+            row = self._rows[device] = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(device))
+            self.table.setCellWidget(row, 1, QProgressBar())
+        self.table.cellWidget(row, 1).setValue(progress)
+        self.table.setItem(row, 2, QTableWidgetItem(status))
+    def _stats(self, st: dict):
+        rate = st["rate"]
+        self.status.setText(f"{st['active']}/{st['drives']} drives ripping | {st['discs']} discs done, {st['failed']} failed | "
+                            f"{st['bytes'] / 1024 ** 2:.0f} MB of audio | {rate / 1024 ** 2:.2f} MB/s ({rate / CD_RATE:.1f}x) overall")
\ No newline at end of file
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import os
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from PyQt6.QtWidgets import (
     QListWidget, QListWidgetItem, QWidget, QVBoxLayout, QProgressBar, QLabel,
     QTableWidget, QTableWidgetItem, QHBoxLayout, QPushButton, QMessageBox, QHeaderView, QFileDialog
@@ -9,38 +9,20 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QMimeData, pyqtSignal, Qt, QTimer, QUrl
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QDesktopServices
 from ..core.history import HistoryStore, HistoryEntry
+from ..services.sizeindex import SizeIndex
+from ..services.audioinfo import MEDIA_FRAMES, msf
 from datetime import datetime
-def compute_total_size(paths: List[str], max_files: int = 50000) -> int:
-    total = 0
-    file_count = 0
-    for p in paths:
-        pp = Path(p)
-        if pp.is_file():
-            try:
-                total += pp.stat().st_size
-                file_count += 1
-            except Exception:
-                pass
-        elif pp.is_dir():
-            for root, _, files in os.walk(pp, followlinks=False):
-                for fn in files:
-                    if file_count >= max_files:
-                        return total
-                    fp = Path(root) / fn
-                    try:
-                        total += fp.stat().st_size
-                        file_count += 1
-                    except Exception:
-                        pass
-    return total
 class FileListWidget(QListWidget):
     files_changed = pyqtSignal(list)
-    def __init__(self, allow_dirs: bool = True, exts: Iterable[str] | None = None):
+    def __init__(self, allow_dirs: bool = True, exts: Iterable[str] | None = None, estimate_image: bool = False):
         super().__init__()
         self.setAcceptDrops(True)
         self.exts = set(e.lower() for e in (exts or []))
         self.allow_dirs = allow_dirs
         self._paths_set = set()
+        # Sizes are computed off the GUI thread; listen to index.sig_size for totals.
+        self.index = SizeIndex(estimate_image=estimate_image)
+        self.files_changed.connect(self.index.set_paths)
     def add_path(self, p: str):
         try:
             normalized = str(Path(p).resolve())
@@ -104,22 +86,56 @@ class CapacityGauge(QWidget):
         while v >= 1024 and i < len(units)-1:
             v /= 1024.0; i += 1
         return f"{v:.2f} {units[i]}"
-    def update_size(self, size_bytes: int):
+    def update_size(self, size_bytes: int, scanning: bool = False):
         self.current_size = size_bytes
         pct = int((size_bytes / self.max_capacity) * 100) if self.max_capacity > 0 else 0
         pct = max(0, min(100, pct))
         self.bar.setValue(pct)
-        self.lbl.setText(f"{self._human(size_bytes)} / {self._human(self.max_capacity)} ({pct}%)")
+        self.lbl.setText(f"{self._human(size_bytes)} / {self._human(self.max_capacity)} ({pct}%)" + (" - scanning..." if scanning else ""))
         color = "#E74C3C" if size_bytes > self.max_capacity else "#2ECC71"
         self.bar.setStyleSheet(f"""
             QProgressBar {{ border: 1px solid #5e81ac; border-radius: 4px; background:#3b4252; color: white; }}
             QProgressBar::chunk {{ background-color:{color}; }}
         """)
+class DurationGauge(QWidget):
+    # Red Book playing time (minutes:seconds:frames) against 74 or 80 minute media.
+    def __init__(self, minutes: int = 80):
+        super().__init__()
+        self.minutes = minutes
+        self.frames = 0
+        self.unknown = 0
+        lay = QVBoxLayout(self)
+        self.lbl = QLabel("")
+        self.bar = QProgressBar()
+        self.bar.setRange(0, 100)
+        self.bar.setTextVisible(True)
+        lay.addWidget(self.lbl)
+        lay.addWidget(self.bar)
+        self.update_frames(0)
+    @property
+    def max_frames(self) -> int:
+        return MEDIA_FRAMES[self.minutes]
+    def set_minutes(self, minutes: int):
+        self.minutes = minutes
+        self.update_frames(self.frames, self.unknown)
+    def update_frames(self, frames: int, unknown: int = 0, scanning: bool = False):
+        self.frames, self.unknown = frames, unknown
+        pct = max(0, min(100, int(frames * 100 / self.max_frames)))
+        self.bar.setValue(pct)
+        note = " - probing..." if scanning else (f" - {unknown} file(s) of unknown length" if unknown else "")
+        self.lbl.setText(f"{msf(frames)} / {msf(self.max_frames)} ({pct}%)" + note)
+        color = "#E74C3C" if frames > self.max_frames else "#2ECC71"
+        self.bar.setStyleSheet(f"""
+            QProgressBar {{ border: 1px solid #5e81ac; border-radius: 4px; background:#3b4252; color: white; }}
+            QProgressBar::chunk {{ background-color:{color}; }}
+        """)
 class JobQueueWidget(QWidget):
     def __init__(self, service):
         super().__init__()
         self.service = service
         lay = QVBoxLayout(self)
+        self.lbl_lanes = QLabel("")
+        lay.addWidget(self.lbl_lanes)
         self.table = QTableWidget(0, 4)
         self.table.setHorizontalHeaderLabels(["Job", "Device", "Progress", "Status"])
         header = self.table.horizontalHeader()
@@ -131,13 +147,15 @@ class JobQueueWidget(QWidget):
         lay.addWidget(self.table)
         btn_row = QHBoxLayout()
         self.btn_cancel = QPushButton("Cancel Current")
-        self.btn_cancel.clicked.connect(self.service.cancel_current)
+        self.btn_cancel.clicked.connect(self._cancel)
         self.btn_remove = QPushButton("Remove Selected (Queued)")
         self.btn_remove.clicked.connect(self._remove_selected)
         btn_row.addWidget(self.btn_cancel); btn_row.addWidget(self.btn_remove); btn_row.addStretch()
         lay.addLayout(btn_row)
         self.service.sig_queue_updated.connect(self.refresh)
         self.service.sig_status_update.connect(self._status_update)
+        self._drive_state: Dict[str, Tuple[str, str, int]] = {}  # lane/drive -> (job id, status, percent)
+        self.service.sig_lane_update.connect(self._lane_update)
         self.service.sig_job_started.connect(lambda _id: self.refresh())
         self.service.sig_job_finished.connect(lambda _id, ok, msg: self.refresh())
         self.timer = QTimer(self)
@@ -154,7 +172,41 @@ class JobQueueWidget(QWidget):
             pb.setStyleSheet("QProgressBar { background:#4c566a; border:none; } QProgressBar::chunk { background:#a3be8c; }")
             self.table.setCellWidget(i, 2, pb)
             self.table.setItem(i, 3, QTableWidgetItem(job.status))
-        self.btn_cancel.setEnabled(len(jobs) and jobs[0].status == "RUNNING")
+        self.btn_cancel.setEnabled(self._running_count() > 0)
+        self._refresh_lanes()
+    def _running_count(self) -> int:
+        return len(self.service.running_ids())
+    def _refresh_lanes(self):
+        lanes = self.service.get_lanes()
+        if len(lanes) <= 1:
+            self.lbl_lanes.setVisible(False)
+            return
+        parts = []
+        for key, job in lanes.items():
+            if not job:
+                parts.append(f"{key}: idle")
+                continue
+            job_id, status, pct = self._drive_state.get(key, ("", "", 0))
+            if job_id != job.id:
+                status, pct = job.status, job.progress
+            parts.append(f"{key}: {pct}% {status} - {job.display_name}")
+        self.lbl_lanes.setText("Lanes - " + "  |  ".join(parts))
+        self.lbl_lanes.setVisible(True)
+    def _lane_update(self, key: str, job_id: str, status: str, progress: int):
+        self._drive_state[key] = (job_id, status, progress)
+        self._refresh_lanes()
+    def _cancel(self):
+        # Cancel the selected job (burning, preparing or queued); with nothing selected, cancel every lane.
+        row = self.table.currentRow()
+        jobs = self.service.get_list()
+        if 0 <= row < len(jobs):
+            job_id = jobs[row].id
+            if job_id in self.service.running_ids():
+                self.service.cancel_job(job_id)
+            else:
+                self.service.remove(job_id)
+        else:
+            self.service.cancel_current()
     def _status_update(self, job_id: str, status: str, progress: int):
         jobs = self.service.get_list()
         for i, job in enumerate(jobs):
@@ -171,13 +223,13 @@ class JobQueueWidget(QWidget):
         jobs = self.service.get_list()
         if row >= len(jobs): return
         job = jobs[row]
-        if job.status == "RUNNING":
-            QMessageBox.warning(self, "Remove", "Cannot remove the currently running job.")
+        if job.id in self.service.running_ids():
+            QMessageBox.warning(self, "Remove", "Cannot remove a running or preparing job; cancel it instead.")
             return
         self.service.remove(job.id)
     def _tick(self):
         jobs = self.service.get_list()
-        self.btn_cancel.setEnabled(len(jobs) and jobs[0].status == "RUNNING")
+        self.btn_cancel.setEnabled(self._running_count() > 0)
         for i, job in enumerate(jobs):
             w = self.table.cellWidget(i, 2)
             if isinstance(w, QProgressBar):
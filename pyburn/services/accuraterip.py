@@ -0,0 +1,206 @@
+from __future__ import annotations
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from itertools import repeat
+from operator import mul, rshift
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .audioinfo import FIRST_PREGAP, SAMPLES_PER_FRAME
+from .cdtoc import DiscToc
+try:
+    import numpy as np  # optional; without it the AccurateRip sums run in pure Python
+except Exception:
+    np = None
+# Rip accuracy checks: AccurateRip v1/v2 and a CUETools/CTDB-style CRC-32 per
+# track, computed while the track streams past, and a local checksum database
+# (imported AccurateRip dBAR responses) to compare them with.
+SKIP_SAMPLES = 5 * SAMPLES_PER_FRAME  # AccurateRip ignores the first 5 frames of the disc and the last 5
+_SLICE = 1 << 16  # samples per step of the pure-Python sums
+def cddb_id(toc: DiscToc) -> int:
+    digits = sum(sum(int(c) for c in str((t.start + FIRST_PREGAP) // 75)) for t in toc.tracks)
+    seconds = (toc.leadout + FIRST_PREGAP) // 75 - (toc.tracks[0].start + FIRST_PREGAP) // 75
+    return ((digits % 255) << 24) | (seconds << 8) | len(toc.tracks)
+def accuraterip_id(toc: DiscToc) -> str:
+    # "dBAR-NNN-id1-id2-cddb", the name AccurateRip files its responses under.
+    offsets = [t.start for t in toc.tracks]
+    id1 = (sum(offsets) + toc.leadout) & 0xFFFFFFFF
+    id2 = (sum(max(o, 1) * (i + 1) for i, o in enumerate(offsets)) + toc.leadout * (len(offsets) + 1)) & 0xFFFFFFFF
+    return f"dBAR-{len(offsets):03d}-{id1:08x}-{id2:08x}-{cddb_id(toc):08x}"
+class TrackChecksum:
+    # Running checksums over one track's little-endian stereo samples, fed in
+    # chunks of any size. AccurateRip weights sample i (from 1) by i; the sums
+    # run on NumPy arrays a chunk at a time, or on `array` slices without NumPy.
+    def __init__(self, samples: int, first: bool = False, last: bool = False):
+        self.samples = samples
+        self.low = SKIP_SAMPLES - 1 if first else 1
+        self.high = samples - SKIP_SAMPLES if last else samples
+        self.pos = 0
+        self.crc = 0
+        self._v1 = 0
+        self._v2 = 0
+        self._carry = b""
+    def feed(self, chunk):
+        self.crc = zlib.crc32(chunk, self.crc)
+        if self._carry:
+            chunk = self._carry + bytes(chunk)
+        whole = len(chunk) // 4
+        self._carry = bytes(chunk[whole * 4:])
+        if not whole:
+            return
+        # Multipliers pos+1 .. pos+whole; keep those inside [low, high].
+        a = max(0, self.low - self.pos - 1)
+        b = min(whole, self.high - self.pos)
+        if a < b:
+            if np is not None:
+                s = np.frombuffer(chunk, dtype="<u4", count=whole).astype(np.uint64)
+                p = s[a:b] * np.arange(self.pos + a + 1, self.pos + b + 1, dtype=np.uint64)
+                lo = int((p & np.uint64(0xFFFFFFFF)).sum(dtype=np.uint64))
+                hi = int((p >> np.uint64(32)).sum(dtype=np.uint64))
+            else:
+                lo, hi = _weighted_halves(chunk, a, b, self.pos)
+            self._v1 += lo
+            self._v2 += lo + hi
+        self.pos += whole
+    @property
+    def v1(self) -> int:
+        return self._v1 & 0xFFFFFFFF
+    @property
+    def v2(self) -> int:
+        return self._v2 & 0xFFFFFFFF
+def _weighted_halves(chunk, a: int, b: int, pos: int) -> Tuple[int, int]:
+    # Sums of the low and high 32-bit halves of sample k times pos+k+1 for k in
+    # [a, b), with big-int products over `array` slices instead of NumPy.
+    view = memoryview(chunk)
+    lo = hi = 0
+    for start in range(a, b, _SLICE):
+        end = min(b, start + _SLICE)
+        s = array("I")
+        s.frombytes(view[start * 4:end * 4])
+        if sys.byteorder == "big":
+            s.byteswap()
+        p = list(map(mul, s, range(pos + start + 1, pos + end + 1)))
+        h = sum(map(rshift, p, repeat(32)))
+        lo += sum(p) - (h << 32)
+        hi += h
+    return lo, hi
+def parse_dbar(data: bytes) -> Dict[str, List[List[List[int]]]]:
+    # AccurateRip .bin response: blocks of (count, id1, id2, cddb) then per track
+    # (confidence, CRC, frame-450 CRC). Returns {disc key: [[[confidence, crc], ...], ...]}.
+    out: Dict[str, List[List[List[int]]]] = {}
+    i = 0
+    while i + 13 <= len(data):
+        count, id1, id2, cddb = struct.unpack_from("<BIII", data, i)
+        i += 13
+        if not count or i + count * 9 > len(data):
+            break
+        tracks = []
+        for _ in range(count):
+            conf, crc, _crc450 = struct.unpack_from("<BII", data, i)
+            tracks.append([conf, crc])
+            i += 9
+        out.setdefault(f"dBAR-{count:03d}-{id1:08x}-{id2:08x}-{cddb:08x}", []).append(tracks)
+    return out
+class ChecksumDB:
+    # Local JSON store of AccurateRip responses, keyed like the online database.
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._data: Dict[str, List[List[List[int]]]] = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except (OSError, ValueError):
+                self._data = {}
+    def merge(self, entries: Dict[str, List[List[List[int]]]]) -> int:
+        # Adds responses not stored yet; returns how many were new.
+        added = 0
+        with self._lock:
+            for key, responses in entries.items():
+                have = self._data.setdefault(key, [])
+                for r in responses:
+                    if r not in have:
+                        have.append(r)
+                        added += 1
+        self.save()
+        return added
+    def import_file(self, path: Path) -> int:
+        # A dBAR-*.bin from AccurateRip or another PyBurn checksum database (JSON).
+        data = Path(path).read_bytes()
+        if data[:1] == b"{":
+            return self.merge(json.loads(data.decode("utf-8")))
+        return self.merge(parse_dbar(data))
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            blob = json.dumps(self._data)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+    def responses(self, key: str) -> List[List[List[int]]]:
+        with self._lock:
+            return list(self._data.get(key, []))
+_DBS: Dict[str, ChecksumDB] = {}
+_DBS_LOCK = threading.Lock()
+def checksum_db(path: Optional[Path]) -> ChecksumDB:
+    # One database per file, so imports from the Rip tab reach rips already queued.
+    key = str(path or "")
+    with _DBS_LOCK:
+        if key not in _DBS:
+            _DBS[key] = ChecksumDB(path)
+        return _DBS[key]
+def check_rip(db: ChecksumDB, toc: DiscToc, sums: Dict[int, Tuple[Optional[int], Optional[int], int]]) -> Tuple[str, List[str]]:
+    # (summary, per-track log lines) for {track number: (v1, v2, crc32)}.
+    key = accuraterip_id(toc)
+    responses = db.responses(key)
+    lines: List[str] = [f"AccurateRip disc ID {key}: {len(responses)} responses in the local database"]
+    accurate = 0
+    confidences: List[int] = []
+    for i, t in enumerate(toc.tracks):
+        v1, v2, crc = sums.get(t.number, (None, None, 0))
+        ids = f"v1 {v1:08X} v2 {v2:08X}" if v1 is not None else "AccurateRip n/a"
+        conf = 0
+        version = ""
+        for r in responses:
+            if i < len(r) and v1 is not None and r[i][1] in (v1, v2):
+                conf += r[i][0]
+                version = "v2" if r[i][1] == v2 else (version or "v1")
+        if conf:
+            accurate += 1
+            confidences.append(conf)
+            verdict = f"accurately ripped ({version}, confidence {conf})"
+        elif responses and v1 is not None:
+            verdict = "NOT matched by the database"
+        else:
+            verdict = "not in the database"
+        lines.append(f"Track {t.number:02d}: {verdict} [{ids} CRC32 {crc:08X}]")
+    if not responses:
+        summary = "AccurateRip: disc not in the local database"
+    else:
+        summary = f"AccurateRip: {accurate}/{len(toc.tracks)} tracks accurate"
+        if confidences:
+            summary += f" (confidence {min(confidences)}-{max(confidences)})"
+    return summary, lines
+def main(argv: List[str]) -> int:
+    # python -m pyburn.services.accuraterip DB FILE... : import dBAR .bin files into a checksum database
+    if len(argv) < 2:
+        print("usage: python -m pyburn.services.accuraterip DATABASE.json dBAR-FILE.bin [...]")
+        return 2
+    db = checksum_db(Path(argv[0]))
+    for f in argv[1:]:
+        print(f"{f}: {db.import_file(Path(f))} new responses")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, Dict
+from ..core.jobs import Job, JobType
+from .audioinfo import staged_bytes
+# Temp-space multipliers per job type; these match the preflight checks in the tabs.
+TEMP_MULTIPLIERS = {
+    JobType.DATA: 1.2,
+    JobType.AUDIO: 1.5,
+    JobType.VIDEO_DVD: 2.5,
+    JobType.VIDEO_BD: 2.5,
+    JobType.RIP: 0.0,
+    JobType.VERIFY: 0.0,
+}
+def estimate_temp_need(job: Job, input_bytes: int) -> int:
+    span = job.options.span
+    if job.job_type == JobType.DATA and span:
+        # Split-file parts are cut into temp space even when the image is streamed.
+        image = 0 if job.options.stream else int(span["bytes"] * TEMP_MULTIPLIERS[JobType.DATA])
+        return image + span.get("parts", 0)
+    if job.job_type == JobType.DATA and (job.options.stream or job.options.backup_set):
+        return 0
+    if job.job_type == JobType.AUDIO:
+        return 0 if job.options.audio_stream else staged_bytes(job.files)
+    return int(input_bytes * TEMP_MULTIPLIERS.get(job.job_type, 1.0))
+class TempSpaceGovernor:
+    def __init__(self):
+        self._inflight: Dict[str, int] = {}
+        self._cond = threading.Condition()
+    def _free(self, temp_dir: Path) -> int:
+        try:
+            return shutil.disk_usage(str(temp_dir)).free
+        except Exception:
+            return 0
+    def acquire(self, key: str, temp_dir: Path, need: int,
+                force: Callable[[], bool], cancelled: Callable[[], bool]) -> bool:
+        # Blocks until `need` bytes fit next to every other in-flight prepare.
+        # Returns False when admitted only because force() (the job became the
+        # lane head) or cancelled() said so.
+        with self._cond:
+            while True:
+                reserved = sum(v for k, v in self._inflight.items() if k != key)
+                if self._free(temp_dir) - reserved >= need:
+                    self._inflight[key] = need
+                    return True
+                if force() or cancelled():
+                    self._inflight[key] = need
+                    return False
+                self._cond.wait(2.0)
+    def release(self, key: str):
+        with self._cond:
+            self._inflight.pop(key, None)
+            self._cond.notify_all()
+    def poke(self):
+        with self._cond:
+            self._cond.notify_all()
\ No newline at end of file
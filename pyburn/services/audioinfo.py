@@ -0,0 +1,286 @@
+from __future__ import annotations
+import json
+import os
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import QObject, pyqtSignal
+# Red Book capacity planning: track durations from WAV/FLAC headers (parsed
+# here) or ffprobe, converted to CD frames (1/75 s, 588 stereo samples, 2352
+# bytes). Probes run concurrently and are cached by path, mtime and size in a
+# JSON file that survives restarts.
+FPS = 75
+SAMPLES_PER_FRAME = 588
+FRAME_BYTES = 2352
+FIRST_PREGAP = 2 * FPS  # the mandatory 2 s before track 1; the generated TOC adds no other gaps
+MEDIA_FRAMES = {74: 74 * 60 * FPS, 80: 80 * 60 * FPS}
+@dataclass
+class AudioInfo:
+    duration: float
+    sample_rate: int = 0
+    channels: int = 0
+    bits: int = 0
+    codec: str = ""
+    @property
+    def frames(self) -> int:
+        return track_frames(self.duration)
+def track_frames(duration: float) -> int:
+    # cdrdao pads the last sector of a track, so a track takes whole frames.
+    samples = round(duration * 44100)
+    return -(-samples // SAMPLES_PER_FRAME)
+def disc_frames(frames: Iterable[int]) -> int:
+    frames = list(frames)
+    return FIRST_PREGAP + sum(frames) if frames else 0
+def msf(frames: int) -> str:
+    m, rest = divmod(max(0, frames), 60 * FPS)
+    s, f = divmod(rest, FPS)
+    return f"{m:02d}:{s:02d}:{f:02d}"
+def is_cdda(info: Optional[AudioInfo]) -> bool:
+    # 44.1 kHz, 16 bit, stereo: decodes to CD-DA without resampling.
+    return info is not None and info.sample_rate == 44100 and info.channels == 2 and info.bits == 16
+def is_cdda_wav(info: Optional[AudioInfo]) -> bool:
+    # A plain PCM WAV cdrdao can read as it is.
+    return is_cdda(info) and info.codec == "pcm_s16le"
+def _riff_info(f) -> Optional[AudioInfo]:
+    head = f.read(12)
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        h = f.read(8)
+        if len(h) < 8:
+            return None
+        cid, size = h[:4], struct.unpack("<I", h[4:])[0]
+        if cid == b"fmt ":
+            body = f.read(size)
+            if len(body) < 16:
+                return None
+            tag, channels, rate = struct.unpack_from("<HHI", body)
+            bits = struct.unpack_from("<H", body, 14)[0]
+            ext = tag == 0xFFFE
+            if ext and size >= 26:
+                tag = struct.unpack_from("<H", body, 24)[0]  # first bytes of the sub-format GUID
+            fmt = (tag, channels, rate, bits, ext)
+            if size & 1:
+                f.seek(1, 1)
+        elif cid == b"data":
+            if fmt is None:
+                return None
+            tag, channels, rate, bits, ext = fmt
+            block = channels * bits // 8
+            if size == 0xFFFFFFFF or not size:  # streamed WAV with no length filled in
+                size = max(0, os.fstat(f.fileno()).st_size - f.tell())
+            if not block or not rate:
+                return None
+            if tag == 1:
+                codec = "pcm_u8" if bits == 8 else f"pcm_s{bits}le" + ("_ext" if ext else "")
+            else:
+                codec = "pcm_float" if tag == 3 else f"wav_{tag:#x}"
+            return AudioInfo((size // block) / rate, rate, channels, bits, codec)
+        else:
+            f.seek(size + (size & 1), 1)
+def _flac_info(f) -> Optional[AudioInfo]:
+    head = f.read(10)
+    if head[:3] == b"ID3":  # ID3v2 tag in front of the stream; the size is syncsafe
+        f.seek(10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)))
+        head = f.read(4)
+    if head[:4] != b"fLaC":
+        return None
+    f.seek(f.tell() - len(head) + 4)
+    block = f.read(4 + 34)
+    if len(block) < 38 or block[0] & 0x7F != 0:  # STREAMINFO always comes first
+        return None
+    v = int.from_bytes(block[14:22], "big")
+    rate = v >> 44
+    channels = ((v >> 41) & 0x7) + 1
+    bits = ((v >> 36) & 0x1F) + 1
+    total = v & 0xFFFFFFFFF
+    if not rate or not total:
+        return None
+    return AudioInfo(total / rate, rate, channels, bits, "flac")
+def header_info(path: str) -> Optional[AudioInfo]:
+    # Reads the format from WAV/FLAC headers without starting a process; None for anything else.
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic == b"RIFF":
+                return _riff_info(f)
+            if magic in (b"fLaC",) or magic[:3] == b"ID3":
+                return _flac_info(f)
+    except (OSError, struct.error):
+        return None
+    return None
+def staged_bytes(paths: Iterable[str]) -> int:
+    # Temp space an audio CD prepare writes: nothing for CD-DA WAVs (linked), CD-DA size for the rest.
+    total = 0
+    for p in paths:
+        info = header_info(str(p))
+        if is_cdda_wav(info):
+            continue
+        if info is not None:
+            total += track_frames(info.duration) * FRAME_BYTES
+        else:
+            try:
+                total += int(os.path.getsize(p) * 1.5)  # compressed source of unknown length
+            except OSError:
+                pass
+    return total
+def ffprobe_info(ffprobe: str, path: str, timeout: int = 30) -> Optional[AudioInfo]:
+    p = subprocess.run([ffprobe, "-v", "error", "-select_streams", "a:0",
+                        "-show_entries", "format=duration:stream=codec_name,sample_rate,channels,bits_per_sample,bits_per_raw_sample,sample_fmt",
+                        "-of", "json", path], capture_output=True, text=True, timeout=timeout)
+    try:
+        data = json.loads(p.stdout or "{}")
+    except ValueError:
+        return None
+    streams = data.get("streams") or [{}]
+    st = streams[0]
+    try:
+        duration = float((data.get("format") or {}).get("duration") or st.get("duration") or 0)
+    except (TypeError, ValueError):
+        return None
+    if duration <= 0:
+        return None
+    bits = int(st.get("bits_per_raw_sample") or st.get("bits_per_sample") or 0)
+    if not bits and str(st.get("sample_fmt", "")).startswith("s16"):
+        bits = 16
+    return AudioInfo(duration, int(st.get("sample_rate") or 0), int(st.get("channels") or 0), bits, st.get("codec_name") or "")
+class ProbeCache:
+    # path -> (mtime_ns, size, AudioInfo); stale entries are ignored and overwritten.
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data: Dict[str, list] = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except (OSError, ValueError):
+                self._data = {}
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+    def get(self, path: str) -> Optional[AudioInfo]:
+        with self._lock:
+            row = self._data.get(path)
+        if not row or tuple(row[:2]) != self._stamp(path):
+            return None
+        try:
+            return AudioInfo(**row[2])
+        except TypeError:
+            return None
+    def put(self, path: str, info: AudioInfo):
+        stamp = self._stamp(path)
+        if stamp is None:
+            return
+        with self._lock:
+            self._data[path] = [stamp[0], stamp[1], asdict(info)]
+            self._dirty = True
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            blob = json.dumps(self._data)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+_CACHES: Dict[str, ProbeCache] = {}
+_CACHES_LOCK = threading.Lock()
+def probe_cache(path: Optional[Path]) -> ProbeCache:
+    # One shared cache per file, so the Audio tab and the backend see each other's probes.
+    key = str(path or "")
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = ProbeCache(path)
+        return _CACHES[key]
+def probe(paths: Iterable[str], ffprobe: Optional[str], cache: ProbeCache, workers: int = 0,
+          on_result: Optional[Callable[[str, Optional[AudioInfo]], None]] = None,
+          cancelled: Callable[[], bool] = lambda: False) -> Dict[str, Optional[AudioInfo]]:
+    # Cached files answer at once; the rest are probed on a pool. None means unknown.
+    out: Dict[str, Optional[AudioInfo]] = {}
+    todo: List[str] = []
+    for p in paths:
+        info = cache.get(p)
+        if info is None:
+            todo.append(p)
+            continue
+        out[p] = info
+        if on_result:
+            on_result(p, info)
+    if todo:
+        def one(p: str) -> Optional[AudioInfo]:
+            if cancelled():
+                return None
+            info = header_info(p)
+            if info is not None or not ffprobe:
+                return info
+            try:
+                return ffprobe_info(ffprobe, p)
+            except (OSError, subprocess.SubprocessError):
+                return None
+        with ThreadPoolExecutor(max_workers=workers or 8) as pool:
+            futures = {pool.submit(one, p): p for p in todo}
+            for f in as_completed(futures):
+                p = futures[f]
+                info = f.result()
+                if info is not None:
+                    cache.put(p, info)
+                out[p] = info
+                if on_result:
+                    on_result(p, info)
+    for p in todo:
+        out.setdefault(p, None)
+    cache.save()
+    return out
+class DurationIndex(QObject):
+    # disc frames (pregap included) of the probed files, files not known yet or unreadable, finished
+    sig_frames = pyqtSignal(int, int, bool)
+    def __init__(self, ffprobe: Optional[str], cache: ProbeCache):
+        super().__init__()
+        self.ffprobe = ffprobe
+        self.cache = cache
+        self._gen = 0
+        self.infos: Dict[str, Optional[AudioInfo]] = {}
+    def set_paths(self, paths: List[str]):
+        self._gen += 1
+        gen = self._gen
+        paths = [str(p) for p in paths]
+        threading.Thread(target=self._run, args=(gen, paths), daemon=True).start()
+    def _run(self, gen: int, paths: List[str]):
+        known: Dict[str, Optional[AudioInfo]] = {}
+        last = [0.0]
+        def emit(done: bool):
+            frames = [i.frames for i in known.values() if i is not None]
+            unknown = len(paths) - len(frames)
+            self.sig_frames.emit(disc_frames(frames) if paths else 0, unknown, done)
+        def result(p: str, info: Optional[AudioInfo]):
+            known[p] = info
+            now = time.monotonic()
+            if gen == self._gen and now - last[0] >= 0.1:
+                last[0] = now
+                emit(False)
+        probe(paths, self.ffprobe, self.cache, on_result=result, cancelled=lambda: gen != self._gen)
+        if gen != self._gen:
+            return
+        self.infos = dict(known)
+        emit(True)
\ No newline at end of file
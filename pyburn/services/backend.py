@@ -1,18 +1,40 @@
 from __future__ import annotations
+import hashlib
 import os
+import re
 import shutil
-import subprocess
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, Optional, Union
 from .exec import ProcessRunner
+from .stream import RingBuffer, SlotPool
+from ..core.jobs import rip_formats
 from ..core.tools import ToolFinder
 from .progress import ProgressTools
 from .media import MediaTools
-from .verify import VerificationTools
+from .verify import SampleSet, VerificationTools
+from .cache import ImageCache, cache_key
+from .sizeindex import total_bytes
+from .span import INDEX_NAME, disc_grafts, escape_graft, write_pathlist
+from .checksums import SUMS_NAME, graft_files, verify_sums, write_sums
+from .manifest import BackupManifest
+from .cdtoc import DiscToc, TocTrack, read_toc, split_stream, wav_header
+from .accuraterip import ChecksumDB, TrackChecksum, check_rip
+from .metadata import MusicBrainzClient, disc_id, musicbrainz_lookup
+from .ripjournal import RipJournal
+from .audioinfo import FRAME_BYTES, SAMPLES_PER_FRAME, header_info, is_cdda, is_cdda_wav, msf, probe, probe_cache
 OnStatus = Callable[[str], None]
 OnProgress = Callable[[int], None]
 OnLog = Callable[[str], None]
+OnDevice = Callable[[str, str, int], None]  # device, status, percent
+STREAM_AUDIO_MAX_SPEED = 24  # assumed write speed ("Auto") when checking that decoders can keep up
+STREAM_AUDIO_HEADROOM = 1.25  # decode at least this much faster than the burner consumes audio
+STREAM_AUDIO_BUFFER = 16 * 1024 * 1024  # decoded read-ahead held for cdrdao (about 1.5 min of audio)
+RIP_ENCODER_BUFFER = 32 * 1024 * 1024  # ripped audio queued per track before the drive has to wait (about 3 min)
+RIP_LAYOUT = "{number:02d} - {title}"  # output name under out_dir; several formats each get a "{format}/" tree
 class Phase:
     def __init__(self, on_progress: OnProgress, start: int, span: int):
         self.on_progress = on_progress
@@ -22,155 +44,548 @@ class Phase:
         pct = max(0, min(100, pct))
         overall = self.start + int(self.span * (pct / 100.0))
         self.on_progress(min(99, overall))
+@dataclass
+class PreparedImage:
+    kind: str  # "iso", "stream", "audio" or "sim"
+    work_dir: Path
+    image: Optional[Path] = None
+    toc: Optional[Path] = None
+    sectors: int = 0
+    stream_args: Optional[List[str]] = None
+    title: str = "Disc"
+    burn_start: int = 45
+    dvd_compat: bool = True
+    sha256: Optional[str] = None  # image hash taken while it was mastered
+    session: Optional[int] = None  # backup manifest session written by this image
+    append: bool = False  # add a session to the disc instead of starting a new one
+    tracks: Optional[List[tuple]] = None  # (source, frames, already CD format) when audio is decoded straight into cdrdao
+class _PcmFeed:
+    # File-like source for run_pipeline: every track is decoded by its own ffmpeg
+    # to raw big-endian CD-DA (what cdrdao reads from stdin), cut or padded with
+    # silence to exactly the frames the TOC declares.
+    def __init__(self, runner: ProcessRunner, ffmpeg: str, tracks: List[tuple], on_log: OnLog):
+        self.runner = runner
+        self.ffmpeg = ffmpeg
+        self.tracks = tracks
+        self.on_log = on_log
+        self.i = -1
+        self.proc = None
+        self.left = 0
+    def _next(self) -> bool:
+        self.i += 1
+        if self.i >= len(self.tracks):
+            return False
+        src, frames, cdda = self.tracks[self.i]
+        conv = ["-c:a", "pcm_s16be"] if cdda else ["-ar", "44100", "-ac", "2", "-c:a", "pcm_s16be"]
+        n = self.i + 1
+        self.proc = self.runner.start_reader([self.ffmpeg, "-nostdin", "-v", "error", "-i", str(src)] + conv + ["-f", "s16be", "pipe:1"],
+                                             on_stderr=lambda s: self.on_log(f"[track {n:02d}] {s}"))
+        if self.proc is None:
+            raise RuntimeError("cancelled")
+        self.left = frames * FRAME_BYTES
+        return True
+    def _end_track(self, kill: bool):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        code = self.runner.finish(proc, kill=kill)
+        if code != 0 and not kill and not self.runner.cancelled:
+            raise RuntimeError(f"Decoding track {self.i + 1} failed (ffmpeg exit code {code})")
+    def read(self, n: int) -> bytes:
+        while True:
+            if self.left <= 0:
+                self._end_track(kill=True)  # anything past the declared length is dropped
+                if not self._next():
+                    return b""
+            chunk = self.proc.stdout.read(min(n, self.left)) if self.proc is not None else b""
+            if not chunk:
+                if self.proc is not None:
+                    self._end_track(kill=False)
+                    self.on_log(f"[track {self.i + 1:02d}] {self.left} bytes short; padded with silence")
+                chunk = bytes(min(n, self.left))
+            self.left -= len(chunk)
+            return chunk
+    def close(self):
+        if self.proc is not None:
+            self.runner.finish(self.proc, kill=True)
+            self.proc = None
+class _TrackFeed:
+    # One ripped track on its way to its encoders: the splitter puts each chunk
+    # once, and every encoder's run_pipeline reads it through its own cursor.
+    # Readers must attach before the first put.
+    def __init__(self, max_bytes: int):
+        self.ring = RingBuffer(max_bytes)
+    def attach(self) -> int:
+        return self.ring.attach()
+    def reader(self, rid: int) -> "_FeedReader":
+        return _FeedReader(self.ring, rid)
+    def detach(self, rid: int):
+        self.ring.detach(rid)
+    def put(self, chunk: bytes) -> bool:
+        return self.ring.put(chunk)
+    def close(self):
+        self.ring.close()
+    def abort(self):
+        self.ring.abort()
+class _FeedReader:
+    def __init__(self, ring: RingBuffer, rid: int):
+        self.ring = ring
+        self.rid = rid
+    def read(self, n: int) -> bytes:
+        return self.ring.get(self.rid) or b""
 class BackendBase:
-    def __init__(self, tools: ToolFinder):
+    def __init__(self, tools: ToolFinder, cache: Optional[ImageCache] = None,
+                 manifest: Optional[BackupManifest] = None, metadata: Optional[MusicBrainzClient] = None,
+                 checksums: Optional[ChecksumDB] = None):
         self.tools = tools
+        self.cache = cache
+        self.manifest = manifest
+        self.metadata = metadata
+        self.checksums = checksums
         self.runner = ProcessRunner()
         self.media = MediaTools(tools, self.runner)
         self.verify = VerificationTools(tools, self.runner)
         self._cancelled = False
+        self._started = time.monotonic()
     def cancel(self):
         self._cancelled = True
         self.runner.cancel()
+    def cleanup(self, work_dir: Path):
+        try: shutil.rmtree(work_dir, ignore_errors=True)
+        except Exception: pass
+    def _cache_key(self, kind: str, sources: List[Path], params) -> Optional[str]:
+        return cache_key(kind, sources, params, since=self._started) if self.cache else None
+    def _from_cache(self, key: Optional[str], dest: Path, on_log: OnLog) -> bool:
+        if not key:
+            return False
+        try:
+            hit = self.cache.fetch(key, dest)
+        except Exception as e:
+            on_log(f"Image cache unavailable: {e}")
+            return False
+        if hit:
+            on_log(f"Reusing cached {dest.name}")
+        return hit
+    def _to_cache(self, key: Optional[str], path: Path, on_log: OnLog):
+        if not key:
+            return
+        try:
+            self.cache.store(key, path)
+        except Exception as e:
+            on_log(f"Could not cache {path.name}: {e}")
+    def _each(self, devices: List[str], fn: Callable[[str], None]):
+        threads = [threading.Thread(target=fn, args=(d,), daemon=True) for d in devices]
+        for t in threads: t.start()
+        for t in threads: t.join()
+    def write_copies(self, prepared: PreparedImage, devices: List[str], speed: any,
+                     on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, on_device: OnDevice,
+                     verify: bool = False, auto_blank: bool = True, eject_after: bool = True,
+                     dummy: bool = False, verify_mode: str = "full", samples: int = 256) -> Dict[str, str]:
+        # One write() per drive, all at once. Returns {device: error} for the drives
+        # that failed; a failing drive never stops the others. verify_mode "mixed"
+        # fully verifies the first drive's copy and samples the rest.
+        errors: Dict[str, str] = {}
+        pct: Dict[str, int] = {d: 0 for d in devices}
+        lock = threading.Lock()
+        def one(d: str):
+            def prog(p: int):
+                with lock:
+                    pct[d] = p
+                    overall = min(pct.values())
+                on_device(d, "", p)
+                on_progress(overall)
+            try:
+                self.write(prepared, d, speed, lambda s: on_device(d, s, pct[d]), prog,
+                           lambda s: on_log(f"[{d}] {s}"), verify=verify, auto_blank=auto_blank,
+                           eject_after=eject_after, dummy=dummy, samples=samples,
+                           verify_mode="full" if verify_mode == "mixed" and d == devices[0] else verify_mode)
+                on_device(d, "Done", 100)
+            except Exception as e:
+                errors[d] = str(e)
+                on_device(d, f"Failed: {e}", pct[d])
+        on_status(f"Burning {prepared.title} on {len(devices)} drives...")
+        self._each(devices, one)
+        return errors
+    def commit_session(self, prepared: PreparedImage):
+        # Records a backup session in the manifest once every copy of it is on disc.
+        if prepared.session is not None and self.manifest:
+            self.manifest.commit(prepared.session)
+    def wait_for_media(self, device: str, prompt: str, on_status: OnStatus):
+        # Polls the drive until a writable disc is in; without dvd+rw-mediainfo there is nothing to poll.
+        if not self.tools.find("dvd+rw-mediainfo"):
+            return
+        asked = False
+        while not self.runner.cancelled:
+            info = self.media.get_info(device)
+            if info.get("blank") or info.get("rewritable"):
+                return
+            if not asked:
+                on_status(prompt)
+                asked = True
+            time.sleep(2.0)
+        raise RuntimeError("cancelled")
     def _file_total_size(self, paths: List[Path]) -> int:
-        total = 0
-        for p in paths:
-            if p.is_file():
-                try: total += p.stat().st_size
-                except Exception: pass
-            elif p.is_dir():
-                for root, _, files in os.walk(p, followlinks=False):
-                    for fn in files:
-                        fp = Path(root) / fn
-                        try: total += fp.stat().st_size
-                        except Exception: pass
-        return total
+        # Served from the size index, but a root is read at most once per job:
+        # one scanned before this job began is walked again now.
+        return total_bytes([str(p) for p in paths], since=self._started)
+def _span_title(span: Optional[Dict]) -> str:
+    return f"Data disc {span['disc'] + 1} of {span['count']}" if span else "Data disc"
 class SimulatedBackend(BackendBase):
-    def burn_data(self, files: List[Path], device: str, temp_dir: Path, volume: str, speed: any,
-                  verify: bool, on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                  auto_blank: bool = True, eject_after: bool = True, dummy: bool = False):
-        on_status("Creating ISO image (simulated)...")
-        for i in range(40):
+    def wait_for_media(self, device: str, prompt: str, on_status: OnStatus):
+        pass
+    def _sleep_steps(self, n: int, delay: float, emit: Callable[[int], None]):
+        for i in range(n):
             if self.runner.cancelled: raise RuntimeError("cancelled")
-            import time; time.sleep(0.02); on_progress(i)
-        on_status("Burning (simulated)...")
-        for i in range(50):
-            if self.runner.cancelled: raise RuntimeError("cancelled")
-            import time; time.sleep(0.03); on_progress(40 + i)
-        if verify:
-            on_status("Verifying (simulated)...")
-            for i in range(10): import time; time.sleep(0.02); on_progress(90 + i)
-        if eject_after: on_status("Ejecting (simulated)...")
-        on_progress(100); on_status("Data disc burned (simulated)")
-    def burn_audio(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                   on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, eject_after: bool = True,
-                   album_title: Optional[str] = None, album_performer: Optional[str] = None,
-                   track_titles: Optional[List[str]] = None, track_performers: Optional[List[str]] = None):
+            time.sleep(delay); emit(i)
+    def prepare_data(self, files: List[Path], work_dir: Path, volume: str,
+                     on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, stream: bool = False,
+                     span: Optional[Dict] = None, checksums: Optional[str] = None) -> PreparedImage:
+        title = _span_title(span)
+        if stream:
+            on_status("Sizing image (simulated)...")
+            return PreparedImage("sim", work_dir, title=title, burn_start=0)
+        on_status("Creating ISO image (simulated)...")
+        self._sleep_steps(40, 0.02, on_progress)
+        return PreparedImage("sim", work_dir, title=title, burn_start=40)
+    def prepare_session(self, files: List[Path], work_dir: Path, volume: str, backup_set: str, job_id: str,
+                        on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, full: bool = False) -> PreparedImage:
+        on_status(f"Comparing with backup set {backup_set} (simulated)...")
+        self._sleep_steps(20, 0.02, on_progress)
+        return PreparedImage("sim", work_dir, title=f"Backup session ({backup_set})", burn_start=20)
+    def prepare_audio(self, files: List[Path], work_dir: Path,
+                      on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
+                      album_title: Optional[str] = None, album_performer: Optional[str] = None,
+                      track_titles: Optional[List[str]] = None, track_performers: Optional[List[str]] = None,
+                      workers: int = 0, stream: bool = False, speed: any = "Auto") -> PreparedImage:
+        if stream:
+            on_status("Checking decoder speed (simulated)...")
+            return PreparedImage("sim", work_dir, title="Audio CD", burn_start=10)
         on_status("Converting audio (simulated)...")
         n = max(1, len(files))
-        for idx in range(1, n + 1):
-            if self.runner.cancelled: raise RuntimeError("cancelled")
-            import time; time.sleep(0.05); on_progress(10 + int((idx / n) * 40))
-        on_status("Burning (simulated)...")
-        for i in range(50): import time; time.sleep(0.03); on_progress(50 + i)
-        if eject_after: on_status("Ejecting (simulated)...")
-        on_progress(100); on_status("Audio CD created (simulated)")
-    def burn_video_dvd(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                       on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                       auto_blank: bool = True, eject_after: bool = True):
+        self._sleep_steps(n, 0.05, lambda i: on_progress(10 + int(((i + 1) / n) * 40)))
+        return PreparedImage("sim", work_dir, title="Audio CD", burn_start=50)
+    def prepare_video_dvd(self, files: List[Path], work_dir: Path,
+                          on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> PreparedImage:
         on_status("Transcoding video (simulated)...")
         n = max(1, len(files))
-        for idx in range(1, n + 1):
-            for i in range(10):
-                if self.runner.cancelled: raise RuntimeError("cancelled")
-                import time; time.sleep(0.04); on_progress(min(60, 10 + int((idx - 1 + i / 10) / n * 50)))
-        on_status("Authoring DVD (simulated)..."); on_progress(70); import time; time.sleep(0.4)
-        on_status("Burning DVD (simulated)...")
-        for i in range(30): time.sleep(0.05); on_progress(70 + i)
-        if eject_after: on_status("Ejecting (simulated)...")
-        on_progress(100); on_status("Video DVD created (simulated)")
-    def burn_video_bd(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                      on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                      auto_blank: bool = True, eject_after: bool = True):
+        self._sleep_steps(n * 10, 0.04, lambda i: on_progress(min(60, 10 + int((i / 10) / n * 50))))
+        on_status("Authoring DVD (simulated)..."); on_progress(70)
+        self._sleep_steps(1, 0.4, lambda i: None)
+        return PreparedImage("sim", work_dir, title="Video DVD", burn_start=70)
+    def prepare_video_bd(self, files: List[Path], work_dir: Path,
+                         on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> PreparedImage:
         on_status("Transcoding for BDMV (simulated)...")
         n = max(1, len(files))
-        for idx in range(1, n + 1):
-            for i in range(10): import time; time.sleep(0.05); on_progress(min(60, 10 + int((idx - 1 + i / 10) / n * 50)))
-        on_status("Authoring BDMV (simulated)..."); on_progress(70); import time; time.sleep(0.4)
-        on_status("Burning Blu-ray (simulated)...")
-        for i in range(30): time.sleep(0.05); on_progress(70 + i)
+        self._sleep_steps(n * 10, 0.05, lambda i: on_progress(min(60, 10 + int((i / 10) / n * 50))))
+        on_status("Authoring BDMV (simulated)..."); on_progress(70)
+        self._sleep_steps(1, 0.4, lambda i: None)
+        return PreparedImage("sim", work_dir, title="Blu-ray", burn_start=70)
+    def write(self, prepared: PreparedImage, device: str, speed: any,
+              on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
+              verify: bool = False, auto_blank: bool = True, eject_after: bool = True, dummy: bool = False,
+              verify_mode: str = "full", samples: int = 256):
+        if self.runner.cancelled: raise RuntimeError("cancelled")
+        on_status(f"Burning {prepared.title} (simulated)...")
+        end = 90 if verify else 100
+        phase = Phase(on_progress, prepared.burn_start, end - prepared.burn_start)
+        self._sleep_steps(30, 0.04, lambda i: phase.emit(int((i + 1) * 100 / 30)))
+        if verify:
+            on_status("Verifying (simulated)...")
+            self._sleep_steps(10, 0.02, lambda i: on_progress(90 + i))
         if eject_after: on_status("Ejecting (simulated)...")
-        on_progress(100); on_status("Blu-ray created (simulated)")
-    def rip_cd(self, device: str, out_dir: Path, fmt: str, bitrate: int,
+        on_progress(100); on_status(f"{prepared.title} created (simulated)")
+    def verify_disc(self, device: str, on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> str:
+        on_status("Verifying files against the disc's checksums (simulated)...")
+        self._sleep_steps(20, 0.03, lambda i: on_progress(int((i + 1) * 100 / 20)))
+        return "Simulated checksum verification complete"
+    def rip_cd(self, device: str, out_dir: Path, fmt: Union[str, List[str]], bitrate: int,
                on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-               track_titles: Optional[List[str]] = None):
+               track_titles: Optional[List[str]] = None, workers: int = 0, lookup: bool = False,
+               layouts: Optional[Dict[str, str]] = None, encoder_pool: Optional[SlotPool] = None,
+               read_offset: int = 0):
         on_status("Detecting tracks (simulated)...")
         import time; time.sleep(0.2)
         tracks = 10
         for t in range(1, tracks + 1):
             on_status(f"Ripping track {t}/{tracks} (simulated)...")
             time.sleep(0.06)
-            if fmt != "WAV": time.sleep(0.04)
+            if rip_formats(fmt) != ["WAV"]: time.sleep(0.04)
             on_progress(int(5 + (t / tracks) * 95))
         on_progress(100); on_status(f"Ripped {tracks} tracks to {out_dir} (simulated)")
 class RealBackend(BackendBase):
-    def burn_data(self, files: List[Path], device: str, temp_dir: Path, volume: str, speed: any,
-                  verify: bool, on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                  auto_blank: bool = True, eject_after: bool = True, dummy: bool = False):
-        mkisofs = self.tools.require("mkisofs")
-        iso_path = temp_dir / "pyburn_data.iso"
-        verify_iso = temp_dir / "pyburn_verify.iso"  # potential readback
-        speed_val = self.media.resolve_speed(speed, device)
-        info = self.media.get_info(device)
+    def write_copies(self, prepared: PreparedImage, devices: List[str], speed: any,
+                     on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, on_device: OnDevice,
+                     verify: bool = False, auto_blank: bool = True, eject_after: bool = True,
+                     dummy: bool = False, verify_mode: str = "full", samples: int = 256) -> Dict[str, str]:
+        if prepared.kind not in ("iso", "stream"):
+            return super().write_copies(prepared, devices, speed, on_status, on_progress, on_log, on_device,
+                                        verify=verify, auto_blank=auto_blank, eject_after=eject_after, dummy=dummy,
+                                        verify_mode=verify_mode, samples=samples)
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
+        # The image is read (or mastered) once; a shared read-ahead buffer feeds
+        # one burner per drive over stdin.
+        errors: Dict[str, str] = {}
         try:
-            if auto_blank and info.get("rewritable") and info.get("blank") is False:
-                on_status("Blanking rewritable media...")
-                self.media.blank_media(device)
-            # Phase 1: ISO
-            total_in = self._file_total_size(files)
-            phase1 = Phase(on_progress, 0, 45)
-            phase1.emit(0)
-            on_status("Creating ISO image...")
-            mon = threading.Thread(target=self.verify._monitor_file_growth, args=(iso_path, max(1, total_in), phase1.emit), daemon=True)
-            mon.start()
-            self.runner.run_stream([mkisofs, "-o", str(iso_path), "-J", "-R", "-V", volume] + [str(p) for p in files],
-                                   on_stdout=on_log, on_stderr=on_log, check=True)
-            phase1.emit(100)
-            # Phase 2: Burn
-            phase2 = Phase(on_progress, 45, 50)
-            on_status("Burning ISO to disc...")
-            grow = self.tools.find("growisofs")
-            if grow:
-                self.runner.run_stream([grow, "-dvd-compat", "-Z", f"{device}={iso_path}", f"-speed={speed_val}"],
-                                       on_stdout=lambda s: (on_log(s), phase2.emit(ProgressTools.parse_growisofs(s) or 0)),
-                                       on_stderr=on_log, check=True)
+            speeds = {d: self.media.resolve_speed(speed, d) for d in devices}
+            def blank(d: str):
+                try:
+                    info = self.media.get_info(d)
+                    if auto_blank and info.get("rewritable") and info.get("blank") is False:
+                        on_device(d, "Blanking rewritable media...", 0)
+                        self.media.blank_media(d)
+                except Exception as e:
+                    errors[d] = f"Blanking failed: {e}"
+            self._each(devices, blank)
+            live = [d for d in devices if d not in errors]
+            if not live:
+                raise RuntimeError("No drive is ready to burn")
+            if prepared.kind == "stream":
+                size = prepared.sectors * 2048
             else:
-                rec = self.tools.require("cdrecord")
-                cmd = [rec, f"dev={device}", f"speed={speed_val}", "-v", "-dao"]
-                if dummy: cmd.append("-dummy")
-                cmd.append(str(iso_path))
-                self.runner.run_stream(cmd, on_stdout=lambda s: (on_log(s), phase2.emit(ProgressTools.parse_cdrecord(s) or 0)),
-                                       on_stderr=lambda s: (on_log(s), phase2.emit(ProgressTools.parse_cdrecord(s) or 0)), check=True)
-            phase2.emit(100)
-            # Verification
-            ok = True
+                size = prepared.image.stat().st_size
+            sectors = (size + 2047) // 2048
+            end = 95 if verify else 100
+            phase = Phase(on_progress, prepared.burn_start, end - prepared.burn_start)
+            digest = hashlib.sha256()
+            sampled = SampleSet(size, samples) if verify and verify_mode != "full" else None
+            sent = [0, -1]
+            def tap(chunk: bytes):
+                digest.update(chunk)
+                if sampled:
+                    sampled.feed(sent[0], chunk)
+                sent[0] += len(chunk)
+                p = int(sent[0] * 100 / max(1, size))
+                if p != sent[1]:
+                    sent[1] = p
+                    phase.emit(p)
+            parse = ProgressTools.parse_growisofs if self.tools.find("growisofs") else ProgressTools.parse_cdrecord
+            def line(i: int, s: str):
+                on_log(f"[{live[i]}] {s}")
+                p = parse(s)
+                if p is not None:
+                    on_device(live[i], "", p)
+            consumers = [self._burn_cmd(d, speeds[d], "/dev/stdin", dummy, sectors, prepared.dvd_compat) for d in live]
+            for d in live:
+                on_device(d, "Burning...", 0)
+            on_status(f"Burning {prepared.title} on {len(live)} drives...")
+            source = open(prepared.image, "rb") if prepared.kind == "iso" else None
+            try:
+                codes = self.runner.run_pipeline(prepared.stream_args if source is None else None, consumers, source=source,
+                                                 on_chunk=tap, on_stderr=on_log, on_consumer_line=line,
+                                                 tolerate_consumer_failure=True, check=True)
+            finally:
+                if source: source.close()
+            if self.runner.cancelled:
+                raise RuntimeError("cancelled")
+            if sent[0] != size:
+                raise RuntimeError(f"Read {sent[0]} bytes of a {size} byte image")
+            for d, code in zip(live, codes):
+                if code != 0:
+                    errors[d] = f"Burner exited with code {code}"
+                    on_device(d, f"Failed: {errors[d]}", 0)
+            burned = [d for d in live if d not in errors]
             if verify:
-                on_status("Verifying disc...")
-                ok = self.verify.verify(iso_path, device, temp_dir, on_status, on_log, Phase(on_progress, 95, 5).emit)
+                on_status("Verifying discs...")
+                def check(d: str):
+                    if sampled and (verify_mode == "sampled" or d != burned[0]):
+                        ok = self.verify.verify_sampled(d, sampled, lambda s: on_device(d, s, 100),
+                                                        lambda s: on_log(f"[{d}] {s}"), lambda p: None)
+                    else:
+                        ok = self.verify.verify_digest(d, size, digest.hexdigest(), lambda s: on_device(d, s, 100),
+                                                       lambda s: on_log(f"[{d}] {s}"), lambda p: None)
+                    if not ok:
+                        errors[d] = "Verification failed"
+                self._each(burned, check)
+            for d in burned:
+                if d not in errors:
+                    on_device(d, "Done", 100)
             on_progress(100)
-            if not ok:
-                raise RuntimeError("Data disc verification failed.")
-            on_status("Data disc burned successfully")
+            return errors
         finally:
-            try: iso_path.unlink(missing_ok=True)
-            except Exception: pass
-            try: verify_iso.unlink(missing_ok=True)
-            except Exception: pass
             if eject_after:
-                self.media.eject(device)
+                for d in devices:
+                    self.media.eject(d)
+    def _image_sectors(self, mkisofs: str, args: List[str], on_log: OnLog) -> int:
+        out: List[str] = []
+        err: List[str] = []
+        self.runner.run_stream([mkisofs, "-quiet", "-print-size"] + args,
+                               on_stdout=out.append, on_stderr=lambda s: (err.append(s), on_log(s)), check=True)
+        for ln in reversed(out):
+            if ln.strip().isdigit():
+                return int(ln.strip())
+        m = re.search(r"scheduled to be written\s*=\s*(\d+)", "\n".join(err))
+        if m:
+            return int(m.group(1))
+        raise RuntimeError("mkisofs -print-size returned no size")
+    def _burn_cmd(self, device: str, speed_val: int, src: str, dummy: bool = False, sectors: Optional[int] = None,
+                  dvd_compat: bool = True, multi: bool = False) -> List[str]:
+        grow = self.tools.find("growisofs")
+        if grow:
+            cmd = [grow, "-Z", f"{device}={src}", f"-speed={speed_val}"]
+            if dvd_compat: cmd.insert(1, "-dvd-compat")
+            if sectors: cmd.insert(1, f"-use-the-force-luke=tracksize:{sectors}")
+            return cmd
+        rec = self.tools.require("cdrecord")
+        cmd = [rec, f"dev={device}", f"speed={speed_val}", "-v", "-dao"]
+        if sectors: cmd.append(f"tsize={sectors}s")
+        if dummy: cmd.append("-dummy")
+        if multi: cmd.append("-multi")
+        cmd.append(src)
+        return cmd
+    def _master_iso(self, cmd: List[str], iso_path: Path, total: int, emit: Callable[[int], None], on_log: OnLog) -> str:
+        # mkisofs writes to stdout; the image is saved and hashed in the same pass,
+        # so verification only has to read the disc.
+        digest = hashlib.sha256()
+        written = [0, -1]
+        with open(iso_path, "wb") as out:
+            def take(chunk: bytes):
+                out.write(chunk)
+                digest.update(chunk)
+                written[0] += len(chunk)
+                pct = int(written[0] * 100 / max(1, total))
+                if pct != written[1]:
+                    written[1] = pct
+                    emit(pct)
+            self.runner.run_pipeline(cmd, [], on_chunk=take, on_stderr=on_log, check=True)
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
+        return digest.hexdigest()
+    def _link_source(self, src: Path, dest: Path):
+        try:
+            os.link(src, dest)
+        except OSError:
+            os.symlink(os.path.abspath(src), dest)  # other filesystem; cleanup removes only the link
+    def _fresh_dir(self, work_dir: Path) -> Path:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        return work_dir
+    def prepare_data(self, files: List[Path], work_dir: Path, volume: str,
+                     on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, stream: bool = False,
+                     span: Optional[Dict] = None, checksums: Optional[str] = None) -> PreparedImage:
+        mkisofs = self.tools.require("mkisofs")
+        self._fresh_dir(work_dir)
+        title = _span_title(span)
+        cancelled = lambda: self.runner.cancelled
+        iso_path = work_dir / "pyburn_data.iso"
+        key = None
+        if not span and not stream:
+            key = self._cache_key("data-iso", files, ["-J", "-R", "-V", volume, checksums] + [str(p) for p in files])
+            if self._from_cache(key, iso_path, on_log):
+                on_progress(45)
+                return PreparedImage("iso", work_dir, image=iso_path, title=title, burn_start=45)
+        if span:
+            on_status(f"Collecting files for {title.lower()}...")
+            grafts, parts = disc_grafts(span, work_dir, cancelled)
+            if parts:
+                on_log(f"Cut {parts} bytes of split files into {work_dir / 'span_chunks'}")
+        else:
+            grafts = [("", str(p)) for p in files]
+        total_in = span["bytes"] if span else self._file_total_size(files)
+        start = 0
+        if checksums:
+            # mkisofs lays out every file before writing, so the list is complete before mastering starts.
+            on_status(f"Computing {checksums} checksums...")
+            start = 15
+            sums_phase = Phase(on_progress, 0, start)
+            done = [0]
+            def hashed(n: int):
+                done[0] += n
+                sums_phase.emit(int(done[0] * 100 / max(1, total_in)))
+            sums = work_dir / SUMS_NAME
+            listed = [g for g in grafts if g[0] != INDEX_NAME]
+            count = write_sums(graft_files(listed), sums, checksums, cancelled, hashed)
+            on_log(f"{SUMS_NAME}: {count} files ({checksums})")
+            grafts.append((SUMS_NAME, str(sums)))
+        if span or checksums:
+            iso_args = ["-J", "-R", "-V", volume, "-graft-points", "-path-list",
+                        str(write_pathlist(grafts, work_dir / "pyburn_paths.txt"))]
+        else:
+            iso_args = ["-J", "-R", "-V", volume] + [str(p) for p in files]
+        if stream:
+            on_status("Sizing image...")
+            sectors = self._image_sectors(mkisofs, iso_args, on_log)
+            on_log(f"Image will be streamed: {sectors * 2048} bytes ({sectors} sectors)")
+            return PreparedImage("stream", work_dir, sectors=sectors, stream_args=[mkisofs] + iso_args,
+                                 title=title, burn_start=start)
+        phase1 = Phase(on_progress, start, 45 - start)
+        phase1.emit(0)
+        on_status("Creating ISO image...")
+        digest = self._master_iso([mkisofs] + iso_args, iso_path, total_in, phase1.emit, on_log)
+        phase1.emit(100)
+        self._to_cache(key, iso_path, on_log)
+        return PreparedImage("iso", work_dir, image=iso_path, title=title, burn_start=45, sha256=digest)
+    def prepare_session(self, files: List[Path], work_dir: Path, volume: str, backup_set: str, job_id: str,
+                        on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, full: bool = False) -> PreparedImage:
+        # Diffs the selection against the set's manifest and grafts only new or
+        # changed files; the session itself is mastered while it burns.
+        mkisofs = self.tools.require("mkisofs")
+        if self.manifest is None:
+            raise RuntimeError("No backup manifest configured")
+        self._fresh_dir(work_dir)
+        cancelled = lambda: self.runner.cancelled
+        on_status(f"Comparing with backup set {backup_set}...")
+        on_progress(2)
+        delta = self.manifest.diff(backup_set, files, job_id, volume, full=full, cancelled=cancelled)
+        title = f"Backup session ({backup_set})"
+        if delta.previous:
+            on_log(f"{delta.files} new or changed files ({delta.bytes} bytes) since session {delta.previous}; "
+                   f"{delta.removed} files no longer in the selection stay on disc")
+        else:
+            on_log(f"Starting backup set {backup_set} on a fresh disc: {delta.files} files ({delta.bytes} bytes)")
+        if not delta.files:
+            self.manifest.discard(delta.session)
+            on_progress(20)
+            return PreparedImage("empty", work_dir, title=title, burn_start=20)
+        on_status(f"Hashing {delta.files} files...")
+        phase = Phase(on_progress, 5, 15)
+        done = [0]
+        def hashed(size: int):
+            done[0] += size
+            phase.emit(int(done[0] * 100 / max(1, delta.bytes)))
+        self.manifest.hash_staged(delta.session, hashed, cancelled)
+        path_list = work_dir / "session_paths.txt"
+        with open(path_list, "w", encoding="utf-8") as f:
+            for src, rel, _ in self.manifest.staged(delta.session):
+                f.write(f"{escape_graft(rel)}={escape_graft(src)}\n")
+        args = [mkisofs, "-J", "-R", "-V", volume, "-graft-points", "-path-list", str(path_list)]
+        return PreparedImage("session", work_dir, stream_args=args, title=title, burn_start=20,
+                             session=delta.session, append=bool(delta.previous), dvd_compat=False)
+    def _msinfo(self, device: str, on_log: OnLog) -> str:
+        out: List[str] = []
+        self.runner.run_stream([self.tools.require("cdrecord"), f"dev={device}", "-msinfo"],
+                               on_stdout=out.append, on_stderr=on_log, check=True)
+        for ln in reversed(out):
+            if re.fullmatch(r"\s*\d+,\d+\s*", ln):
+                return ln.strip()
+        raise RuntimeError("Could not read the last session (cdrecord -msinfo); is the disc still appendable?")
+    def _write_session(self, prepared: PreparedImage, device: str, speed_val: int, phase: Phase,
+                       on_status: OnStatus, on_log: OnLog, dummy: bool):
+        mkisofs, args = prepared.stream_args[0], prepared.stream_args[1:]
+        on_status("Appending backup session..." if prepared.append else "Writing first backup session...")
+        grow = self.tools.find("growisofs")
+        if grow:
+            # growisofs runs mkisofs itself and adds -C/-M for an appended session.
+            cmd = [grow, "-M" if prepared.append else "-Z", device, f"-speed={speed_val}"] + args
+            self.runner.run_stream(cmd, on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_growisofs(s) or 0)),
+                                   on_stderr=lambda s: (on_log(s), phase.emit(ProgressTools.parse_growisofs(s) or 0)), check=True)
+            return
+        if prepared.append:
+            args = ["-C", self._msinfo(device, on_log), "-M", device] + args
+        sectors = self._image_sectors(mkisofs, args, on_log)
+        sent = [0]
+        def tap(chunk: bytes):
+            sent[0] += len(chunk)
+            phase.emit(int(sent[0] * 100 / max(1, sectors * 2048)))
+        self.runner.run_pipeline([mkisofs] + args, [self._burn_cmd(device, speed_val, "/dev/stdin", dummy, sectors, multi=True)],
+                                 on_chunk=tap, on_stderr=on_log, on_consumer_line=lambda _i, s: on_log(s), check=True)
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
     def _write_cdtext_toc(self, temp_audio: Path, n: int,
                           album_title: Optional[str], album_performer: Optional[str],
-                          track_titles: Optional[List[str]], track_performers: Optional[List[str]]) -> Path:
+                          track_titles: Optional[List[str]], track_performers: Optional[List[str]],
+                          lengths: Optional[List[int]] = None) -> Path:
+        # With `lengths` (frames per track) every track is read from stdin instead of a track_XX.wav.
         toc = temp_audio / "cd.toc"
         with open(toc, "w", encoding="utf-8") as f:
             f.write("CD_DA\n\n")
@@ -189,192 +604,552 @@ class RealBackend(BackendBase):
                     if performer:
                         f.write(f'  LANGUAGE 0 {{"PERFORMER"="{performer}"}}\n')
                     f.write("}\n")
-                f.write(f'FILE "track_{i:02d}.wav" 0\n\n')
+                if lengths:
+                    f.write(f'FILE "-" 0 {msf(lengths[i-1])}\n\n')
+                else:
+                    f.write(f'FILE "track_{i:02d}.wav" 0\n\n')
         return toc
-    def burn_audio(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                   on_status: OnStatus, on_progress: OnProgress, on_log: OnLog, eject_after: bool = True,
-                   album_title: Optional[str] = None, album_performer: Optional[str] = None,
-                   track_titles: Optional[List[str]] = None, track_performers: Optional[List[str]] = None):
+    def _stream_tracks(self, files: List[Path], ffmpeg: str, speed: any,
+                       on_status: OnStatus, on_log: OnLog) -> Optional[List[tuple]]:
+        # (source, frames, CD format) per track when decoding can feed cdrdao live, None to stage WAVs.
+        # The TOC needs every length up front, and ffmpeg has to decode well ahead of the write speed:
+        # a stall mid-track would underrun the burner.
+        on_status("Checking decoder speed for streaming...")
+        infos = probe([str(f) for f in files], self.tools.find("ffprobe"), probe_cache(None))
+        tracks = []
+        for f in files:
+            info = infos.get(str(f))
+            if info is None:
+                on_log(f"Length of {f.name} is unknown; streaming needs every track length for the TOC")
+                return None
+            tracks.append((f, info.frames, is_cdda(info)))
+        write_x = int(speed) if str(speed).isdigit() else STREAM_AUDIO_MAX_SPEED
+        need = write_x * STREAM_AUDIO_HEADROOM
+        tried = set()
+        for f, frames, _ in tracks:
+            suffix = f.suffix.lower()
+            if suffix in tried:
+                continue
+            tried.add(suffix)
+            sample = min(20.0, frames / 75)
+            t0 = time.monotonic()
+            try:
+                self.runner.run_stream([ffmpeg, "-nostdin", "-v", "error", "-t", f"{sample:.2f}", "-i", str(f), "-f", "null", "-"],
+                                       on_stderr=on_log, check=True)
+            except Exception as e:
+                on_log(f"Test decode of {f.name} failed ({e})")
+                return None
+            if self.runner.cancelled:
+                raise RuntimeError("cancelled")
+            rate = sample / max(1e-6, time.monotonic() - t0)
+            on_log(f"{suffix or f.name} decodes at {rate:.0f}x realtime; {write_x}x burning needs {need:.0f}x")
+            if rate < need:
+                on_log("Decoder too slow to feed the burner; falling back to staged WAVs")
+                return None
+        on_log(f"Streaming {len(tracks)} tracks into cdrdao without temp WAVs")
+        return tracks
+    def prepare_audio(self, files: List[Path], work_dir: Path,
+                      on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
+                      album_title: Optional[str] = None, album_performer: Optional[str] = None,
+                      track_titles: Optional[List[str]] = None, track_performers: Optional[List[str]] = None,
+                      workers: int = 0, stream: bool = False, speed: any = "Auto") -> PreparedImage:
         ffmpeg = self.tools.require("ffmpeg")
-        cdrdao = self.tools.require("cdrdao")
-        speed_val = self.media.resolve_speed(speed, device)
-        temp_audio = temp_dir / "audio_cd"
-        shutil.rmtree(temp_audio, ignore_errors=True)
-        temp_audio.mkdir(exist_ok=True)
-        try:
-            n = max(1, len(files))
-            for idx, src in enumerate(files, start=1):
-                on_status(f"Converting track {idx}/{n}...")
-                wav = temp_audio / f"track_{idx:02d}.wav"
-                self.runner.run_stream([ffmpeg, "-y", "-i", str(src), "-ar", "44100", "-ac", "2", "-sample_fmt", "s16", str(wav)],
-                                       on_stdout=on_log, on_stderr=on_log, check=True)
-                on_progress(5 + int((idx / n) * 35))
-            toc = self._write_cdtext_toc(temp_audio, n, album_title, album_performer, track_titles, track_performers)
-            on_status("Burning audio CD...")
-            phase = Phase(on_progress, 40, 60)
-            self.runner.run_stream([cdrdao, "write", "--device", device, "--speed", str(speed_val), toc.name],
-                                   cwd=str(temp_audio),
-                                   on_stdout=lambda s: (on_log(s), phase.emit(70)),
-                                   on_stderr=lambda s: (on_log(s), phase.emit(90)), check=True)
-            phase.emit(100)
-            on_progress(100); on_status("Audio CD created successfully")
-        finally:
-            try: shutil.rmtree(temp_audio, ignore_errors=True)
-            except Exception: pass
-            if eject_after:
-                self.media.eject(device)
-    def burn_video_dvd(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                       on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                       auto_blank: bool = True, eject_after: bool = True):
+        self.tools.require("cdrdao")
+        temp_audio = self._fresh_dir(work_dir)
+        n = max(1, len(files))
+        if stream:
+            tracks = self._stream_tracks(files, ffmpeg, speed, on_status, on_log)
+            if tracks is not None:
+                toc = self._write_cdtext_toc(temp_audio, n, album_title, album_performer, track_titles, track_performers,
+                                             lengths=[t[1] for t in tracks])
+                on_progress(10)
+                return PreparedImage("audio", work_dir, toc=toc, title="Audio CD", burn_start=10, tracks=tracks)
+            on_status("Staging track WAVs instead of streaming...")
+        # Tracks convert on a bounded pool of ffmpeg processes; each writes its own
+        # track_XX.wav, so the TOC order never depends on which finishes first.
+        pool_size = max(1, min(workers or os.cpu_count() or 2, n))
+        phase = Phase(on_progress, 5, 35)
+        done = [0.0] * len(files)
+        lock = threading.Lock()
+        last = [-1]
+        failed: List[BaseException] = []
+        def report(i: int, frac: float):
+            with lock:
+                done[i] = frac
+                pct = int(sum(done) * 100 / n)
+                if pct != last[0]:
+                    last[0] = pct
+                    phase.emit(pct)
+        def convert(i: int):
+            if failed or self.runner.cancelled:
+                return
+            src, wav = files[i], temp_audio / f"track_{i + 1:02d}.wav"
+            info = header_info(str(src))
+            if is_cdda_wav(info):
+                # Already CD-DA: cdrdao reads the source itself through a link.
+                self._link_source(src, wav)
+                on_log(f"[track {i + 1:02d}] {src.name} is 44.1 kHz/16-bit stereo PCM; used as is")
+                report(i, 1.0)
+                return
+            # Sources already at 44.1 kHz/16-bit stereo (e.g. FLAC) only need decoding.
+            conv = ["-c:a", "pcm_s16le"] if is_cdda(info) else ["-ar", "44100", "-ac", "2", "-sample_fmt", "s16"]
+            key = self._cache_key("cdda-wav", [src], conv)
+            if not self._from_cache(key, wav, on_log):
+                duration = [0.0]
+                def err(line: str):
+                    on_log(f"[track {i + 1:02d}] {line}")
+                    d = ProgressTools.parse_ffmpeg_duration(line)
+                    if d:
+                        duration[0] = d
+                def out(line: str):
+                    t = ProgressTools.parse_ffmpeg_time(line)
+                    if t is not None and duration[0]:
+                        report(i, min(1.0, t / duration[0]))
+                try:
+                    self.runner.run_stream([ffmpeg, "-y", "-nostdin", "-nostats", "-progress", "pipe:1", "-i", str(src)] + conv + [str(wav)],
+                                           on_stdout=out, on_stderr=err, check=True)
+                except Exception as e:
+                    failed.append(e)
+                    raise
+                if self.runner.cancelled:
+                    return
+                self._to_cache(key, wav, on_log)
+            report(i, 1.0)
+        on_status(f"Converting {len(files)} tracks ({pool_size} at a time)...")
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="pyburn-ffmpeg") as pool:
+            futures = [pool.submit(convert, i) for i in range(len(files))]
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
+        for i, f in enumerate(futures):
+            if f.exception() is not None:
+                raise RuntimeError(f"Converting track {i + 1} ({files[i].name}) failed: {f.exception()}")
+        toc = self._write_cdtext_toc(temp_audio, n, album_title, album_performer, track_titles, track_performers)
+        return PreparedImage("audio", work_dir, toc=toc, title="Audio CD", burn_start=40)
+    def prepare_video_dvd(self, files: List[Path], work_dir: Path,
+                          on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> PreparedImage:
         ffmpeg = self.tools.require("ffmpeg")
         dvdauthor = self.tools.require("dvdauthor")
         mkisofs = self.tools.require("mkisofs")
-        grow = self.tools.find("growisofs")
-        speed_val = self.media.resolve_speed(speed, device)
-        info = self.media.get_info(device)
-        dvd_temp = temp_dir / "dvd_temp"
-        shutil.rmtree(dvd_temp, ignore_errors=True)
-        dvd_temp.mkdir(exist_ok=True)
-        try:
-            if auto_blank and info.get("rewritable") and info.get("blank") is False:
-                on_status("Blanking rewritable media..."); self.media.blank_media(device)
-            mpegs: List[Path] = []
-            n = max(1, len(files))
-            for idx, src in enumerate(files, start=1):
-                on_status(f"Transcoding video {idx}/{n}...")
-                mpg = dvd_temp / f"title_{idx:02d}.mpg"
-                self.runner.run_stream([ffmpeg, "-y", "-i", str(src), "-target", "pal-dvd", "-aspect", "16:9", str(mpg)],
-                                       on_stdout=on_log, on_stderr=on_log, check=True)
-                mpegs.append(mpg)
-                on_progress(10 + int((idx / n) * 50))
-            on_status("Authoring DVD structure...")
-            xml = dvd_temp / "author.xml"
-            with open(xml, "w", encoding="utf-8") as f:
-                f.write("<dvdauthor>\n  <vmgm />\n  <titleset>\n    <titles>\n      <pgc>\n")
-                for m in mpegs:
-                    f.write(f'        <vob file="{m}" />\n')
-                f.write("      </pgc>\n    </titles>\n  </titleset>\n</dvdauthor>\n")
-            dvd_dir = dvd_temp / "DVD_ROOT"
-            self.runner.run_stream([dvdauthor, "-o", str(dvd_dir), "-x", str(xml)], on_stdout=on_log, on_stderr=on_log, check=True)
-            on_progress(70)
-            on_status("Creating ISO...")
-            iso = dvd_temp / "dvd.iso"
-            self.runner.run_stream([mkisofs, "-dvd-video", "-o", str(iso), str(dvd_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
+        dvd_temp = self._fresh_dir(work_dir)
+        enc = ["-target", "pal-dvd", "-aspect", "16:9"]
+        iso = dvd_temp / "dvd.iso"
+        iso_key = self._cache_key("dvd-iso", files, enc)
+        if self._from_cache(iso_key, iso, on_log):
             on_progress(85)
-            on_status("Burning DVD...")
-            phase = Phase(on_progress, 85, 15)
-            if grow:
-                self.runner.run_stream([grow, "-dvd-compat", "-Z", f"{device}={iso}", f"-speed={speed_val}"],
-                                       on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_growisofs(s) or 0)),
-                                       on_stderr=on_log, check=True)
-            else:
-                rec = self.tools.require("cdrecord")
-                self.runner.run_stream([rec, f"dev={device}", f"speed={speed_val}", "-v", "-dao", str(iso)],
-                                       on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_cdrecord(s) or 0)),
-                                       on_stderr=lambda s: (on_log(s), phase.emit(ProgressTools.parse_cdrecord(s) or 0)), check=True)
-            phase.emit(100)
-            on_progress(100); on_status("Video DVD created successfully")
-        finally:
-            try: shutil.rmtree(dvd_temp, ignore_errors=True)
-            except Exception: pass
-            if eject_after:
-                self.media.eject(device)
-    def burn_video_bd(self, files: List[Path], device: str, temp_dir: Path, speed: any,
-                      on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-                      auto_blank: bool = True, eject_after: bool = True):
+            return PreparedImage("iso", work_dir, image=iso, title="Video DVD", burn_start=85)
+        mpegs: List[Path] = []
+        n = max(1, len(files))
+        for idx, src in enumerate(files, start=1):
+            on_status(f"Transcoding video {idx}/{n}...")
+            mpg = dvd_temp / f"title_{idx:02d}.mpg"
+            key = self._cache_key("dvd-title", [src], enc)
+            if not self._from_cache(key, mpg, on_log):
+                self.runner.run_stream([ffmpeg, "-y", "-i", str(src)] + enc + [str(mpg)],
+                                       on_stdout=on_log, on_stderr=on_log, check=True)
+                self._to_cache(key, mpg, on_log)
+            mpegs.append(mpg)
+            on_progress(10 + int((idx / n) * 50))
+        on_status("Authoring DVD structure...")
+        xml = dvd_temp / "author.xml"
+        with open(xml, "w", encoding="utf-8") as f:
+            f.write("<dvdauthor>\n  <vmgm />\n  <titleset>\n    <titles>\n      <pgc>\n")
+            for m in mpegs:
+                f.write(f'        <vob file="{m}" />\n')
+            f.write("      </pgc>\n    </titles>\n  </titleset>\n</dvdauthor>\n")
+        dvd_dir = dvd_temp / "DVD_ROOT"
+        self.runner.run_stream([dvdauthor, "-o", str(dvd_dir), "-x", str(xml)], on_stdout=on_log, on_stderr=on_log, check=True)
+        on_progress(70)
+        on_status("Creating ISO...")
+        self.runner.run_stream([mkisofs, "-dvd-video", "-o", str(iso), str(dvd_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
+        self._to_cache(iso_key, iso, on_log)
+        on_progress(85)
+        return PreparedImage("iso", work_dir, image=iso, title="Video DVD", burn_start=85)
+    def prepare_video_bd(self, files: List[Path], work_dir: Path,
+                         on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> PreparedImage:
         ffmpeg = self.tools.require("ffmpeg")
         tsmuxer = self.tools.find("tsMuxeR")
         mkisofs = self.tools.find("mkisofs") or self.tools.find("xorriso")
-        grow = self.tools.find("growisofs")
+        bd_temp = self._fresh_dir(work_dir)
+        enc = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20",
+               "-c:a", "ac3", "-b:a", "192k", "-pix_fmt", "yuv420p", "-f", "mpegts"]
+        iso = bd_temp / "bd.iso"
+        iso_key = self._cache_key("bd-iso", files, enc + [mkisofs or ""])
+        if self._from_cache(iso_key, iso, on_log):
+            on_progress(85)
+            return PreparedImage("iso", work_dir, image=iso, title="Blu-ray", burn_start=85, dvd_compat=False)
+        ts_files: List[Path] = []
+        n = max(1, len(files))
+        for idx, src in enumerate(files, start=1):
+            on_status(f"Transcoding video {idx}/{n} for BDMV...")
+            ts = bd_temp / f"clip_{idx:02d}.ts"
+            key = self._cache_key("bd-clip", [src], enc)
+            if not self._from_cache(key, ts, on_log):
+                self.runner.run_stream([ffmpeg, "-y", "-i", str(src)] + enc + [str(ts)],
+                                       on_stdout=on_log, on_stderr=on_log, check=True)
+                self._to_cache(key, ts, on_log)
+            ts_files.append(ts)
+            on_progress(10 + int((idx / n) * 50))
+        if not tsmuxer:
+            raise RuntimeError("tsMuxeR not found; cannot author BDMV")
+        on_status("Authoring BDMV with tsMuxeR...")
+        meta = bd_temp / "meta.bd"
+        with open(meta, "w", encoding="utf-8") as f:
+            f.write("MUXOPT --no-pcr-on-video-pid --new-audio-pes --blu-ray --vbr --auto-chapters=10\n")
+            for ts in ts_files:
+                f.write(f"V_MPEG4/ISO/AVC, {ts}, fps=25, insertSEI, contSPS\n")
+                f.write(f"A_AC3, {ts}, track=2\n")
+        bdmv_dir = bd_temp / "BDMV_OUT"
+        self.runner.run_stream([tsmuxer, str(meta), str(bdmv_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
+        on_progress(70)
+        on_status("Creating ISO...")
+        if mkisofs and "xorriso" not in mkisofs:
+            self.runner.run_stream([mkisofs, "-udf", "-o", str(iso), str(bdmv_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
+        else:
+            x = self.tools.require("xorriso")
+            self.runner.run_stream([x, "-outdev", str(iso), "-blank", "as_needed", "-map", str(bdmv_dir), "/"], on_stdout=on_log, on_stderr=on_log, check=True)
+        self._to_cache(iso_key, iso, on_log)
+        on_progress(85)
+        return PreparedImage("iso", work_dir, image=iso, title="Blu-ray", burn_start=85, dvd_compat=False)
+    def write(self, prepared: PreparedImage, device: str, speed: any,
+              on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
+              verify: bool = False, auto_blank: bool = True, eject_after: bool = True, dummy: bool = False,
+              verify_mode: str = "full", samples: int = 256):
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
+        if prepared.kind == "empty":
+            on_progress(100); on_status("Nothing changed since the last backup session")
+            return
         speed_val = self.media.resolve_speed(speed, device)
-        info = self.media.get_info(device)
-        bd_temp = temp_dir / "bd_temp"
-        shutil.rmtree(bd_temp, ignore_errors=True)
-        bd_temp.mkdir(exist_ok=True)
+        end = 95 if verify else 100
+        phase = Phase(on_progress, prepared.burn_start, end - prepared.burn_start)
         try:
-            if auto_blank and info.get("rewritable") and info.get("blank") is False:
-                on_status("Blanking rewritable media..."); self.media.blank_media(device)
-            ts_files: List[Path] = []
-            n = max(1, len(files))
-            for idx, src in enumerate(files, start=1):
-                on_status(f"Transcoding video {idx}/{n} for BDMV...")
-                ts = bd_temp / f"clip_{idx:02d}.ts"
-                self.runner.run_stream([ffmpeg, "-y", "-i", str(src), "-c:v", "libx264", "-preset", "veryfast", "-crf", "20",
-                                        "-c:a", "ac3", "-b:a", "192k", "-pix_fmt", "yuv420p", "-f", "mpegts", str(ts)],
-                                       on_stdout=on_log, on_stderr=on_log, check=True)
-                ts_files.append(ts)
-                on_progress(10 + int((idx / n) * 50))
-            if not tsmuxer:
-                raise RuntimeError("tsMuxeR not found; cannot author BDMV")
-            on_status("Authoring BDMV with tsMuxeR...")
-            meta = bd_temp / "meta.bd"
-            with open(meta, "w", encoding="utf-8") as f:
-                f.write("MUXOPT --no-pcr-on-video-pid --new-audio-pes --blu-ray --vbr --auto-chapters=10\n")
-                for ts in ts_files:
-                    f.write(f"V_MPEG4/ISO/AVC, {ts}, fps=25, insertSEI, contSPS\n")
-                    f.write(f"A_AC3, {ts}, track=2\n")
-            bdmv_dir = bd_temp / "BDMV_OUT"
-            self.runner.run_stream([tsmuxer, str(meta), str(bdmv_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
-            on_progress(70)
-            on_status("Creating ISO...")
-            iso = bd_temp / "bd.iso"
-            if mkisofs and "xorriso" not in mkisofs:
-                self.runner.run_stream([mkisofs, "-udf", "-o", str(iso), str(bdmv_dir)], on_stdout=on_log, on_stderr=on_log, check=True)
-            else:
-                x = self.tools.require("xorriso")
-                self.runner.run_stream([x, "-outdev", str(iso), "-blank", "as_needed", "-map", str(bdmv_dir), "/"], on_stdout=on_log, on_stderr=on_log, check=True)
-            on_progress(85)
-            on_status("Burning Blu-ray...")
-            if grow:
-                phase = Phase(on_progress, 85, 15)
-                self.runner.run_stream([grow, "-speed="+str(speed_val), "-Z", f"{device}={iso}"],
-                                       on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_growisofs(s) or 0)),
-                                       on_stderr=on_log, check=True)
+            if prepared.kind == "audio" and prepared.tracks:
+                cdrdao = self.tools.require("cdrdao")
+                on_status("Burning audio CD (streaming decoded audio)...")
+                total = sum(t[1] for t in prepared.tracks) * FRAME_BYTES
+                sent = [0, -1]
+                def tap(chunk: bytes):
+                    sent[0] += len(chunk)
+                    pct = int(sent[0] * 100 / max(1, total))
+                    if pct != sent[1]:
+                        sent[1] = pct
+                        phase.emit(pct)
+                feed = _PcmFeed(self.runner, self.tools.require("ffmpeg"), prepared.tracks, on_log)
+                try:
+                    self.runner.run_pipeline(None, [[cdrdao, "write", "--device", device, "--speed", str(speed_val), prepared.toc.name]],
+                                             source=feed, on_chunk=tap, on_consumer_line=lambda _i, s: on_log(s),
+                                             cwd=str(prepared.toc.parent), buffer_bytes=STREAM_AUDIO_BUFFER, check=True)
+                finally:
+                    feed.close()
+                if self.runner.cancelled:
+                    raise RuntimeError("cancelled")
                 phase.emit(100)
+                on_progress(100); on_status("Audio CD created successfully")
+                return
+            if prepared.kind == "audio":
+                cdrdao = self.tools.require("cdrdao")
+                on_status("Burning audio CD...")
+                self.runner.run_stream([cdrdao, "write", "--device", device, "--speed", str(speed_val), prepared.toc.name],
+                                       cwd=str(prepared.toc.parent),
+                                       on_stdout=lambda s: (on_log(s), phase.emit(70)),
+                                       on_stderr=lambda s: (on_log(s), phase.emit(90)), check=True)
+                phase.emit(100)
+                on_progress(100); on_status("Audio CD created successfully")
+                return
+            info = self.media.get_info(device)
+            if prepared.append and info.get("blank"):
+                raise RuntimeError("The disc is blank but this backup set already has sessions; "
+                                   "insert the set's disc or start the set over with a full backup.")
+            if auto_blank and not prepared.append and info.get("rewritable") and info.get("blank") is False:
+                on_status("Blanking rewritable media...")
+                self.media.blank_media(device)
+            digest = None
+            sampled = None
+            size = 0
+            if prepared.kind == "session":
+                self._write_session(prepared, device, speed_val, phase, on_status, on_log, dummy)
+            elif prepared.kind == "stream":
+                size = prepared.sectors * 2048
+                digest = hashlib.sha256()
+                if verify and verify_mode == "sampled":
+                    sampled = SampleSet(size, samples)
+                sent = [0, -1]
+                def tap(chunk: bytes):
+                    digest.update(chunk)
+                    if sampled:
+                        sampled.feed(sent[0], chunk)
+                    sent[0] += len(chunk)
+                    pct = int(sent[0] * 100 / max(1, size))
+                    if pct != sent[1]:
+                        sent[1] = pct
+                        phase.emit(pct)
+                on_status("Streaming image to disc...")
+                self.runner.run_pipeline(prepared.stream_args, [self._burn_cmd(device, speed_val, "/dev/stdin", dummy, prepared.sectors)],
+                                         on_chunk=tap, on_stderr=on_log, on_consumer_line=lambda _i, s: on_log(s), check=True)
+                if self.runner.cancelled:
+                    raise RuntimeError("cancelled")
+                if sent[0] != size:
+                    raise RuntimeError(f"Streamed {sent[0]} bytes but mkisofs announced {size}")
             else:
-                rec = self.tools.require("cdrecord")
-                self.runner.run_stream([rec, f"dev={device}", f"speed={speed_val}", "-v", "-dao", str(iso)],
-                                       on_stdout=lambda s: (on_log(s), None),
-                                       on_stderr=lambda s: (on_log(s), None), check=True)
-                on_progress(100)
-            on_status("Blu-ray created successfully")
+                on_status(f"Burning {prepared.title}...")
+                cmd = self._burn_cmd(device, speed_val, str(prepared.image), dummy, dvd_compat=prepared.dvd_compat)
+                if self.tools.find("growisofs"):
+                    self.runner.run_stream(cmd, on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_growisofs(s) or 0)),
+                                           on_stderr=on_log, check=True)
+                else:
+                    self.runner.run_stream(cmd, on_stdout=lambda s: (on_log(s), phase.emit(ProgressTools.parse_cdrecord(s) or 0)),
+                                           on_stderr=lambda s: (on_log(s), phase.emit(ProgressTools.parse_cdrecord(s) or 0)), check=True)
+            phase.emit(100)
+            ok = True
+            if verify and prepared.kind == "session":
+                on_log("Backup sessions are not read back; the manifest keeps each file's SHA-256")
+            elif verify:
+                on_status("Verifying disc...")
+                if verify_mode == "mixed":
+                    on_log("Verify level \"mixed\" samples only the extra copies of a multi-copy batch; a single copy is read back in full")
+                if verify_mode == "sampled" and prepared.kind in ("iso", "stream"):
+                    if sampled is None:
+                        sampled = SampleSet(prepared.image.stat().st_size, samples)
+                        sampled.load(prepared.image)
+                    ok = self.verify.verify_sampled(device, sampled, on_status, on_log, Phase(on_progress, 95, 5).emit)
+                elif digest is not None:
+                    ok = self.verify.verify_digest(device, size, digest.hexdigest(), on_status, on_log, Phase(on_progress, 95, 5).emit)
+                else:
+                    ok = self.verify.verify(prepared.image, device, prepared.work_dir, on_status, on_log, Phase(on_progress, 95, 5).emit,
+                                            expected=prepared.sha256)
+            on_progress(100)
+            if not ok:
+                raise RuntimeError(f"{prepared.title} verification failed.")
+            on_status(f"{prepared.title} burned successfully")
         finally:
-            try: shutil.rmtree(bd_temp, ignore_errors=True)
-            except Exception: pass
             if eject_after:
                 self.media.eject(device)
-    def rip_cd(self, device: str, out_dir: Path, fmt: str, bitrate: int,
+    def verify_disc(self, device: str, on_status: OnStatus, on_progress: OnProgress, on_log: OnLog) -> str:
+        # Checks every file on the disc against its embedded PYBURN_SUMS.TXT; no source files needed.
+        if not os.access(device, os.R_OK):
+            raise RuntimeError(f"Cannot read {device}; check the disc is inserted and the device is readable")
+        on_status("Verifying files against the disc's checksums...")
+        res = verify_sums(device, on_progress, on_log, lambda: self.runner.cancelled)
+        rate = res.bytes / 1e6 / max(1e-6, res.seconds)
+        on_log(f"Read {res.bytes} bytes in {res.seconds:.1f}s ({rate:.1f} MB/s)")
+        if not res.ok:
+            for p in res.missing:
+                on_log(f"Missing on disc: {p}")
+            raise RuntimeError(f"{len(res.bad)} corrupt and {len(res.missing)} missing of "
+                               f"{res.checked + len(res.missing)} files")
+        on_progress(100)
+        return f"All {res.checked} files match their checksums ({rate:.1f} MB/s)"
+    def rip_cd(self, device: str, out_dir: Path, fmt: Union[str, List[str]], bitrate: int,
                on_status: OnStatus, on_progress: OnProgress, on_log: OnLog,
-               track_titles: Optional[List[str]] = None):
+               track_titles: Optional[List[str]] = None, workers: int = 0, lookup: bool = False,
+               layouts: Optional[Dict[str, str]] = None, encoder_pool: Optional[SlotPool] = None,
+               read_offset: int = 0):
+        # One cdparanoia run reads every track back to back; the stream is cut into
+        # tracks by the TOC and each track is piped into its own lame/flac while the
+        # drive reads on; with several formats the same chunks feed one encoder per
+        # format, within `encoder_pool`, the cap shared with rips on other drives.
+        # Nothing passes through an intermediate WAV. A journal in
+        # out_dir lets a rerun skip tracks that were already ripped. Each track's
+        # AccurateRip and CRC-32 checksums are taken on the way past and checked
+        # against the local database; the verdict is returned for the history.
+        # `read_offset` is the drive's read offset in samples, corrected by
+        # cdparanoia so the checksums match other drives' rips.
         cdparanoia = self.tools.require("cdparanoia")
-        p = subprocess.run([cdparanoia, "-Q", "-d", device], capture_output=True, text=True)
-        import re
-        lines = (p.stdout or "") + "\n" + (p.stderr or "")
-        tracks = max(1, len(re.findall(r"^\s*\d+\.\s+\d+:\d{2}\.\d{2}", lines, re.MULTILINE)))
+        toc = read_toc(cdparanoia, device)
+        tracks = len(toc.tracks)
+        on_log(f"TOC: {tracks} tracks, {toc.leadout - toc.tracks[0].start} sectors")
+        if lookup and not track_titles:
+            md = musicbrainz_lookup(self.tools, device, toc=toc, client=self.metadata)
+            if md and md.get("tracks"):
+                track_titles = md["tracks"]
+                on_log(f"MusicBrainz: {md.get('album')} ({len(track_titles)} titles)")
+        formats = rip_formats(fmt)
+        encoders: Dict[str, str] = {}
+        for f in formats:
+            if f == "MP3":
+                encoders[f] = self.tools.require("lame")
+            elif f == "FLAC":
+                encoders[f] = self.tools.require("flac")
+        wavs = [f for f in formats if f not in encoders]
+        journal = RipJournal(out_dir / f".pyburn_rip_{disc_id(toc)}.json",
+                             {"formats": formats, "bitrate": bitrate if "MP3" in formats else None,
+                              "layouts": {f: (layouts or {}).get(f) for f in formats}, "read_offset": read_offset})
+        done = {t.number for t in toc.tracks if journal.complete(t)}
+        todo = next((i for i, t in enumerate(toc.tracks) if t.number not in done), None)
+        def accuracy() -> Optional[str]:
+            if self.checksums is None:
+                return None
+            found = {int(k): (e.get("ar1"), e.get("ar2"), e.get("crc", 0)) for k, e in journal.tracks.items()}
+            summary, lines = check_rip(self.checksums, toc, found)
+            for ln in lines:
+                on_log(ln)
+            return summary
+        if todo is None:
+            summary = accuracy()
+            journal.remove()
+            on_status(f"All {tracks} tracks were already ripped to {out_dir}")
+            on_progress(100)
+            return summary
+        if done:
+            on_log(f"Resuming at track {toc.tracks[todo].number}; {len(done)} tracks already ripped")
+        part = DiscToc(toc.tracks[todo:])  # read from the first unfinished track to the end
         on_progress(5)
-        for t in range(1, tracks + 1):
-            on_status(f"Ripping track {t}/{tracks}...")
-            wav = out_dir / f"track_{t:02d}.wav"
-            phase = Phase(on_progress, 5 + int((t - 1) * (90 / tracks)), int(40 / tracks))
-            self.runner.run_stream([cdparanoia, "-d", device, str(t), str(wav)],
-                                   on_stdout=lambda s: (on_log(s), None),
-                                   on_stderr=lambda s: (on_log(s), phase.emit(ProgressTools.parse_cdparanoia(s) or 0)), check=True)
-            out_name = f"{t:02d} - {track_titles[t-1] if track_titles and t-1 < len(track_titles) else f'Track {t}'}"
-            fmtu = fmt.upper()
-            if fmtu == "MP3":
-                lame = self.tools.require("lame")
-                self.runner.run_stream([lame, "-b", str(bitrate), str(wav), str(out_dir / f"{out_name}.mp3")],
-                                       on_stdout=on_log, on_stderr=on_log, check=True)
-                try: wav.unlink()
-                except Exception: pass
-            elif fmtu == "FLAC":
-                flac = self.tools.require("flac")
-                self.runner.run_stream([flac, "-8", str(wav), "-o", str(out_dir / f"{out_name}.flac")],
-                                       on_stdout=on_log, on_stderr=on_log, check=True)
-                try: wav.unlink()
-                except Exception: pass
+        index = {t.number: i for i, t in enumerate(toc.tracks)}
+        # Extraction and encoding each carry half of the 5..100 range (all of it for WAV only).
+        ripped = [1.0 if t.number in done else 0.0 for t in toc.tracks]
+        encoded = list(ripped)
+        sums: Dict[int, TrackChecksum] = {}
+        lock = threading.Lock()
+        last = [-1]
+        def report():
+            with lock:
+                done = sum(ripped) + sum(encoded) if encoders else sum(ripped)
+                pct = 5 + int(done * 95 / (tracks * (2 if encoders else 1)))
+                if pct != last[0]:
+                    last[0] = pct
+                    on_progress(min(99, pct))
+        # `workers` caps encoder processes; every track in flight runs one per encoded format.
+        pool_size = max(1, min(workers or os.cpu_count() or 2, tracks * max(1, len(encoders))))
+        in_flight = max(1, pool_size // max(1, len(encoders)))
+        slots = threading.BoundedSemaphore(in_flight)  # tracks being encoded at once
+        failed: List[str] = []
+        left: Dict[int, int] = {}  # encoders still running per track
+        held: Dict[int, int] = {}  # encoder_pool slots taken per track
+        def title_of(n: int) -> str:
+            i = index[n]
+            title = track_titles[i] if track_titles and i < len(track_titles) and track_titles[i] else f"Track {n}"
+            return title.replace("/", "-").replace("\\", "-")  # a title never adds folders to the layout
+        def out_path(n: int, f: str) -> Path:
+            # Each format has its own tree: out_dir itself for a single format, out_dir/<FORMAT> for several.
+            layout = (layouts or {}).get(f) or (RIP_LAYOUT if len(formats) == 1 else "{format}/" + RIP_LAYOUT)
+            p = out_dir / f"{layout.format(number=n, title=title_of(n), format=f)}.{f.lower()}"
+            p.parent.mkdir(parents=True, exist_ok=True)
+            return p
+        def encode_cmd(n: int, f: str) -> List[str]:
+            # Raw little-endian CD-DA on stdin, exactly as cdparanoia -r delivers it.
+            if f == "MP3":
+                return [encoders[f], "-r", "-s", "44.1", "--bitwidth", "16", "--signed", "--little-endian",
+                        "-b", str(bitrate), "-", str(out_path(n, f))]
+            return [encoders[f], "-8", "--force-raw-format", "--endian=little", "--sign=signed", "--channels=2",
+                    "--bps=16", "--sample-rate=44100", "-o", str(out_path(n, f)), "-"]
+        def finished(t: TocTrack):
+            # Every output of the track is written: record it once for all formats.
+            s = sums[t.number]
+            journal.record(t, s.crc, [out_path(t.number, f) for f in formats], ar1=s.v1, ar2=s.v2)
+        def encode(t: TocTrack, f: str, feed: _TrackFeed, rid: int):
+            n = t.number
+            ok = False
+            try:
+                if failed or self.runner.cancelled:
+                    return
+                try:
+                    self.runner.run_pipeline(None, [encode_cmd(n, f)], source=feed.reader(rid),
+                                             on_consumer_line=lambda _i, s: on_log(s),
+                                             buffer_bytes=4 * 1024 * 1024, check=True)
+                except Exception as e:
+                    failed.append(f"Encoding track {n} to {f} failed: {e}")
+                    return
+                ok = not self.runner.cancelled
+            finally:
+                if ok:
+                    feed.detach(rid)
+                else:
+                    feed.abort()  # unblocks the splitter (and this track's other encoders)
+                with lock:
+                    left[n] -= 1
+                    last_one = left[n] == 0
+                if last_one:
+                    if encoder_pool is not None:
+                        encoder_pool.release(held.pop(n, 0))
+                    slots.release()
+                if ok and not failed:
+                    with lock:
+                        encoded[index[n]] += 1.0 / len(encoders)
+                    if last_one and ripped[index[n]] >= 1.0:  # not a track cut short by a failed read
+                        finished(t)
+                    report()
+        current: List = [None, []]  # the track's shared encoder feed, and its WAV files
+        def start(t: TocTrack):
+            if t.number in done:  # finished in an earlier run; its audio is read past
+                return
+            sums[t.number] = TrackChecksum(t.length * SAMPLES_PER_FRAME, first=t is toc.tracks[0], last=t is toc.tracks[-1])
+            if encoders:
+                slots.acquire()  # blocks while every encoder is busy; the drive waits with it
+                if encoder_pool is not None:
+                    held[t.number] = encoder_pool.acquire(len(encoders), lambda: self.runner.cancelled or bool(failed))
+                    if not held[t.number]:
+                        slots.release()
+                        raise RuntimeError(failed[0] if failed else "cancelled")
+                if failed:
+                    if encoder_pool is not None:
+                        encoder_pool.release(held.pop(t.number))
+                    slots.release()
+                    raise RuntimeError(failed[0])
+            on_status(f"Ripping track {t.number}/{toc.last}...")
+            if encoders:
+                # One buffer per track; every encoder reads the same chunks through its own cursor.
+                feed = _TrackFeed(RIP_ENCODER_BUFFER)
+                rids = [feed.attach() for _ in encoders]
+                current[0] = feed
+                left[t.number] = len(encoders)
+                for f, rid in zip(encoders, rids):
+                    pool.submit(encode, t, f, feed, rid)
+            for f in wavs:
+                w = open(out_path(t.number, f), "wb")
+                w.write(wav_header(t.bytes))
+                current[1].append(w)
+        def data(t: TocTrack, chunk: memoryview):
+            if t.number in done:
+                return
+            sums[t.number].feed(chunk)
+            if current[0] is not None:
+                if not current[0].put(bytes(chunk)):  # the shared read buffer is reused; the encoders get a copy
+                    raise RuntimeError(failed[0] if failed else "cancelled")
+            for w in current[1]:
+                w.write(chunk)
+            ripped[index[t.number]] += len(chunk) / t.bytes
+            report()
+        def end(t: TocTrack):
+            if t.number in done:
+                return
+            feed, files = current
+            current[0], current[1] = None, []
+            for w in files:
+                w.close()
+            ripped[index[t.number]] = 1.0
+            if feed is not None:
+                feed.close()  # the encoders record the track once they have all finished
             else:
-                wav.rename(out_dir / f"{out_name}.wav")
-            on_progress(int(5 + (t / tracks) * 95))
-        on_status(f"Ripped {tracks} tracks to {out_dir}")
-        on_progress(100)
\ No newline at end of file
+                finished(t)
+            report()
+        expected = part.offset(part.tracks[-1]) + part.tracks[-1].bytes
+        with ThreadPoolExecutor(max_workers=in_flight * max(1, len(encoders)), thread_name_prefix="pyburn-encode") as pool:
+            offset = ["-O", str(read_offset)] if read_offset else []
+            proc = self.runner.start_reader([cdparanoia, "-d", device, *offset, "-r", part.span(), "-"], on_stderr=on_log)
+            if proc is None:
+                raise RuntimeError("cancelled")
+            got = 0
+            try:
+                got = split_stream(proc.stdout, part, start, data, end, cancelled=lambda: self.runner.cancelled)
+            finally:
+                code = self.runner.finish(proc, kill=got < expected)
+                if current[0] is not None:  # stopped mid-track
+                    current[0].abort()
+                for w in current[1]:
+                    w.close()
+            if not self.runner.cancelled:
+                if code != 0:
+                    raise RuntimeError(f"cdparanoia failed (exit code {code})")
+                if got < expected:
+                    raise RuntimeError(f"cdparanoia stopped after {got} of {expected} bytes")
+            if encoders and not failed and not self.runner.cancelled:
+                on_status(f"Encoding the last tracks to {' + '.join(encoders)}...")
+        if self.runner.cancelled:
+            raise RuntimeError("cancelled")
+        if failed:
+            raise RuntimeError(failed[0])
+        summary = accuracy()
+        journal.remove()
+        on_status(f"Ripped {tracks} tracks to {out_dir}" + (f" ({' + '.join(formats)})" if len(formats) > 1 else ""))
+        on_progress(100)
+        return summary
\ No newline at end of file
@@ -1,60 +1,151 @@
 from __future__ import annotations
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 from pathlib import Path
+from typing import Optional
 from ..core.jobs import Job, JobType
 from ..core.tools import ToolFinder
-from .backend import RealBackend, SimulatedBackend
+from .admission import TempSpaceGovernor, estimate_temp_need
+from .backend import RealBackend, SimulatedBackend, PreparedImage
+from .cache import ImageCache
+from .manifest import BackupManifest
+from .accuraterip import ChecksumDB
+from .metadata import MusicBrainzClient
+from .stream import SlotPool
 class BurnWorker(QObject):
     sig_status = pyqtSignal(str)
     sig_progress = pyqtSignal(int)
     sig_log = pyqtSignal(str)
+    sig_prepared = pyqtSignal()
+    sig_device = pyqtSignal(str, str, int)  # device, status, percent (multi-copy jobs)
     sig_finished = pyqtSignal(bool, str)
-    def __init__(self, job: Job, tools: ToolFinder, simulate_if_missing: bool = True):
+    def __init__(self, job: Job, tools: ToolFinder, simulate_if_missing: bool = True,
+                 governor: Optional[TempSpaceGovernor] = None, cache: Optional[ImageCache] = None,
+                 manifest: Optional[BackupManifest] = None, metadata: Optional[MusicBrainzClient] = None,
+                 checksums: Optional[ChecksumDB] = None, encoders: Optional[SlotPool] = None):
         super().__init__()
         self.job = job
         self.tools = tools
+        self.governor = governor
+        self.work_dir = job.options.temp_dir / f"pyburn_{job.id}"
+        self.is_head = True
+        self._prepared: Optional[PreparedImage] = None
         req = {
             JobType.DATA: ["mkisofs"] + (["growisofs"] if tools.find("growisofs") else ["cdrecord"]),
             JobType.AUDIO: ["ffmpeg", "cdrdao"],
             JobType.VIDEO_DVD: ["ffmpeg", "dvdauthor", "mkisofs"],
             JobType.VIDEO_BD: ["ffmpeg", "tsMuxeR"] + (["mkisofs"] if tools.find("mkisofs") else ["xorriso"]),
             JobType.RIP: ["cdparanoia"],
+            JobType.VERIFY: [],
         }[job.job_type]
         if job.job_type == JobType.DATA and job.options.verify:
             req.append("readom")
         missing = tools.missing(req)
-        self.backend = SimulatedBackend(tools) if (missing and simulate_if_missing) else RealBackend(tools)
+        self.backend = SimulatedBackend(tools) if (missing and simulate_if_missing) else RealBackend(tools, cache, manifest, metadata, checksums)
         self._missing = missing
-    def start(self):
+        self.encoders = encoders
+    @property
+    def has_prepare_stage(self) -> bool:
+        return self.job.job_type not in (JobType.RIP, JobType.VERIFY)
+    @pyqtSlot()
+    def prepare(self):
+        if self._prepare():
+            self.sig_prepared.emit()
+    def _prepare(self) -> bool:
+        if not self.has_prepare_stage:
+            return True
+        o = self.job.options
         try:
-            o = self.job.options
-            if self.job.job_type == JobType.DATA:
-                self.backend.burn_data(self.job.files, self.job.device, o.temp_dir, o.volume_label, o.speed,
-                                       o.verify, self.sig_status.emit, self.sig_progress.emit, self.sig_log.emit,
-                                       auto_blank=o.auto_blank, eject_after=o.eject_after, dummy=o.dummy)
-                self.sig_finished.emit(True, "Data disc burned successfully" if not self._missing else "Simulated data burn complete")
+            if self.governor:
+                size = o.span["bytes"] if o.span else self.backend._file_total_size(self.job.files)
+                need = estimate_temp_need(self.job, size)
+                self.sig_status.emit("Waiting for temp space...")
+                self.governor.acquire(self.job.id, o.temp_dir, need, lambda: self.is_head, lambda: self.backend.runner.cancelled)
+            if self.backend.runner.cancelled:
+                raise RuntimeError("cancelled")
+            emit = (self.sig_status.emit, self.sig_progress.emit, self.sig_log.emit)
+            if self.job.job_type == JobType.DATA and o.backup_set:
+                self._prepared = self.backend.prepare_session(self.job.files, self.work_dir, o.volume_label, o.backup_set,
+                                                              self.job.id, *emit, full=o.backup_full)
+            elif self.job.job_type == JobType.DATA:
+                self._prepared = self.backend.prepare_data(self.job.files, self.work_dir, o.volume_label, *emit,
+                                                           stream=o.stream, span=o.span, checksums=o.checksums)
             elif self.job.job_type == JobType.AUDIO:
-                self.backend.burn_audio(self.job.files, self.job.device, o.temp_dir, o.speed, self.sig_status.emit,
-                                        self.sig_progress.emit, self.sig_log.emit, eject_after=o.eject_after,
-                                        album_title=o.album_title, album_performer=o.album_performer,
-                                        track_titles=o.track_titles, track_performers=o.track_performers)
-                self.sig_finished.emit(True, "Audio CD created successfully" if not self._missing else "Simulated audio CD complete")
+                self._prepared = self.backend.prepare_audio(self.job.files, self.work_dir, *emit,
+                                                            album_title=o.album_title, album_performer=o.album_performer,
+                                                            track_titles=o.track_titles, track_performers=o.track_performers,
+                                                            workers=o.audio_workers, stream=o.audio_stream, speed=o.speed)
             elif self.job.job_type == JobType.VIDEO_DVD:
-                self.backend.burn_video_dvd(self.job.files, self.job.device, o.temp_dir, o.speed, self.sig_status.emit,
-                                            self.sig_progress.emit, self.sig_log.emit, auto_blank=o.auto_blank, eject_after=o.eject_after)
-                self.sig_finished.emit(True, "Video DVD created successfully" if not self._missing else "Simulated video DVD complete")
+                self._prepared = self.backend.prepare_video_dvd(self.job.files, self.work_dir, *emit)
             elif self.job.job_type == JobType.VIDEO_BD:
-                self.backend.burn_video_bd(self.job.files, self.job.device, o.temp_dir, o.speed, self.sig_status.emit,
-                                           self.sig_progress.emit, self.sig_log.emit, auto_blank=o.auto_blank, eject_after=o.eject_after)
-                self.sig_finished.emit(True, "Blu-ray created successfully" if not self._missing else "Simulated Blu-ray complete")
-            elif self.job.job_type == JobType.RIP:
+                self._prepared = self.backend.prepare_video_bd(self.job.files, self.work_dir, *emit)
+            return True
+        except Exception as e:
+            self.backend.cleanup(self.work_dir)
+            self.sig_finished.emit(False, str(e))
+            return False
+        finally:
+            if self.governor:
+                self.governor.release(self.job.id)
+    @pyqtSlot()
+    def burn(self):
+        o = self.job.options
+        try:
+            if self.job.job_type == JobType.RIP:
                 out_dir = o.output_dir or Path.home() / "Music"
                 out_dir.mkdir(parents=True, exist_ok=True)
-                self.backend.rip_cd(self.job.device, out_dir, o.rip_format, o.rip_bitrate,
-                                    self.sig_status.emit, self.sig_progress.emit, self.sig_log.emit,
-                                    track_titles=o.track_titles)
-                self.sig_finished.emit(True, f"CD ripped to {out_dir}" if not self._missing else f"Simulated rip to {out_dir}")
+                accuracy = self.backend.rip_cd(self.job.device, out_dir, o.rip_format, o.rip_bitrate,
+                                               self.sig_status.emit, self.sig_progress.emit, self.sig_log.emit,
+                                               track_titles=o.track_titles, workers=o.rip_workers, lookup=o.rip_lookup,
+                                               layouts=o.rip_layouts, encoder_pool=self.encoders,
+                                               read_offset=o.rip_read_offset)
+                msg = f"CD ripped to {out_dir}" if not self._missing else f"Simulated rip to {out_dir}"
+                self.sig_finished.emit(True, f"{msg}; {accuracy}" if accuracy else msg)  # the history keeps the verdict
+                return
+            if self.job.job_type == JobType.VERIFY:
+                msg = self.backend.verify_disc(self.job.device, self.sig_status.emit, self.sig_progress.emit, self.sig_log.emit)
+                if o.eject_after:
+                    self.backend.media.eject(self.job.device)
+                self.sig_finished.emit(True, msg)
+                return
+            if self._prepared is None:
+                raise RuntimeError("Nothing prepared to burn")
+            title = self._prepared.title
+            devices = self.job.devices
+            if self.backend.runner.cancelled:
+                raise RuntimeError("cancelled")
+            if self._prepared.kind == "empty":
+                self.sig_progress.emit(100)
+                self.sig_finished.emit(True, f"Nothing changed in backup set {o.backup_set}; no session written")
+                return
+            if o.span and o.span["disc"] > 0:
+                for d in devices:
+                    self.backend.wait_for_media(d, f"Insert a blank disc for {title.lower()} in {d}", self.sig_status.emit)
+            if len(devices) > 1:
+                errors = self.backend.write_copies(self._prepared, devices, o.speed, self.sig_status.emit, self.sig_progress.emit,
+                                                   self.sig_log.emit, self.sig_device.emit,
+                                                   verify=o.verify and self.job.job_type == JobType.DATA,
+                                                   auto_blank=o.auto_blank and self.job.job_type != JobType.AUDIO,
+                                                   eject_after=o.eject_after, dummy=o.dummy,
+                                                   verify_mode=o.verify_mode, samples=o.verify_samples)
+                good = len(devices) - len(errors)
+                if errors:
+                    failed = "; ".join(f"{d}: {e}" for d, e in errors.items())
+                    self.sig_finished.emit(False, f"{good} of {len(devices)} copies of {title} burned. Failed: {failed}")
+                else:
+                    self.backend.commit_session(self._prepared)
+                    self.sig_finished.emit(True, f"{len(devices)} copies of {title} burned successfully")
+                return
+            self.backend.write(self._prepared, self.job.device, o.speed, self.sig_status.emit, self.sig_progress.emit,
+                               self.sig_log.emit, verify=o.verify and self.job.job_type == JobType.DATA,
+                               auto_blank=o.auto_blank and self.job.job_type != JobType.AUDIO,
+                               eject_after=o.eject_after, dummy=o.dummy,
+                               verify_mode=o.verify_mode, samples=o.verify_samples)
+            self.backend.commit_session(self._prepared)
+            self.sig_finished.emit(True, f"{title} burned successfully" if not self._missing else f"Simulated {title.lower()} complete")
         except Exception as e:
             self.sig_finished.emit(False, str(e))
+        finally:
+            if self._prepared is not None:
+                self.backend.cleanup(self.work_dir)
     def cancel(self):
         self.backend.cancel()
\ No newline at end of file
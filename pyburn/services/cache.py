@@ -0,0 +1,107 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from .sizeindex import scanned_trees
+# Content-addressed store for built images and intermediate artifacts (WAVs,
+# MPEG-2 titles, .ts clips, ISOs). Files are hard-linked in and out of the
+# store, so an entry evicted mid-burn never pulls the image from under a job.
+_LOCKS: Dict[str, threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+def _lock_for(root: Path) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(str(root), threading.Lock())
+def _place(src: Path, dest: Path):
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try: dest.unlink()
+    except FileNotFoundError: pass
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+def source_manifest(paths: Iterable[Path], since: Optional[float] = None) -> List[list]:
+    # [path, size, mtime_ns] of every source file, read from the size index's
+    # trees; `since` makes roots scanned before that time.monotonic() value scan again.
+    out: List[list] = []
+    for path, tree in scanned_trees([str(p) for p in paths], since):
+        if not os.path.isdir(path):
+            entry = next(iter(tree.files.values()), None)
+            out.append([path, entry[0], entry[3]] if entry else [path, -1, 0])
+            continue
+        stack = [(path, tree)]
+        while stack:
+            base, node = stack.pop()
+            for fn in sorted(node.files):
+                entry = node.files[fn]
+                out.append([os.path.join(base, fn), entry[0], entry[3]])
+            stack.extend((os.path.join(base, dn), node.dirs[dn]) for dn in sorted(node.dirs, reverse=True))
+    return out
+def cache_key(kind: str, sources: Iterable[Path], params: Any, since: Optional[float] = None) -> str:
+    blob = json.dumps({"kind": kind, "sources": source_manifest(sources, since), "params": params},
+                      sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+class ImageCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = _lock_for(self.root)
+    def _entry_file(self, key: str) -> Optional[Path]:
+        entry = self.root / key
+        try:
+            return next((f for f in entry.iterdir() if f.is_file()), None)
+        except OSError:
+            return None
+    def fetch(self, key: str, dest: Path) -> bool:
+        with self._lock:
+            src = self._entry_file(key)
+            if src is None:
+                return False
+            _place(src, dest)
+            try: os.utime(self.root / key)
+            except OSError: pass
+            return True
+    def store(self, key: str, src: Path):
+        with self._lock:
+            entry = self.root / key
+            if self._entry_file(key) is not None:
+                try: os.utime(entry)
+                except OSError: pass
+                return
+            tmp = self.root / f".{key}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            _place(src, tmp / src.name)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(tmp, entry)
+            self._evict()
+    def _evict(self):
+        entries = []
+        total = 0
+        try:
+            for d in self.root.iterdir():
+                if not d.is_dir() or d.name.startswith("."):
+                    continue
+                size = sum(f.stat().st_size for f in d.iterdir() if f.is_file())
+                entries.append((d.stat().st_mtime, size, d))
+                total += size
+        except OSError:
+            return
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, size, d = entries.pop(0)
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+    @property
+    def size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.root):
+            for fn in files:
+                try: total += (Path(root) / fn).stat().st_size
+                except OSError: pass
+        return total
\ No newline at end of file
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import re
+import subprocess
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, List
+from .audioinfo import FIRST_PREGAP, FRAME_BYTES
+# Audio CD table of contents as cdparanoia -Q reports it, read once per rip and
+# shared by the extraction splitter and the MusicBrainz lookup.
+_TRACK_RE = re.compile(r"^\s*(\d+)\.\s+(\d+)\s+\[[^\]]*\]\s+(\d+)\s+\[", re.MULTILINE)
+@dataclass
+class TocTrack:
+    number: int
+    start: int  # first sector (LBA)
+    length: int  # sectors
+    @property
+    def bytes(self) -> int:
+        return self.length * FRAME_BYTES
+@dataclass
+class DiscToc:
+    tracks: List[TocTrack] = field(default_factory=list)
+    @property
+    def first(self) -> int:
+        return self.tracks[0].number if self.tracks else 0
+    @property
+    def last(self) -> int:
+        return self.tracks[-1].number if self.tracks else 0
+    @property
+    def leadout(self) -> int:
+        t = self.tracks[-1]
+        return t.start + t.length
+    def span(self) -> str:
+        # cdparanoia span covering every track, so one run reads the whole disc.
+        return f"{self.first}-{self.last}"
+    def offset(self, track: TocTrack) -> int:
+        # Byte position of `track` in the single-pass stream.
+        return (track.start - self.tracks[0].start) * FRAME_BYTES
+    def musicbrainz_toc(self) -> str:
+        # "first last leadout offset..." with the 150-sector pregap added, as /ws/2/discid/-?toc= expects.
+        return " ".join(str(v) for v in [self.first, self.last, self.leadout + FIRST_PREGAP]
+                        + [t.start + FIRST_PREGAP for t in self.tracks])
+def parse_toc(text: str) -> DiscToc:
+    # Rows look like "  1.    16503 [03:40.03]        0 [00:00.00]    no   no  2".
+    return DiscToc([TocTrack(int(n), int(start), int(length)) for n, length, start in _TRACK_RE.findall(text)])
+def read_toc(cdparanoia: str, device: str, timeout: int = 30) -> DiscToc:
+    p = subprocess.run([cdparanoia, "-Q", "-d", device], capture_output=True, text=True, timeout=timeout)
+    toc = parse_toc((p.stdout or "") + "\n" + (p.stderr or ""))
+    if not toc.tracks:
+        raise RuntimeError(f"No audio tracks found on {device}")
+    return toc
+def wav_header(data_bytes: int) -> bytes:
+    # 44-byte canonical header for 44.1 kHz/16-bit stereo PCM of a known length.
+    return (b"RIFF" + (36 + data_bytes).to_bytes(4, "little") + b"WAVEfmt "
+            + (16).to_bytes(4, "little") + (1).to_bytes(2, "little") + (2).to_bytes(2, "little")
+            + (44100).to_bytes(4, "little") + (44100 * 4).to_bytes(4, "little")
+            + (4).to_bytes(2, "little") + (16).to_bytes(2, "little")
+            + b"data" + data_bytes.to_bytes(4, "little"))
+def split_stream(source: BinaryIO, toc: DiscToc,
+                 on_track_start: Callable[[TocTrack], None],
+                 on_data: Callable[[TocTrack, memoryview], None],
+                 on_track_end: Callable[[TocTrack], None],
+                 chunk_bytes: int = 1024 * 1024,
+                 cancelled: Callable[[], bool] = lambda: False) -> int:
+    # Cuts a raw whole-disc stream into tracks at sector boundaries. Data is read
+    # into one reusable buffer and handed out as memoryview slices, which are only
+    # valid until on_data returns. Returns the bytes consumed.
+    buf = bytearray(chunk_bytes)
+    view = memoryview(buf)
+    total = 0
+    i = 0
+    left = 0
+    tracks = toc.tracks
+    try:
+        while i < len(tracks) and not cancelled():
+            n = source.readinto(view)
+            if not n:
+                break
+            pos = 0
+            while pos < n and i < len(tracks):
+                if left == 0:
+                    left = tracks[i].bytes
+                    on_track_start(tracks[i])
+                take = min(left, n - pos)
+                on_data(tracks[i], view[pos:pos + take])
+                pos += take
+                left -= take
+                if left == 0:
+                    on_track_end(tracks[i])
+                    i += 1
+            total += n
+    finally:
+        view.release()
+    return total
\ No newline at end of file
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .iso9660 import open_disc
+from .manifest import walk_sources
+# Per-file checksum list burned onto data discs as PYBURN_SUMS.TXT, in the
+# `sha256sum -b` line format (with the algorithm in a header line), and the
+# verifier that checks a disc against it without the source files.
+SUMS_NAME = "PYBURN_SUMS.TXT"
+ALGORITHMS = {"sha256": hashlib.sha256, "blake2b": hashlib.blake2b}
+_HEADER = "# PyBurn checksums v1 "
+_BATCH = 256
+def graft_files(grafts: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str, int]]:
+    # (path on disc, source path, size) for every regular file of a graft list.
+    # An empty graft path places the source the way a plain mkisofs argument would.
+    for rel, src in grafts:
+        if os.path.isdir(src):
+            for path, r, size, _ in walk_sources([src]):
+                yield (f"{rel}/{r}" if rel else r), path, size
+        elif os.path.isfile(src):
+            yield rel or os.path.basename(src), src, os.path.getsize(src)
+def _escape(rel: str) -> Tuple[str, str]:
+    if "\\" in rel or "\n" in rel:
+        return "\\", rel.replace("\\", "\\\\").replace("\n", "\\n")
+    return "", rel
+def _unescape(rel: str) -> str:
+    out = []
+    i = 0
+    while i < len(rel):
+        c = rel[i]
+        if c == "\\" and i + 1 < len(rel):
+            out.append("\n" if rel[i + 1] == "n" else rel[i + 1])
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+def file_digest(path: str, algo: str, cancelled: Callable[[], bool]) -> str:
+    h = ALGORITHMS[algo]()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            if cancelled():
+                raise RuntimeError("cancelled")
+            h.update(chunk)
+    return h.hexdigest()
+def write_sums(files: Iterable[Tuple[str, str, int]], out: Path, algo: str = "sha256",
+               cancelled: Callable[[], bool] = lambda: False, on_bytes: Optional[Callable[[int], None]] = None,
+               workers: Optional[int] = None) -> int:
+    # Hashes the files on a thread pool (hashlib releases the GIL) and writes
+    # the list in input order. Returns the number of files listed.
+    if algo not in ALGORITHMS:
+        raise ValueError(f"Unknown checksum algorithm: {algo}")
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 2))) as pool, \
+            open(out, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        f.write(f"{_HEADER}{algo}\n")
+        batch: List[Tuple[str, str, int]] = []
+        def flush():
+            nonlocal count
+            for (rel, _, size), digest in zip(batch, pool.map(lambda e: file_digest(e[1], algo, cancelled), batch)):
+                prefix, name = _escape(rel)
+                f.write(f"{prefix}{digest} *{name}\n")
+                count += 1
+                if on_bytes:
+                    on_bytes(size)
+            batch.clear()
+        for entry in files:
+            batch.append(entry)
+            if len(batch) >= _BATCH:
+                flush()
+        flush()
+    return count
+def parse_sums(text: str) -> Tuple[str, Dict[str, str]]:
+    algo = "sha256"
+    sums: Dict[str, str] = {}
+    for line in text.splitlines():
+        if line.startswith(_HEADER):
+            algo = line[len(_HEADER):].strip()
+            continue
+        if not line or line.startswith("#"):
+            continue
+        escaped = line.startswith("\\")
+        if escaped:
+            line = line[1:]
+        digest, _, name = line.partition(" ")
+        name = name[1:] if name[:1] in ("*", " ") else name
+        sums[_unescape(name) if escaped else name] = digest.lower()
+    if algo not in ALGORITHMS:
+        raise ValueError(f"Unknown checksum algorithm on disc: {algo}")
+    return algo, sums
+class VerifyResult:
+    def __init__(self):
+        self.checked = 0
+        self.bytes = 0
+        self.bad: List[str] = []
+        self.missing: List[str] = []
+        self.seconds = 0.0
+    @property
+    def ok(self) -> bool:
+        return not self.bad and not self.missing
+def verify_sums(source: str, on_progress: Callable[[int], None], on_log: Callable[[str], None],
+                cancelled: Callable[[], bool] = lambda: False) -> VerifyResult:
+    # Reads every listed file straight off the device (or an image) in extent
+    # order, so the drive reads front to back; hashing runs on a second thread.
+    res = VerifyResult()
+    t0 = time.monotonic()
+    with open_disc(source) as iso:
+        entry = iso.find(SUMS_NAME)
+        if entry is None:
+            raise RuntimeError(f"No {SUMS_NAME} on this disc; it was not burned with embedded checksums")
+        algo, sums = parse_sums(iso.read_file(entry).decode("utf-8", "surrogateescape"))
+        on_log(f"{len(sums)} files listed in {SUMS_NAME} ({algo}), volume {iso.volume_id}")
+        files = iso.files()
+        res.missing = sorted(p for p in sums if p not in files)
+        todo = sorted((files[p] for p in sums if p in files), key=lambda e: e.lba)
+        total = max(1, sum(e.size for e in todo))
+        chunks: "queue.Queue" = queue.Queue(maxsize=32)
+        failure: List[BaseException] = []
+        def reader():
+            try:
+                for e in todo:
+                    if cancelled():
+                        break
+                    for chunk in iso.iter_file(e):
+                        chunks.put((e, chunk))
+                    chunks.put((e, None))
+            except BaseException as ex:
+                failure.append(ex)
+            finally:
+                chunks.put(None)
+        t = threading.Thread(target=reader, daemon=True)
+        t.start()
+        h = ALGORITHMS[algo]()
+        last = -1
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            e, chunk = item
+            if chunk is not None:
+                h.update(chunk)
+                res.bytes += len(chunk)
+                pct = int(res.bytes * 100 / total)
+                if pct != last:
+                    last = pct
+                    on_progress(pct)
+                continue
+            if h.hexdigest() != sums[e.path]:
+                res.bad.append(e.path)
+                on_log(f"Checksum mismatch: {e.path}")
+            res.checked += 1
+            h = ALGORITHMS[algo]()
+        t.join()
+    if cancelled():
+        raise RuntimeError("cancelled")
+    if failure:
+        raise RuntimeError(f"Read error: {failure[0]}")
+    res.seconds = time.monotonic() - t0
+    return res
\ No newline at end of file
@@ -1,71 +1,216 @@
 from __future__ import annotations
 import subprocess
 import threading
-from typing import Callable, Optional, List
+from typing import BinaryIO, Callable, Optional, List, Set
+from .stream import RingBuffer
 class ProcessRunner:
     def __init__(self):
-        self._proc: Optional[subprocess.Popen] = None
+        self._procs: Set[subprocess.Popen] = set()
+        self._rings: Set[RingBuffer] = set()
         self._lock = threading.Lock()
         self._cancelled = False
-    def run_stream(
-        self,
-        args: List[str],
-        cwd: Optional[str] = None,
-        on_stdout: Optional[Callable[[str], None]] = None,
-        on_stderr: Optional[Callable[[str], None]] = None,
-        check: bool = True,
-    ) -> int:
+    def _spawn(self, args: List[str], cwd: Optional[str] = None, stdin=None, binary: bool = False) -> Optional[subprocess.Popen]:
         with self._lock:
             if self._cancelled:
-                return -1
-            self._proc = subprocess.Popen(
+                return None
+            proc = subprocess.Popen(
                 args,
                 cwd=cwd,
+                stdin=stdin,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
+                text=not binary,
+                bufsize=-1 if binary else 1,
             )
-            proc = self._proc  # capture under lock
-        def pump(stream, cb):
-            if not stream or not cb:
+            self._procs.add(proc)
+            return proc
+    def _reap(self, proc: subprocess.Popen):
+        with self._lock:
+            if self._cancelled and proc.poll() is None:
+                try:
+                    proc.kill()
+                    proc.wait(timeout=2)
+                except Exception:
+                    pass
+            self._procs.discard(proc)
+    def _pump(self, stream, cb: Optional[Callable[[str], None]], binary: bool = False) -> threading.Thread:
+        def run():
+            if not stream:
                 return
-            for line in iter(stream.readline, ""):
+            for line in iter(stream.readline, b"" if binary else ""):
                 if self._cancelled:
                     break
-                cb(line.rstrip("\n"))
+                if cb:
+                    if binary:
+                        line = line.decode("utf-8", "replace")
+                    cb(line.rstrip("\r\n"))
             try:
                 stream.close()
             except Exception:
                 pass
-        t_out = threading.Thread(target=pump, args=(proc.stdout, on_stdout), daemon=True)
-        t_err = threading.Thread(target=pump, args=(proc.stderr, on_stderr), daemon=True)
-        t_out.start()
-        t_err.start()
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+    def run_stream(
+        self,
+        args: List[str],
+        cwd: Optional[str] = None,
+        on_stdout: Optional[Callable[[str], None]] = None,
+        on_stderr: Optional[Callable[[str], None]] = None,
+        check: bool = True,
+    ) -> int:
+        proc = self._spawn(args, cwd=cwd)
+        if proc is None:
+            return -1
+        t_out = self._pump(proc.stdout, on_stdout)
+        t_err = self._pump(proc.stderr, on_stderr)
         code = proc.wait()
         t_out.join(timeout=5)
         t_err.join(timeout=5)
-        with self._lock:
-            if self._cancelled and proc.poll() is None:
-                try:
-                    proc.kill()
-                    proc.wait(timeout=2)
-                except Exception:
-                    pass
+        self._reap(proc)
         if check and code != 0 and not self._cancelled:
             raise subprocess.CalledProcessError(code, args)
         return code
+    def run_pipeline(
+        self,
+        producer: Optional[List[str]],
+        consumers: List[List[str]],
+        source: Optional[BinaryIO] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+        on_stderr: Optional[Callable[[str], None]] = None,
+        on_consumer_line: Optional[Callable[[int, str], None]] = None,
+        cwd: Optional[str] = None,
+        buffer_bytes: int = 64 * 1024 * 1024,
+        chunk_bytes: int = 1024 * 1024,
+        tolerate_consumer_failure: bool = False,
+        check: bool = True,
+    ) -> List[int]:
+        # producer stdout (or `source`) -> RingBuffer -> every consumer's stdin.
+        # on_chunk sees each chunk exactly once, in stream order, on the reader thread.
+        if producer is None and source is None:
+            raise ValueError("run_pipeline needs a producer command or a source stream")
+        ring = RingBuffer(buffer_bytes)
+        with self._lock:
+            if self._cancelled:
+                return [-1] * len(consumers)
+            self._rings.add(ring)
+        prod: Optional[subprocess.Popen] = None
+        procs: List[Optional[subprocess.Popen]] = []
+        threads: List[threading.Thread] = []
+        failed: List[bool] = [False] * len(consumers)
+        try:
+            for i, args in enumerate(consumers):
+                p = self._spawn(args, cwd=cwd, stdin=subprocess.PIPE, binary=True)
+                procs.append(p)
+                if p is None:
+                    failed[i] = True
+                    continue
+                cb = (lambda s, i=i: on_consumer_line(i, s)) if on_consumer_line else None
+                threads.append(self._pump(p.stdout, cb, binary=True))
+                threads.append(self._pump(p.stderr, cb, binary=True))
+            if producer is not None:
+                prod = self._spawn(producer, cwd=cwd, binary=True)
+                if prod is None:
+                    raise RuntimeError("cancelled")
+                threads.append(self._pump(prod.stderr, on_stderr, binary=True))
+                source = prod.stdout
+            def feed(idx: int, proc: subprocess.Popen, rid: int):
+                try:
+                    while True:
+                        chunk = ring.get(rid)
+                        if chunk is None:
+                            break
+                        proc.stdin.write(chunk)
+                except (BrokenPipeError, OSError, ValueError):
+                    failed[idx] = True
+                finally:
+                    ring.detach(rid)
+                    try: proc.stdin.close()
+                    except Exception: failed[idx] = True
+            feeders = []
+            for i, p in enumerate(procs):
+                if p is None:
+                    continue
+                t = threading.Thread(target=feed, args=(i, p, ring.attach()), daemon=True)
+                feeders.append(t)
+            for t in feeders:
+                t.start()
+            while not self._cancelled:
+                chunk = source.read(chunk_bytes)
+                if not chunk:
+                    break
+                if on_chunk:
+                    on_chunk(chunk)
+                if procs and (all(failed) or not ring.put(chunk)):
+                    break
+            ring.close()
+            for t in feeders:
+                t.join()
+        except BaseException:
+            ring.abort()
+            for p in [prod] + procs:
+                if p is not None and p.poll() is None:
+                    try: p.kill()
+                    except Exception: pass
+            raise
+        finally:
+            ring.close()
+            with self._lock:
+                self._rings.discard(ring)
+        codes: List[int] = []
+        prod_code = 0
+        if prod is not None:
+            try: prod.stdout.close()
+            except Exception: pass
+            prod_code = prod.wait()
+            self._reap(prod)
+        for i, p in enumerate(procs):
+            if p is None:
+                codes.append(-1)
+                continue
+            code = p.wait()
+            self._reap(p)
+            codes.append(-1 if (failed[i] and code == 0) else code)
+        for t in threads:
+            t.join(timeout=5)
+        if check and not self._cancelled:
+            bad = [i for i, c in enumerate(codes) if c != 0]
+            if bad and not (tolerate_consumer_failure and len(bad) < len(codes)):
+                raise subprocess.CalledProcessError(codes[bad[0]], consumers[bad[0]])
+            if prod_code != 0:
+                raise subprocess.CalledProcessError(prod_code, producer)
+        return codes
+    def start_reader(self, args: List[str], on_stderr: Optional[Callable[[str], None]] = None,
+                     cwd: Optional[str] = None) -> Optional[subprocess.Popen]:
+        # A binary process whose stdout the caller reads itself; pass it to finish() when done.
+        # None once the runner is cancelled.
+        proc = self._spawn(args, cwd=cwd, binary=True)
+        if proc is not None:
+            self._pump(proc.stderr, on_stderr, binary=True)
+        return proc
+    def finish(self, proc: subprocess.Popen, kill: bool = False) -> int:
+        if kill and proc.poll() is None:
+            try: proc.kill()
+            except Exception: pass
+        try: proc.stdout.close()
+        except Exception: pass
+        code = proc.wait()
+        self._reap(proc)
+        return code
     def cancel(self):
         with self._lock:
             self._cancelled = True
-            if self._proc and self._proc.poll() is None:
-                try:
-                    self._proc.terminate()
-                except Exception:
+            for ring in self._rings:
+                ring.abort()
+            for proc in self._procs:
+                if proc.poll() is None:
                     try:
-                        self._proc.kill()
+                        proc.terminate()
                     except Exception:
-                        pass
+                        try:
+                            proc.kill()
+                        except Exception:
+                            pass
     @property
     def cancelled(self) -> bool:
         return self._cancelled
\ No newline at end of file
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+from ..core.devices import DeviceScanner
+from ..core.jobs import Job, JobOptions, JobType
+from .exec import ProcessRunner
+from .media import MediaTools
+from .queue import JobQueueService
+try:
+    import fcntl  # Linux/BSD; without it drives are checked through sysfs only
+except ImportError:
+    fcntl = None
+# Rip farm: every drive DeviceScanner finds is watched, an audio CD is ripped
+# as soon as it is inserted (one queue lane per drive, so all drives rip at
+# once under the queue's shared encoder cap) and ejected when done. Drives are
+# polled with a non-blocking open() and the CD-ROM status ioctls, or sysfs, so
+# watching eight idle drives spawns no processes.
+CDROM_DRIVE_STATUS = 0x5326
+CDROM_DISC_STATUS = 0x5327
+CDROMREADTOCENTRY = 0x5306
+CDSL_CURRENT = 0x7FFFFFFF
+CDS_NO_DISC, CDS_TRAY_OPEN, CDS_DRIVE_NOT_READY, CDS_DISC_OK = 1, 2, 3, 4
+CDS_AUDIO, CDS_MIXED = 100, 105
+CDROM_LBA, CDROM_LEADOUT = 0x01, 0xAA
+_TOCENTRY = "=BBBxiB3x"  # struct cdrom_tocentry: track, adr/ctrl, format, lba, datamode
+CD_RATE = 176400  # bytes per second at 1x
+RIPPABLE = ("audio", "disc")  # "disc": sysfs saw media but cannot tell audio from data
+def drive_node(device: str) -> Optional[str]:
+    # Block device behind a DeviceScanner id; wodim's "bus,target,lun" ids are looked up in sysfs.
+    if device.startswith("/dev/"):
+        return device
+    parts = device.split(",")
+    if len(parts) == 3 and all(p.isdigit() for p in parts):
+        try:
+            names = sorted(os.listdir(f"/sys/class/scsi_device/{parts[0]}:0:{parts[1]}:{parts[2]}/device/block"))
+        except OSError:
+            return None
+        return f"/dev/{names[0]}" if names else None
+    return None
+def _sysfs_state(node: str) -> str:
+    try:
+        with open(f"/sys/block/{os.path.basename(node)}/size", "r") as f:
+            return "disc" if int(f.read().strip() or 0) > 0 else "empty"
+    except (OSError, ValueError):
+        return "unknown"
+def disc_state(node: str) -> str:
+    # "audio", "data", "empty", "open", "busy" (spinning up), "disc" or "unknown".
+    # O_NONBLOCK lets the open succeed with no disc and never waits for the tray.
+    if fcntl is not None:
+        try:
+            fd = os.open(node, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            fd = None
+        if fd is not None:
+            try:
+                s = fcntl.ioctl(fd, CDROM_DRIVE_STATUS, CDSL_CURRENT)
+                if s == CDS_DISC_OK:
+                    return "audio" if fcntl.ioctl(fd, CDROM_DISC_STATUS) in (CDS_AUDIO, CDS_MIXED) else "data"
+                return {CDS_NO_DISC: "empty", CDS_TRAY_OPEN: "open", CDS_DRIVE_NOT_READY: "busy"}.get(s, "unknown")
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+    return _sysfs_state(node)
+def disc_bytes(node: str) -> int:
+    # CD-DA size up to the lead-out from the drive's TOC, for the throughput figures; 0 if unknown.
+    if fcntl is None:
+        return 0
+    try:
+        fd = os.open(node, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        return 0
+    try:
+        buf = fcntl.ioctl(fd, CDROMREADTOCENTRY, struct.pack(_TOCENTRY, CDROM_LEADOUT, 0, CDROM_LBA, 0, 0))
+        return max(0, struct.unpack(_TOCENTRY, buf)[3]) * 2352
+    except (OSError, struct.error):
+        return 0
+    finally:
+        os.close(fd)
+STATE_TEXT = {"audio": "Audio CD", "data": "Data disc (skipped)", "empty": "No disc", "open": "Tray open",
+              "busy": "Drive not ready", "disc": "Disc", "unknown": "Unknown"}
+@dataclass
+class FarmDrive:
+    device: str
+    node: Optional[str]
+    state: str = "unknown"
+    job_id: str = ""
+    handled: bool = False  # the disc in the drive was ripped (or tried); waits for it to leave
+    started: float = 0.0
+    bytes: int = 0
+    progress: int = 0
+class RipFarm(QObject):
+    sig_drive = pyqtSignal(str, str, int)  # device, status, percent
+    sig_stats = pyqtSignal(object)  # dict: drives, active, discs, failed, bytes, rate (bytes/s)
+    _sig_disc = pyqtSignal(str, int)  # poll thread -> GUI thread: audio disc in device, its size
+    def __init__(self, queue: JobQueueService, settings: dict):
+        super().__init__()
+        self.queue = queue
+        self.settings = settings
+        self.media = MediaTools(queue.tools, ProcessRunner())
+        self.drives: Dict[str, FarmDrive] = {}
+        self.out_dir = Path(settings.get("farm_output_dir") or Path.home() / "Music")
+        self.formats: Union[str, List[str]] = "FLAC"
+        self.bitrate = 320
+        self.discs = 0
+        self.failed = 0
+        self.bytes = 0
+        self._since = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sig_disc.connect(self._inserted)
+        queue.sig_status_update.connect(self._status)
+        queue.sig_job_finished.connect(self._finished)
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    def start(self, out_dir: Path, formats: Union[str, List[str]], bitrate: int):
+        if self.running:
+            return
+        self.out_dir, self.formats, self.bitrate = Path(out_dir), formats, bitrate
+        self._stop.clear()
+        self._since = self._since or time.monotonic()
+        self._thread = threading.Thread(target=self._poll, name="pyburn-farm", daemon=True)
+        self._thread.start()
+    def stop(self):
+        # Stops watching; rips already running finish and eject as usual.
+        self._stop.set()
+    def _poll(self):
+        if not self.drives:
+            try:
+                found = [d.id for d in DeviceScanner().scan_devices()]
+            except Exception:
+                found = list(self.settings.get("devices") or [])
+            for dev in found:
+                self.drives[dev] = FarmDrive(dev, drive_node(dev))
+                self.sig_drive.emit(dev, "Watching" if self.drives[dev].node else "Cannot be polled (no /dev node)", 0)
+        interval = max(0.5, float(self.settings.get("farm_poll_seconds", 2)))
+        while not self._stop.is_set():
+            for d in list(self.drives.values()):
+                if d.job_id or d.node is None:
+                    continue
+                state = disc_state(d.node)
+                if state != d.state:
+                    d.state = state
+                    if state not in RIPPABLE and state != "busy":
+                        d.handled = False  # the disc left; the next one is new
+                    if not d.handled:
+                        self.sig_drive.emit(d.device, STATE_TEXT.get(state, state), 0)
+                if state in RIPPABLE and not d.handled:
+                    d.handled = True
+                    self._sig_disc.emit(d.device, disc_bytes(d.node))
+            self._stop.wait(interval)
+    @pyqtSlot(str, int)
+    def _inserted(self, device: str, size: int):
+        d = self.drives.get(device)
+        if d is None or d.job_id:
+            return
+        if self.queue.get_lanes().get(device):  # the drive is busy with another job; look again next poll
+            d.handled = False
+            return
+        out = self.out_dir / f"{datetime.now():%Y%m%d-%H%M%S} {os.path.basename(d.node or device)}"
+        job = Job(
+            job_type=JobType.RIP,
+            files=[],
+            device=device,
+            options=JobOptions(
+                temp_dir=Path(self.settings["temp_dir"]),
+                output_dir=out,
+                rip_format=self.formats,
+                rip_bitrate=self.bitrate,
+                rip_workers=int(self.settings.get("rip_workers", 0)),
+                rip_lookup=bool(self.settings.get("musicbrainz_enabled", True)),
+                rip_layouts=dict(self.settings.get("rip_layouts") or {}),
+                rip_read_offset=int((self.settings.get("rip_read_offsets") or {}).get(device, 0)),
+            ),
+        )
+        d.job_id, d.started, d.bytes, d.progress = job.id, time.monotonic(), size, 0
+        self.queue.enqueue(job)
+        self.sig_drive.emit(device, "Ripping...", 0)
+        self._emit_stats()
+    def _drive_of(self, job_id: str) -> Optional[FarmDrive]:
+        return next((d for d in self.drives.values() if d.job_id == job_id), None)
+    @pyqtSlot(str, str, int)
+    def _status(self, job_id: str, status: str, progress: int):
+        d = self._drive_of(job_id)
+        if d is None or status.startswith("LOG:"):
+            return
+        d.progress = progress
+        self.sig_drive.emit(d.device, status, progress)
+        self._emit_stats()
+    @pyqtSlot(str, bool, str)
+    def _finished(self, job_id: str, ok: bool, msg: str):
+        d = self._drive_of(job_id)
+        if d is None:
+            return
+        d.job_id = ""
+        if ok:
+            self.discs += 1
+            self.bytes += d.bytes
+        else:
+            self.failed += 1
+        secs = time.monotonic() - d.started
+        rate = f", {d.bytes / CD_RATE / max(1.0, secs):.1f}x" if ok and d.bytes else ""
+        self.sig_drive.emit(d.device, f"{'Done' if ok else 'Failed'} in {secs / 60:.1f} min{rate}: {msg}", 100 if ok else d.progress)
+        # The finished disc leaves the drive; d.handled keeps it from being ripped again if it cannot eject.
+        threading.Thread(target=self.media.eject, args=(d.device,), daemon=True).start()
+        self._emit_stats()
+    def _emit_stats(self):
+        # Rate over the farm's lifetime, counting running discs by their progress.
+        live = sum(d.bytes * d.progress // 100 for d in self.drives.values() if d.job_id)
+        elapsed = time.monotonic() - self._since if self._since else 0.0
+        self.sig_stats.emit({
+            "drives": len(self.drives),
+            "active": sum(1 for d in self.drives.values() if d.job_id),
+            "discs": self.discs,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "rate": (self.bytes + live) / elapsed if elapsed > 1 else 0.0,
+        })
\ No newline at end of file
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import mmap
+import os
+import stat
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+# Read-only ISO9660 reader with Rock Ridge and Joliet names (UDF lives in
+# udf.py): enough to list a burned disc (or an image file) with each file's
+# extents, to diff two trees and to read files back without mounting anything.
+# Image files are memory-mapped; devices get sector-aligned bulk reads.
+SECTOR = 2048
+_BULK = 64 * SECTOR  # read-ahead unit for block devices
+_JOLIET_ESCAPES = (b"%/@", b"%/C", b"%/E")
+@dataclass
+class IsoEntry:
+    path: str  # "/"-separated, relative to the root, Rock Ridge/Joliet name where present
+    lba: int
+    size: int
+    is_dir: bool
+    extents: Optional[List[Tuple[int, int]]] = None  # (byte offset, length) runs when not one run at lba; offset -1 reads as zeros
+    def runs(self) -> List[Tuple[int, int]]:
+        return self.extents if self.extents is not None else [(self.lba * SECTOR, self.size)]
+def _both_endian(b: bytes) -> int:
+    return int.from_bytes(b[:4], "little")
+class BlockSource:
+    # Random access to an image or device, relative to a session start `base`.
+    def __init__(self, f: BinaryIO, base: int = 0):
+        self.f = f
+        self.base = base
+        self._map: Optional[mmap.mmap] = None
+        self._at = -1
+        self._buf = b""
+        try:
+            st = os.fstat(f.fileno())
+            if stat.S_ISREG(st.st_mode) and st.st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, AttributeError):
+            self._map = None
+    @classmethod
+    def open(cls, path: str, base: int = 0) -> "BlockSource":
+        regular = os.path.isfile(path)
+        return cls(open(path, "rb", buffering=-1 if regular else 0), base)
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self.f.close()
+    def read_at(self, offset: int, size: int) -> bytes:
+        offset += self.base
+        if self._map is not None:
+            return self._map[offset:offset + size]
+        if self._at <= offset and offset + size <= self._at + len(self._buf):
+            return self._buf[offset - self._at:offset - self._at + size]
+        start = offset - offset % SECTOR
+        end = offset + size
+        end += -end % SECTOR
+        self.f.seek(start)
+        out = bytearray()
+        want = max(end - start, _BULK)
+        while len(out) < want:
+            chunk = self.f.read(want - len(out))
+            if not chunk:
+                break
+            out += chunk
+        self._at, self._buf = start, bytes(out)
+        return self._buf[offset - start:offset - start + size]
+class DiscReader:
+    # Shared tree walking and file reading; subclasses provide _root() and _children().
+    source: BlockSource
+    volume_id: str = ""
+    def _root(self) -> IsoEntry:
+        raise NotImplementedError
+    def _children(self, d: IsoEntry) -> Iterator[IsoEntry]:
+        raise NotImplementedError
+    def close(self):
+        self.source.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    def read_at(self, offset: int, size: int) -> bytes:
+        return self.source.read_at(offset, size)
+    def walk(self) -> Iterator[IsoEntry]:
+        # Depth-first listing of every file and directory under the root.
+        stack = [self._root()]
+        seen = set()
+        while stack:
+            d = stack.pop()
+            key = d.runs()[0][0]
+            if key in seen:
+                continue
+            seen.add(key)
+            for e in self._children(d):
+                yield e
+                if e.is_dir:
+                    stack.append(e)
+    def files(self) -> Dict[str, IsoEntry]:
+        return {e.path: e for e in self.walk() if not e.is_dir}
+    def find(self, path: str) -> Optional[IsoEntry]:
+        d = self._root()
+        found: Optional[IsoEntry] = None
+        for part in (p for p in path.split("/") if p):
+            if not d.is_dir:
+                return None
+            found = next((e for e in self._children(d) if e.path.rsplit("/", 1)[-1] == part), None)
+            if found is None:
+                return None
+            d = found
+        return found
+    def iter_file(self, entry: IsoEntry, chunk: int = 1024 * 1024) -> Iterator[bytes]:
+        for offset, left in entry.runs():
+            while left > 0:
+                n = min(chunk, left)
+                data = bytes(n) if offset < 0 else self.read_at(offset, n)
+                if not data:
+                    raise IOError(f"Short read in {entry.path}")
+                yield data
+                if offset >= 0:
+                    offset += len(data)
+                left -= len(data)
+    def read_file(self, entry: IsoEntry) -> bytes:
+        return b"".join(self.iter_file(entry))
+def _susp(su: bytes, reader: "IsoReader") -> Tuple[Optional[str], Optional[int], bool]:
+    # (NM name, CL child link, RE relocated) from the system use area, following CE continuations.
+    name = b""
+    seen = False
+    child = None
+    relocated = False
+    areas: List[bytes] = [su]
+    while areas:
+        area = areas.pop(0)
+        i = 0
+        while i + 4 <= len(area):
+            sig, ln = area[i:i + 2], area[i + 2]
+            if ln < 4 or sig == b"ST":
+                break
+            if sig == b"NM" and ln >= 5:
+                flags = area[i + 4]
+                if not flags & 0x06:  # not "." / ".."
+                    name += area[i + 5:i + ln]
+                    seen = True
+            elif sig == b"CL" and ln >= 12:
+                child = _both_endian(area[i + 4:i + 12])
+            elif sig == b"RE":
+                relocated = True
+            elif sig == b"CE" and ln >= 28:
+                block = _both_endian(area[i + 4:i + 12])
+                off = _both_endian(area[i + 12:i + 20])
+                size = _both_endian(area[i + 20:i + 28])
+                areas.append(reader.read_at(block * SECTOR + off, size))
+            i += ln
+    return (name.decode("utf-8", "surrogateescape") if seen else None), child, relocated
+def _records(data: bytes) -> Iterator[bytes]:
+    i = 0
+    while i < len(data):
+        ln = data[i]
+        if ln == 0:
+            i = (i // SECTOR + 1) * SECTOR  # records never straddle a sector; skip the padding
+            continue
+        yield data[i:i + ln]
+        i += ln
+class IsoReader(DiscReader):
+    def __init__(self, f: BinaryIO, base: int = 0, joliet: Optional[bool] = None):
+        # joliet=None picks Rock Ridge names, then Joliet, then plain ISO9660.
+        self.source = f if isinstance(f, BlockSource) else BlockSource(f, base)
+        pvd = self.read_at(16 * SECTOR, SECTOR)
+        if pvd[1:6] != b"CD001" or pvd[0] != 1:
+            raise ValueError("No ISO9660 primary volume descriptor")
+        self.volume_id = pvd[40:72].decode("ascii", "replace").strip()
+        self.volume_blocks = _both_endian(pvd[80:88])
+        self.root = pvd[156:190]
+        self._skip = 0
+        self._rr = False
+        self._joliet = False
+        root_lba, root_size = _both_endian(self.root[2:10]), _both_endian(self.root[10:18])
+        first = next(_records(self.read_at(root_lba * SECTOR, min(root_size, SECTOR))), b"")
+        su = self._system_use(first)
+        if su[:2] == b"SP" and len(su) >= 7 and su[4:6] == b"\xbe\xef":
+            self._rr = True
+            self._skip = su[6]
+        if joliet or (joliet is None and not self._rr):
+            svd = self._joliet_descriptor()
+            if svd is not None:
+                self.root = svd[156:190]
+                self._joliet = True
+                self._rr = False
+                self.volume_id = svd[40:72].decode("utf-16-be", "replace").strip() or self.volume_id
+            elif joliet:
+                raise ValueError("No Joliet volume descriptor")
+    def _joliet_descriptor(self) -> Optional[bytes]:
+        for n in range(17, 17 + 32):
+            vd = self.read_at(n * SECTOR, SECTOR)
+            if vd[1:6] != b"CD001" or vd[0] == 255:
+                return None
+            if vd[0] == 2 and any(esc in vd[88:120] for esc in _JOLIET_ESCAPES):
+                return vd
+        return None
+    @classmethod
+    def open(cls, path: str, joliet: Optional[bool] = None) -> "IsoReader":
+        return cls(BlockSource.open(path), joliet=joliet)
+    def _system_use(self, rec: bytes) -> bytes:
+        len_fi = rec[32]
+        start = 33 + len_fi + (0 if len_fi & 1 else 1)
+        return rec[start:]
+    def _record(self, rec: bytes, parent: str) -> Optional[Tuple[IsoEntry, int, bool]]:
+        # (entry, multi-extent flag, hidden) for one directory record; None for "." and "..".
+        len_fi = rec[32]
+        fi = rec[33:33 + len_fi]
+        if fi in (b"\x00", b"\x01"):
+            return None
+        name = None
+        child = None
+        hidden = False
+        if self._rr:
+            name, child, hidden = _susp(self._system_use(rec)[self._skip:], self)
+        if name is None:
+            name = fi.decode("utf-16-be", "replace") if self._joliet else fi.decode("ascii", "replace")
+            name = name.split(";")[0]
+            if name.endswith("."):
+                name = name[:-1]
+        is_dir = bool(rec[25] & 0x02)
+        lba, size = _both_endian(rec[2:10]), _both_endian(rec[10:18])
+        if child is not None:
+            # Rock Ridge moved this deep directory; the placeholder links to the real one.
+            first = next(_records(self.read_at(child * SECTOR, SECTOR)), b"")
+            is_dir, lba, size = True, child, _both_endian(first[10:18]) if first else SECTOR
+        return IsoEntry(f"{parent}/{name}" if parent else name, lba, size, is_dir), rec[25] & 0x80, hidden
+    def _root(self) -> IsoEntry:
+        return IsoEntry("", _both_endian(self.root[2:10]), _both_endian(self.root[10:18]), True)
+    def _children(self, d: IsoEntry) -> Iterator[IsoEntry]:
+        pending: Optional[IsoEntry] = None
+        for rec in _records(self.read_at(d.lba * SECTOR, d.size)):
+            r = self._record(rec, d.path)
+            if r is None:
+                continue
+            e, more, hidden = r
+            if pending is not None:
+                # Files over 4 GiB are several records with the same name, all but the last flagged 0x80.
+                pending.extents.append((e.lba * SECTOR, e.size))
+                pending.size += e.size
+                if more:
+                    continue
+                e, pending = pending, None
+            elif more:
+                pending = IsoEntry(e.path, e.lba, e.size, False, [(e.lba * SECTOR, e.size)])
+                continue
+            if not hidden:
+                yield e
+def open_disc(path: str, udf: Optional[bool] = None) -> DiscReader:
+    # ISO9660 where present (bridge discs included), UDF otherwise; udf=True prefers UDF.
+    from .udf import UdfReader
+    source = BlockSource.open(path)
+    try:
+        if udf:
+            try:
+                return UdfReader(source)
+            except ValueError:
+                return IsoReader(source)
+        try:
+            return IsoReader(source)
+        except ValueError:
+            return UdfReader(source)
+    except Exception:
+        source.close()
+        raise
+def main(argv: List[str]) -> int:
+    # python -m pyburn.services.iso9660 IMAGE... : native walk vs. isoinfo -f listing
+    if not argv:
+        print("usage: python -m pyburn.services.iso9660 IMAGE [IMAGE...]")
+        return 2
+    from ..core.tools import ToolFinder
+    isoinfo = ToolFinder().find("isoinfo")
+    for path in argv:
+        t0 = time.perf_counter()
+        with open_disc(path) as r:
+            n = sum(1 for _ in r.walk())
+            kind = type(r).__name__
+        t1 = time.perf_counter()
+        print(f"{path}: {kind} {n} entries in {t1 - t0:.3f}s")
+        if not isoinfo:
+            print("isoinfo not found; skipping comparison")
+            continue
+        t0 = time.perf_counter()
+        p = subprocess.run([isoinfo, "-R", "-f", "-i", path], capture_output=True, text=True)
+        t1 = time.perf_counter()
+        got = len((p.stdout or "").splitlines())
+        print(f"isoinfo -R -f: {got} entries in {t1 - t0:.3f}s")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,407 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+import time
+from array import array
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+# Sector-exact size of the image `mkisofs -J -R` (genisoimage defaults: ISO9660
+# level 1, Joliet, Rock Ridge 1.09, -pad) would write for a set of paths,
+# computed from the directory tree alone: system area, volume descriptors,
+# path tables, directory records packed into sectors, SUSP/RRIP entries,
+# continuation areas, file extents (hard links stored once), directories
+# deeper than eight levels relocated into RR_MOVED, and the end pad.
+SECTOR = 2048
+_RR_BASE = 5 + 36 + 26  # RR, PX, TF(modify, access, attributes)
+_CE = 28
+_SP = 7
+_JOLIET_MAX = 64  # UTF-16 code units
+_CL = 12  # Rock Ridge CL/PL entries of a relocated directory
+_RE = 4
+MAX_LEVELS = 8  # ISO9660 directory levels, the root being the first
+RR_MOVED = "rr_moved"
+_DOT_REC = 34 + _RR_BASE + 1  # "." / ".." record, padded to even
+_ROOT_DOT_REC = 34 + _SP + _RR_BASE + _CE  # root "." also carries SP and the CE pointing at ER
+# "." plus ".." record bytes of a directory (ISO, Joliet) and the largest single records
+DOT_RECORDS = (2 * _DOT_REC, 68)
+ROOT_DOT_RECORDS = (_ROOT_DOT_REC + _DOT_REC, 68)
+MAX_ISO_RECORD = 254
+MAX_JOLIET_RECORD = 34 + 2 * (_JOLIET_MAX + 2)
+MAX_EXTENT = 0xFFFFF800  # largest file ISO9660 stores in one extent
+FILE_COSTS_MIN = 256  # directories with at least this many files keep their per-file costs
+class DirNode:
+    __slots__ = ("dirs", "files", "cost", "fcost")
+    def __init__(self):
+        self.dirs: Dict[str, DirNode] = {}
+        # name -> (size, (st_dev, st_ino) for multiply-linked files, SL entry bytes for symlinks, st_mtime_ns)
+        self.files: Dict[str, Tuple[int, Optional[Tuple[int, int]], int, int]] = {}
+        self.cost: Optional[TreeCost] = None  # subtree cost, filled in lazily; nodes are not edited after a scan
+        self.fcost: Optional[FileCosts] = None  # per-file costs of large directories, see file_costs()
+class FileCosts:
+    # Per-file records of one directory in sorted name order, as flat arrays,
+    # so the span planner can place long runs of files from prefix sums.
+    # `sectors` counts multiply-linked files too (an upper bound); `big` lists
+    # files over one extent.
+    __slots__ = ("names", "iso", "ce", "jol", "sectors", "nbytes", "data", "links", "big", "_sums")
+    def __init__(self):
+        self.names: List[str] = []
+        self.iso = array("H")
+        self.ce = array("L")
+        self.jol = array("H")
+        self.sectors = array("Q")
+        self.nbytes = array("L")
+        self.data = 0
+        self.links: Dict[Tuple[int, int], int] = {}
+        self.big: List[int] = []
+        self._sums: Optional[Tuple[array, ...]] = None
+    def sums(self) -> Tuple[array, ...]:
+        # Prefix sums of iso, ce, jol and sectors: entry k totals the first k files.
+        if self._sums is None:
+            self._sums = tuple(array("Q", accumulate(a, initial=0)) for a in (self.iso, self.ce, self.jol, self.sectors))
+        return self._sums
+    def slice(self, i: int, j: int, files: Dict[str, Tuple[int, Optional[Tuple[int, int]], int, int]]) -> "FileCosts":
+        # Costs of names[i:j]; `files` is the directory they came from, read only for hard links.
+        fc = FileCosts()
+        fc.names = self.names[i:j]
+        fc.iso, fc.ce, fc.jol = self.iso[i:j], self.ce[i:j], self.jol[i:j]
+        fc.sectors, fc.nbytes = self.sectors[i:j], self.nbytes[i:j]
+        fc.big = [k - i for k in self.big if i <= k < j]
+        fc.data = sum(fc.sectors)
+        if self.links:
+            for name, n in zip(fc.names, fc.sectors):
+                size, key, sl, _ = files[name]
+                if key is not None and not sl:
+                    fc.links[key] = n
+                    fc.data -= n
+        return fc
+class TreeCost:
+    # Additive cost of a subtree: directory sectors (ISO, Joliet, continuation),
+    # path table bytes, file data sectors, multiply-linked files (stored once
+    # per image, so kept apart), file count and summed relative path bytes.
+    __slots__ = ("iso", "jol", "ce", "ptbl", "jptbl", "data", "links", "nfiles", "paths", "depth")
+    def __init__(self):
+        self.iso = self.jol = self.ce = self.ptbl = self.jptbl = self.data = self.nfiles = self.paths = 0
+        self.depth = 0  # directory levels below this one
+        self.links: Dict[Tuple[int, int], int] = {}
+    def add(self, other: "TreeCost", prefix: int = 0):
+        self.iso += other.iso; self.jol += other.jol; self.ce += other.ce
+        self.ptbl += other.ptbl; self.jptbl += other.jptbl; self.data += other.data
+        self.nfiles += other.nfiles
+        self.paths += other.paths + other.nfiles * prefix
+        if other.links:
+            if self.links:
+                self.links.update(other.links)
+            else:
+                self.links = dict(other.links)
+    @property
+    def dir_sectors(self) -> int:
+        return self.iso + self.jol + self.ce
+    @property
+    def data_sectors(self) -> int:
+        return self.data + sum(self.links.values())
+def _sl_len(target: str) -> int:
+    n = 5
+    for comp in target.split("/"):
+        n += 2 + (0 if comp in ("", ".", "..") else len(os.fsencode(comp)))
+    return n
+def file_entry(entry: os.DirEntry) -> Tuple[int, Optional[Tuple[int, int]], int, int]:
+    if entry.is_symlink():
+        return (0, None, _sl_len(os.readlink(entry.path)), entry.stat(follow_symlinks=False).st_mtime_ns)
+    st = entry.stat()
+    return (st.st_size, (st.st_dev, st.st_ino) if st.st_nlink > 1 else None, 0, st.st_mtime_ns)
+def scan_dir(path: str, node: Optional[DirNode] = None, on_file: Optional[Callable[[int], None]] = None,
+             cancelled: Optional[Callable[[], bool]] = None, dirs: Optional[Dict[str, int]] = None) -> DirNode:
+    # Adds the *contents* of `path` to `node`, the way mkisofs grafts a
+    # directory argument onto the image root. `dirs` collects the mtime of
+    # every directory read, taken before it is listed.
+    node = node if node is not None else DirNode()
+    stack: List[Tuple[str, DirNode]] = [(path, node)]
+    while stack:
+        p, n = stack.pop()
+        if cancelled and cancelled():
+            break
+        if dirs is not None:
+            try:
+                dirs[p] = os.stat(p).st_mtime_ns
+            except OSError:
+                continue
+        try:
+            it = os.scandir(p)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        child = n.dirs.get(e.name)
+                        if child is None:
+                            child = n.dirs[e.name] = DirNode()
+                        stack.append((e.path, child))
+                    else:
+                        n.files[e.name] = f = file_entry(e)
+                        if on_file:
+                            on_file(f[0])
+                except OSError:
+                    continue
+    return node
+def scan_paths(paths: Iterable[str]) -> DirNode:
+    root = DirNode()
+    for p in paths:
+        p = str(p)
+        if os.path.isdir(p):
+            scan_dir(p, root)
+        else:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            root.files[os.path.basename(p.rstrip("/"))] = (st.st_size, (st.st_dev, st.st_ino) if st.st_nlink > 1 else None, 0, st.st_mtime_ns)
+    return root
+def merge_trees(nodes: List[DirNode]) -> DirNode:
+    # Union of several roots without touching them: directories found in only
+    # one root are shared by reference, so their cached costs stay valid.
+    out = DirNode()
+    stack = [(out, nodes)]
+    while stack:
+        d, srcs = stack.pop()
+        names: Dict[str, List[DirNode]] = {}
+        for s in srcs:
+            d.files.update(s.files)
+            for name, child in s.dirs.items():
+                names.setdefault(name, []).append(child)
+        for name, children in names.items():
+            if len(children) == 1:
+                d.dirs[name] = children[0]
+            else:
+                d.dirs[name] = target = DirNode()
+                stack.append((target, children))
+    return out
+def _iso_len(name: str, is_dir: bool) -> int:
+    # ISO9660 level 1 identifier length after mangling: 8 characters for
+    # directories, 8.3 plus ";1" for files. A leading dot becomes "_".
+    b = os.fsencode(name)
+    if is_dir:
+        return min(len(b), 8) or 1
+    dot = b.rfind(b".")
+    if dot <= 0:
+        return min(len(b), 8) + 3
+    return min(dot, 8) + 1 + min(len(b) - dot - 1, 3) + 2
+def record_size(len_fi: int, rr: int) -> Tuple[int, int]:
+    # Directory record bytes and the part of its SUSP area that spills into
+    # the directory's continuation block once the record would pass 255 bytes.
+    base = 33 + len_fi + (0 if len_fi & 1 else 1)
+    total = base + rr
+    if total <= 254:
+        return total + (total & 1), 0
+    rec = base + _RR_BASE + _CE
+    return rec + (rec & 1), rr - _RR_BASE
+def _pack(records: Iterable[int]) -> int:
+    # Records never straddle a sector boundary; returns whole sectors.
+    off = 0
+    for r in records:
+        rem = SECTOR - off % SECTOR
+        if r > rem:
+            off += rem
+        off += r
+    return -(-off // SECTOR)
+def name_bytes(name: str) -> int:
+    return len(name) if name.isascii() else len(os.fsencode(name))
+def joliet_len(name: str) -> int:
+    # Joliet names are UCS-2/UTF-16: characters outside the BMP take two units.
+    return min(len(name) if name.isascii() else len(name.encode("utf-16-le", "surrogatepass")) // 2, _JOLIET_MAX)
+def dir_entry_cost(name: str) -> Tuple[int, int, int, int, int]:
+    # ISO record, continuation bytes, Joliet record, ISO and Joliet path table bytes
+    nb = name_bytes(name)
+    li = min(nb, 8) or 1
+    r, x = record_size(li, _RR_BASE + 5 + nb)
+    jl = joliet_len(name)
+    return r, x, 34 + 2 * jl, 8 + li + (li & 1), 8 + 2 * jl
+def file_entry_cost(name: str, sl: int = 0) -> Tuple[int, int, int]:
+    # ISO record, continuation bytes, Joliet record
+    r, x = record_size(_iso_len(name, False), _RR_BASE + 5 + name_bytes(name) + sl)
+    return r, x, 34 + 2 * (joliet_len(name) + 2)
+def own_cost(node: DirNode, is_root: bool = False, dotdot: int = 0, extra: Optional[Dict[str, int]] = None) -> TreeCost:
+    # Directory records of `node` itself plus its files; children only contribute their records here.
+    # `dotdot` and `extra` add SUSP bytes to the ".." record and to named subdirectory records.
+    c = TreeCost()
+    recs = [_ROOT_DOT_REC if is_root else _DOT_REC, _DOT_REC if not dotdot else record_size(1, _RR_BASE + dotdot)[0]]
+    jrecs = [34, 34]
+    ce = 0
+    for name in sorted(node.dirs):
+        if extra and name in extra:
+            nb = name_bytes(name)
+            r, x = record_size(min(nb, 8) or 1, _RR_BASE + 5 + nb + extra[name])
+            _, _, j, pt, jpt = dir_entry_cost(name)
+        else:
+            r, x, j, pt, jpt = dir_entry_cost(name)
+        recs.append(r)
+        jrecs.append(j)
+        ce += x
+        c.ptbl += pt
+        c.jptbl += jpt
+    fc = file_costs(node)
+    recs.extend(fc.iso)
+    jrecs.extend(fc.jol)
+    ce += sum(fc.ce)
+    c.paths = sum(fc.nbytes)
+    c.data = fc.data
+    c.links = dict(fc.links) if fc.links else c.links
+    c.nfiles = len(node.files)
+    c.iso = _pack(recs)
+    c.jol = _pack(jrecs)
+    c.ce = -(-ce // SECTOR)
+    return c
+def file_costs(node: DirNode) -> FileCosts:
+    # The files of `node` costed one by one; kept on the node for large directories.
+    if node.fcost is not None and len(node.fcost.names) == len(node.files):
+        return node.fcost
+    fc = FileCosts()
+    fc.names = names = sorted(node.files)
+    iso, ce, jol, sectors, nbytes = fc.iso, fc.ce, fc.jol, fc.sectors, fc.nbytes
+    files = node.files
+    data = 0
+    for i, name in enumerate(names):
+        size, key, sl, _ = files[name]
+        nb = len(name) if name.isascii() else len(os.fsencode(name))
+        r, x = record_size(_iso_len(name, False), _RR_BASE + 5 + nb + sl)
+        iso.append(r)
+        ce.append(x)
+        jol.append(34 + 2 * (joliet_len(name) + 2))
+        nbytes.append(nb)
+        n = 0 if sl else -(-size // SECTOR)
+        sectors.append(n)
+        if size > MAX_EXTENT:
+            fc.big.append(i)
+        if key is not None and not sl:
+            fc.links[key] = n
+        else:
+            data += n
+    fc.data = data
+    if len(names) >= FILE_COSTS_MIN:
+        node.fcost = fc
+    return fc
+def subtree_cost(node: DirNode) -> TreeCost:
+    if node.cost is not None:
+        return node.cost
+    stack: List[Tuple[DirNode, bool]] = [(node, False)]
+    while stack:
+        n, expanded = stack.pop()
+        if n.cost is not None:
+            continue
+        if not expanded:
+            stack.append((n, True))
+            stack.extend((ch, False) for ch in n.dirs.values() if ch.cost is None)
+            continue
+        c = own_cost(n)
+        for name, ch in n.dirs.items():
+            c.add(ch.cost, name_bytes(name) + 1)
+            c.depth = max(c.depth, ch.cost.depth + 1)
+        n.cost = c
+    return node.cost
+def _relocated(root: DirNode) -> List[Tuple[DirNode, str, DirNode]]:
+    # (parent, name, directory) for every directory mkisofs -R moves into
+    # RR_MOVED: those at level nine, counted again from RR_MOVED once moved.
+    # Only branches deep enough to need it are walked.
+    out: List[Tuple[DirNode, str, DirNode]] = []
+    stack: List[Tuple[DirNode, int]] = [(root, 1)]
+    while stack:
+        node, level = stack.pop()
+        for name, ch in node.dirs.items():
+            sub = level + 1
+            if sub > MAX_LEVELS:
+                out.append((node, name, ch))
+                sub = 3  # root/rr_moved/name
+            if sub + subtree_cost(ch).depth > MAX_LEVELS:
+                stack.append((ch, sub))
+    return out
+def _relocation_cost(root: DirNode, moved: List[Tuple[DirNode, str, DirNode]]) -> TreeCost:
+    # Extra sectors for relocation: the CL placeholders left in the old parents,
+    # the PL in each moved directory's "..", and RR_MOVED itself with an RE
+    # record per moved directory. RR_MOVED is hidden from the Joliet tree,
+    # which keeps the original hierarchy.
+    c = TreeCost()
+    parents: Dict[int, Tuple[DirNode, Dict[str, int]]] = {}
+    for parent, name, _ in moved:
+        parents.setdefault(id(parent), (parent, {}))[1][name] = _CL
+    nodes = {id(ch): ch for _, _, ch in moved}
+    moved_nodes = set(nodes)
+    nodes.update((k, v[0]) for k, v in parents.items())
+    for key, node in nodes.items():
+        is_root = node is root
+        was = own_cost(node, is_root)
+        now = own_cost(node, is_root, dotdot=_CL if key in moved_nodes else 0,
+                       extra=parents[key][1] if key in parents else None)
+        c.iso += now.iso - was.iso
+        c.ce += now.ce - was.ce
+    r, x, _, pt, _ = dir_entry_cost(RR_MOVED)
+    recs = [_DOT_REC, _DOT_REC]
+    ce = 0
+    for _, name, _ in sorted(moved, key=lambda m: m[1]):
+        nb = name_bytes(name)
+        mr, mx = record_size(min(nb, 8) or 1, _RR_BASE + 5 + nb + _RE)
+        recs.append(mr)
+        ce += mx
+    c.iso += _pack(recs)
+    c.ce += -(-ce // SECTOR)
+    # Its record in the root: the root's records are re-packed with one more entry.
+    root_recs = own_cost(root, is_root=True)
+    grown = DirNode()
+    grown.dirs, grown.files = dict(root.dirs), root.files
+    grown.dirs.setdefault(RR_MOVED, DirNode())
+    bigger = own_cost(grown, is_root=True)
+    c.iso += bigger.iso - root_recs.iso
+    c.ce += bigger.ce - root_recs.ce
+    c.ptbl += bigger.ptbl - root_recs.ptbl
+    return c
+def root_cost(root: DirNode) -> TreeCost:
+    # The image root is never cached: its "." record differs and merged roots are throwaway nodes.
+    c = own_cost(root, is_root=True)
+    for name, ch in root.dirs.items():
+        c.add(subtree_cost(ch), name_bytes(name) + 1)
+        c.depth = max(c.depth, ch.cost.depth + 1)
+    if c.depth >= MAX_LEVELS:
+        moved = _relocated(root)
+        if moved:
+            c.add(_relocation_cost(root, moved))
+    return c
+def image_sectors(c: TreeCost, pad: bool = True) -> int:
+    total = 16 + 1 + 1 + 1  # system area, primary descriptor, terminator, version block
+    total += 1 + 1  # Joliet descriptor, Rock Ridge ER record
+    total += 2 * -(-(10 + c.ptbl) // SECTOR) + 2 * -(-(10 + c.jptbl) // SECTOR)
+    total += c.dir_sectors + c.data_sectors
+    if pad:
+        total += 150
+        total += (16 - total % 16) % 16
+    return total
+def estimate_tree_sectors(root: DirNode, pad: bool = True) -> int:
+    return image_sectors(root_cost(root), pad)
+def estimate_image_bytes(paths: Iterable[str]) -> int:
+    return estimate_tree_sectors(scan_paths(paths)) * SECTOR
+def main(argv: List[str]) -> int:
+    # python -m pyburn.services.isosize PATH... : estimator vs. mkisofs -print-size
+    if not argv:
+        print("usage: python -m pyburn.services.isosize PATH [PATH...]")
+        return 2
+    t0 = time.perf_counter()
+    tree = scan_paths(argv)
+    t1 = time.perf_counter()
+    sectors = estimate_tree_sectors(tree)
+    t2 = time.perf_counter()
+    print(f"estimate: {sectors} sectors ({sectors * SECTOR} bytes)  scan {t1 - t0:.3f}s  layout {t2 - t1:.3f}s")
+    from ..core.tools import ToolFinder
+    mkisofs = ToolFinder().find("mkisofs")
+    if not mkisofs:
+        print("mkisofs not found; skipping comparison")
+        return 0
+    t0 = time.perf_counter()
+    p = subprocess.run([mkisofs, "-quiet", "-print-size", "-J", "-R", "-V", "BENCH"] + argv, capture_output=True, text=True)
+    t1 = time.perf_counter()
+    got = next((int(x) for x in reversed((p.stdout or "").split()) if x.isdigit()), None)
+    if got is None:
+        print(f"mkisofs gave no size: {(p.stderr or '').strip()[-200:]}")
+        return 1
+    print(f"mkisofs:  {got} sectors ({got * SECTOR} bytes)  {t1 - t0:.3f}s  delta {sectors - got:+d} sectors")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
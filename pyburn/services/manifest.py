@@ -0,0 +1,196 @@
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+# Per-set manifest of everything written to an incremental backup disc:
+# source path, size, mtime and SHA-256 per file, and one row per session.
+# A new run scans its sources into an on-disk temp table and lets SQLite join
+# it against the manifest, so the diff never holds the file list in memory.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    backup_set TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    volume TEXT,
+    created_at TEXT NOT NULL,
+    files INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    fresh INTEGER NOT NULL DEFAULT 0,
+    committed INTEGER NOT NULL DEFAULT 0  -- 0 staged, 1 on the current disc, 2 on an earlier disc of the set
+);
+CREATE INDEX IF NOT EXISTS sessions_set ON sessions (backup_set, committed);
+CREATE TABLE IF NOT EXISTS files (
+    backup_set TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    session INTEGER NOT NULL,
+    PRIMARY KEY (backup_set, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS staged (
+    session INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (session, path)
+) WITHOUT ROWID;
+"""
+_BATCH = 10000
+class Delta:
+    def __init__(self, session: int, files: int, bytes_: int, removed: int, previous: int):
+        self.session = session
+        self.files = files
+        self.bytes = bytes_
+        self.removed = removed
+        self.previous = previous  # committed sessions before this one; 0 means a fresh disc
+def walk_sources(paths: Iterable[Path]) -> Iterator[Tuple[str, str, int, int]]:
+    # (absolute source path, path inside the image, size, mtime_ns) for every regular file,
+    # grafted the way mkisofs places its arguments: directory contents at the root.
+    for p in paths:
+        p = os.path.abspath(str(p))
+        if not os.path.isdir(p):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            yield p, os.path.basename(p), st.st_size, st.st_mtime_ns
+            continue
+        stack = [(p, "")]
+        while stack:
+            d, rel = stack.pop()
+            try:
+                it = os.scandir(d)
+            except OSError:
+                continue
+            with it:
+                for e in it:
+                    try:
+                        r = f"{rel}/{e.name}" if rel else e.name
+                        if e.is_dir(follow_symlinks=False):
+                            stack.append((e.path, r))
+                        elif e.is_file(follow_symlinks=False):
+                            st = e.stat(follow_symlinks=False)
+                            yield e.path, r, st.st_size, st.st_mtime_ns
+                    except OSError:
+                        continue
+def file_sha256(path: str, cancelled: Callable[[], bool]) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            if cancelled():
+                raise RuntimeError("cancelled")
+            h.update(chunk)
+    return h.hexdigest()
+class BackupManifest:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        with self._lock, closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA temp_store=FILE")
+        return db
+    def sessions(self, backup_set: str) -> int:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM sessions WHERE backup_set=? AND committed=1",
+                              (backup_set,)).fetchone()[0]
+    def diff(self, backup_set: str, sources: Iterable[Path], job_id: str, volume: str, full: bool = False,
+             cancelled: Callable[[], bool] = lambda: False) -> Delta:
+        # Stages every new or changed file (sizes and mtimes against the last
+        # committed state) for a new session. full=True starts the set over on a fresh disc.
+        with self._lock, closing(self._connect()) as db:
+            with db:
+                db.execute("DELETE FROM staged WHERE session IN (SELECT id FROM sessions WHERE backup_set=? AND committed=0)",
+                           (backup_set,))
+                db.execute("DELETE FROM sessions WHERE backup_set=? AND committed=0", (backup_set,))
+                previous = 0 if full else db.execute(
+                    "SELECT COUNT(*) FROM sessions WHERE backup_set=? AND committed=1", (backup_set,)).fetchone()[0]
+                cur = db.execute("INSERT INTO sessions (backup_set, job_id, volume, created_at, fresh) VALUES (?, ?, ?, ?, ?)",
+                                 (backup_set, job_id, volume, datetime.now().isoformat(timespec="seconds"), int(not previous)))
+                session = cur.lastrowid
+            db.execute("CREATE TEMP TABLE scan (path TEXT PRIMARY KEY, rel TEXT, size INTEGER, mtime_ns INTEGER) WITHOUT ROWID")
+            batch: List[Tuple[str, str, int, int]] = []
+            for row in walk_sources(sources):
+                batch.append(row)
+                if len(batch) >= _BATCH:
+                    if cancelled():
+                        raise RuntimeError("cancelled")
+                    db.executemany("INSERT OR REPLACE INTO scan VALUES (?, ?, ?, ?)", batch)
+                    batch.clear()
+            db.executemany("INSERT OR REPLACE INTO scan VALUES (?, ?, ?, ?)", batch)
+            with db:
+                if previous:
+                    db.execute("""INSERT INTO staged (session, path, rel, size, mtime_ns)
+                                  SELECT ?, s.path, s.rel, s.size, s.mtime_ns FROM scan s
+                                  LEFT JOIN files f ON f.backup_set=? AND f.path=s.path
+                                  WHERE f.path IS NULL OR f.size!=s.size OR f.mtime_ns!=s.mtime_ns""",
+                               (session, backup_set))
+                    removed = db.execute("""SELECT COUNT(*) FROM files f WHERE f.backup_set=?
+                                            AND NOT EXISTS (SELECT 1 FROM scan s WHERE s.path=f.path)""",
+                                         (backup_set,)).fetchone()[0]
+                else:
+                    db.execute("INSERT INTO staged (session, path, rel, size, mtime_ns) SELECT ?, path, rel, size, mtime_ns FROM scan",
+                               (session,))
+                    removed = 0
+                files, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM staged WHERE session=?",
+                                          (session,)).fetchone()
+                db.execute("UPDATE sessions SET files=?, bytes=? WHERE id=?", (files, total, session))
+            db.execute("DROP TABLE scan")
+        return Delta(session, files, total, removed, previous)
+    def staged(self, session: int) -> Iterator[Tuple[str, str, int]]:
+        # (source path, path inside the image, size) of a staged session, read in batches.
+        with closing(self._connect()) as db:
+            cur = db.execute("SELECT path, rel, size FROM staged WHERE session=? ORDER BY rel", (session,))
+            while True:
+                rows = cur.fetchmany(_BATCH)
+                if not rows:
+                    break
+                yield from rows
+    def hash_staged(self, session: int, on_file: Callable[[int], None], cancelled: Callable[[], bool]):
+        # Reads the session a batch at a time on its own cursor and writes each batch's digests back before the next.
+        with closing(self._connect()) as db:
+            # ORDER BY rel sorts into a temp table, so the updates never touch the rows being read.
+            cur = db.cursor()
+            cur.execute("SELECT path, size FROM staged WHERE session=? ORDER BY rel", (session,))
+            while True:
+                rows = cur.fetchmany(_BATCH)
+                if not rows:
+                    break
+                updates: List[Tuple[Optional[str], int, str]] = []
+                for path, size in rows:
+                    try:
+                        digest = file_sha256(path, cancelled)
+                    except OSError:
+                        digest = None
+                    updates.append((digest, session, path))
+                    on_file(size)
+                with db:
+                    db.executemany("UPDATE staged SET sha256=? WHERE session=? AND path=?", updates)
+    def commit(self, session: int):
+        # Called once the session is on disc; a fresh-disc session replaces the set's old state.
+        with self._lock, closing(self._connect()) as db, db:
+            backup_set, fresh = db.execute("SELECT backup_set, fresh FROM sessions WHERE id=?", (session,)).fetchone()
+            if fresh:
+                db.execute("DELETE FROM files WHERE backup_set=?", (backup_set,))
+                db.execute("UPDATE sessions SET committed=2 WHERE backup_set=? AND committed=1", (backup_set,))
+            db.execute("""INSERT OR REPLACE INTO files (backup_set, path, rel, size, mtime_ns, sha256, session)
+                          SELECT ?, path, rel, size, mtime_ns, sha256, session FROM staged WHERE session=?""",
+                       (backup_set, session))
+            db.execute("DELETE FROM staged WHERE session=?", (session,))
+            db.execute("UPDATE sessions SET committed=1 WHERE id=?", (session,))
+    def discard(self, session: int):
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute("DELETE FROM staged WHERE session=?", (session,))
+            db.execute("DELETE FROM sessions WHERE id=? AND committed=0", (session,))
\ No newline at end of file
@@ -1,45 +1,162 @@
 from __future__ import annotations
+import base64
+import hashlib
+import json
+import os
 import subprocess
-from typing import Optional, Dict, List
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from ..core.tools import ToolFinder
-def musicbrainz_lookup(tools: ToolFinder, device: str) -> Optional[Dict]:
-    cd_discid = tools.find("cd-discid")
-    if not cd_discid:
-        return None
-    try:
-        p = subprocess.run([cd_discid, device], capture_output=True, text=True, timeout=8)
-        if p.returncode != 0:
+from .audioinfo import FIRST_PREGAP
+from .cdtoc import DiscToc, read_toc
+# MusicBrainz metadata for audio CDs. The disc ID is computed from the TOC in
+# Python (no cd-discid), answers are kept in a JSON cache with a TTL (misses
+# too, for a shorter time), and requests share one pooled session throttled to
+# MusicBrainz's one request per second.
+DEFAULT_BASE_URL = "https://musicbrainz.org"
+USER_AGENT = "PyBurn/1.0 ( https://github.com/Mr5niper/PyBurn-Studio )"
+MISS_TTL = 24 * 3600  # a disc MusicBrainz did not know is asked about again after a day
+def disc_id(toc: DiscToc) -> str:
+    # SHA-1 over the hex first/last track numbers and 100 offsets (lead-out first,
+    # unused tracks 0), base64 with MusicBrainz's URL-safe alphabet.
+    offsets = [toc.leadout + FIRST_PREGAP] + [0] * 99
+    for t in toc.tracks:
+        if 1 <= t.number <= 99:
+            offsets[t.number] = t.start + FIRST_PREGAP
+    text = f"{toc.first:02X}{toc.last:02X}" + "".join(f"{o:08X}" for o in offsets)
+    digest = base64.b64encode(hashlib.sha1(text.encode("ascii")).digest()).decode("ascii")
+    return digest.replace("+", ".").replace("/", "_").replace("=", "-")
+class MetadataCache:
+    # disc ID -> (stored at, metadata or None for "not found"); JSON file, written atomically.
+    def __init__(self, path: Optional[Path], ttl: float, miss_ttl: float = MISS_TTL):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._data: Dict[str, list] = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except (OSError, ValueError):
+                self._data = {}
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        # (hit, metadata); a hit with None is a cached miss.
+        with self._lock:
+            row = self._data.get(key)
+        if not row:
+            return False, None
+        stored, value = row
+        if time.time() - stored > (self.ttl if value is not None else self.miss_ttl):
+            return False, None
+        return True, value
+    def put(self, key: str, value: Optional[Dict]):
+        with self._lock:
+            self._data[key] = [time.time(), value]
+            blob = json.dumps(self._data)
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+class MusicBrainzClient:
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, cache: Optional[MetadataCache] = None,
+                 min_interval: float = 1.0, timeout: float = 8.0):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache or MetadataCache(None, 30 * 86400)
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._rate = threading.Lock()
+        self._next = 0.0
+        try:
+            import requests  # optional; pools connections across lookups
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = USER_AGENT
+        except Exception:
+            self._session = None
+    def _throttle(self):
+        with self._rate:
+            wait = self._next - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._next = time.monotonic() + self.min_interval
+    def _get_json(self, url: str) -> Tuple[int, Any]:
+        self._throttle()
+        if self._session is not None:
+            r = self._session.get(url, timeout=self.timeout)
+            return r.status_code, (r.json() if r.status_code == 200 else None)
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                return r.status, json.loads(r.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return e.code, None
+    def lookup(self, toc: Optional[DiscToc] = None, discid: Optional[str] = None) -> Optional[Dict]:
+        # {"album", "artist", "tracks", "discid"} or None. Network errors are not cached.
+        key = discid or disc_id(toc)
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        query = {"inc": "recordings+artist-credits", "fmt": "json"}
+        if toc is not None:
+            query["toc"] = toc.musicbrainz_toc().replace(" ", "+")  # fuzzy match when the ID is unknown
+        url = f"{self.base_url}/ws/2/discid/{urllib.parse.quote(key)}?" + "&".join(f"{k}={v}" for k, v in query.items())
+        try:
+            status, data = self._get_json(url)
+        except Exception:
             return None
-        parts = (p.stdout or "").strip().split()
-        if not parts:
+        if status == 404:
+            self.cache.put(key, None)
             return None
-        discid = parts[0]
-    except Exception:
-        return None
-    try:
-        import requests  # optional
-    except Exception:
+        if status != 200 or not isinstance(data, dict):
+            return None
+        md = _release_metadata(data, key)
+        self.cache.put(key, md)
+        return md
+def _release_metadata(data: Dict, key: str) -> Optional[Dict]:
+    releases = data.get("releases") or []
+    if not releases:
         return None
-    try:
-        url = f"https://musicbrainz.org/ws/2/discid/{discid}?inc=recordings&fmt=json"
-        r = requests.get(url, headers={"User-Agent": "PyBurn/1.0"}, timeout=8)
-        if r.status_code != 200:
+    rel = releases[0]
+    artist = "".join(c.get("name", "") + c.get("joinphrase", "") for c in rel.get("artist-credit") or []) or None
+    tracks: List[str] = []
+    media = rel.get("media") or []
+    # Prefer the medium this disc ID belongs to (multi-disc releases).
+    medium = next((m for m in media if any(d.get("id") == key for d in m.get("discs") or [])), media[0] if media else None)
+    if medium:
+        tracks = [t.get("title") or "" for t in medium.get("tracks") or []]
+    return {"album": rel.get("title") or "Audio CD", "artist": artist, "tracks": tracks, "discid": key}
+_CLIENTS: Dict[Tuple[str, str], MusicBrainzClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+def musicbrainz_client(base_url: Optional[str] = None, cache_path: Optional[Path] = None,
+                       ttl_days: float = 30) -> MusicBrainzClient:
+    # One client per server and cache file, so the Rip tab and rip jobs share the session, cache and rate limit.
+    key = (base_url or DEFAULT_BASE_URL, str(cache_path or ""))
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = MusicBrainzClient(key[0], MetadataCache(cache_path, ttl_days * 86400))
+        return _CLIENTS[key]
+def musicbrainz_lookup(tools: ToolFinder, device: str, toc: Optional[DiscToc] = None,
+                       client: Optional[MusicBrainzClient] = None) -> Optional[Dict]:
+    # MusicBrainz is asked by the disc ID of the TOC: the one a rip already read,
+    # else cdparanoia -Q. cd-discid (which gives a freedb ID) is not used.
+    if toc is None:
+        cdparanoia = tools.find("cdparanoia")
+        if not cdparanoia:
             return None
-        data = r.json()
-        title = None
-        tracks: List[str] = []
         try:
-            releases = data.get("releases", [])
-            if releases:
-                rel = releases[0]
-                title = rel.get("title")
-                if rel.get("media"):
-                    media = rel["media"][0]
-                    for t in media.get("tracks", []):
-                        tr = t.get("title")
-                        tracks.append(tr or "")
-        except Exception:
-            pass
-        return {"album": title or "Audio CD", "tracks": tracks or []}
-    except Exception:
-        return None
\ No newline at end of file
+            toc = read_toc(cdparanoia, device)
+        except (OSError, RuntimeError, subprocess.SubprocessError):
+            return None
+    return (client or musicbrainz_client()).lookup(toc)
\ No newline at end of file
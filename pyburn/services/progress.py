@@ -30,4 +30,18 @@ class ProgressTools:
         m = re.search(r"(\d{1,3})\s*%", line)
         if m:
             return ProgressTools._clamp(int(m.group(1)))
+        return None
+    @staticmethod
+    def parse_ffmpeg_duration(line: str) -> Optional[float]:
+        # "Duration: 00:03:12.34" from the input banner on stderr.
+        m = re.search(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)", line)
+        if m:
+            return int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+        return None
+    @staticmethod
+    def parse_ffmpeg_time(line: str) -> Optional[float]:
+        # "out_time_us=12345678" from "-progress pipe:1" (out_time_ms is microseconds too).
+        m = re.match(r"out_time_(?:us|ms)=(\d+)", line)
+        if m:
+            return int(m.group(1)) / 1e6
         return None
\ No newline at end of file
@@ -1,45 +1,96 @@
 from __future__ import annotations
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
-from typing import List, Optional
+import os
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, QMetaObject, Qt
+from typing import Dict, List, Optional, Tuple
 from ..core.jobs import Job, JobType, JobOptions
 from ..core.tools import ToolFinder
 from ..core.history import HistoryStore, HistoryEntry
+from .admission import TempSpaceGovernor
 from .burn import BurnWorker
+from .cache import ImageCache
+from .manifest import BackupManifest
+from .accuraterip import ChecksumDB, checksum_db
+from .metadata import MusicBrainzClient, musicbrainz_client
+from .stream import SlotPool
 from datetime import datetime
 from pathlib import Path
+class _Run:
+    def __init__(self, job: Job, worker: BurnWorker, thread: QThread):
+        self.job = job
+        self.worker = worker
+        self.thread = thread
+        self.stage = "prepare"  # prepare -> ready -> burn
+        self.log_lines: List[str] = []
+        self.devices: Dict[str, str] = {}  # device -> last status it reported (multi-copy jobs)
+class _Lane:
+    def __init__(self, key: str):
+        self.key = key
+        self.queue: List[Job] = []
+        # runs[0] owns the device once it reaches the burn stage; runs[1] is the
+        # next job preparing its image while runs[0] burns.
+        self.runs: List[_Run] = []
+    @property
+    def current(self) -> Optional[Job]:
+        return self.runs[0].job if self.runs else None
 class JobQueueService(QObject):
     sig_queue_updated = pyqtSignal()
     sig_job_started = pyqtSignal(str)
     sig_status_update = pyqtSignal(str, str, int)
+    sig_lane_update = pyqtSignal(str, str, str, int)  # lane, job_id ("" when idle), status, progress
     sig_log_line = pyqtSignal(str, str)
     sig_job_finished = pyqtSignal(str, bool, str)
     def __init__(self, tools: ToolFinder, settings: dict):
         super().__init__()
         self.tools = tools
         self.settings = settings
-        self._queue: List[Job] = []
-        self._thread: Optional[QThread] = None
-        self._worker: Optional[BurnWorker] = None
-        self._current: Optional[Job] = None
+        self._lanes: Dict[str, _Lane] = {}
+        self._claims: Dict[str, str] = {}  # device -> id of the job burning on it
+        self._governor = TempSpaceGovernor()
+        self._encoder_slots = SlotPool(os.cpu_count() or 2)  # lame/flac processes across all rips
         self.history = HistoryStore(Path(settings.get("history_file")), Path(settings.get("logs_dir")))
-        self._log_lines: List[str] = []
+    def _lane_key(self, job: Job) -> str:
+        # One lane per device; with parallel lanes disabled every job shares a single lane.
+        if not self.settings.get("parallel_device_lanes", True):
+            return "*"
+        return job.device
+    def _lane(self, key: str) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(key)
+        return lane
+    def _find_run(self, job_id: str) -> Tuple[Optional[_Lane], Optional[_Run]]:
+        for lane in self._lanes.values():
+            for run in lane.runs:
+                if run.job.id == job_id:
+                    return lane, run
+        return None, None
     def enqueue(self, job: Job):
-        self._queue.append(job)
+        lane = self._lane(self._lane_key(job))
+        lane.queue.append(job)
         self.sig_queue_updated.emit()
-        if not self._thread or not self._thread.isRunning():
-            self._start_next()
+        self._pump(lane)
     def remove(self, job_id: str):
-        if self._current and self._current.id == job_id:
+        for lane in self._lanes.values():
+            old_len = len(lane.queue)
+            lane.queue = [j for j in lane.queue if j.id != job_id]
+            if len(lane.queue) < old_len:
+                self.sig_queue_updated.emit()
+                self._pump(lane)
+                return
+    def cancel_current(self, lane_key: Optional[str] = None):
+        for key, lane in self._lanes.items():
+            if lane.runs and (lane_key is None or key == lane_key):
+                self.cancel_job(lane.runs[0].job.id)
+    def cancel_job(self, job_id: str):
+        lane, run = self._find_run(job_id)
+        if not run:
             return
-        old_len = len(self._queue)
-        self._queue = [j for j in self._queue if j.id != job_id]
-        if len(self._queue) < old_len:
-            self.sig_queue_updated.emit()
-            if not self._current:
-                self._start_next()
-    def cancel_current(self):
-        if self._worker:
-            self._worker.cancel()
+        run.worker.cancel()
+        self._governor.poke()
+        if run.stage == "ready":
+            # Prepared but still waiting for the drive: let burn() fail fast and clean up.
+            run.stage = "burn"
+            QMetaObject.invokeMethod(run.worker, "burn", Qt.ConnectionType.QueuedConnection)
     def retry(self, entry: HistoryEntry):
         opts = entry.options
         job = Job(
@@ -49,94 +100,218 @@ class JobQueueService(QObject):
             options=JobOptions(
                 temp_dir=Path(opts.get("temp_dir", self.settings.get("temp_dir"))),
                 verify=bool(opts.get("verify", False)),
+                verify_mode=opts.get("verify_mode", "full"),
+                verify_samples=int(opts.get("verify_samples", 256)),
                 speed=opts.get("speed", "Auto"),
                 volume_label=opts.get("volume_label", "DATA_DISC"),
                 output_dir=Path(opts["output_dir"]) if opts.get("output_dir") else None,
                 rip_format=opts.get("rip_format", "MP3"),
+                rip_layouts=dict(opts.get("rip_layouts") or {}),
                 rip_bitrate=int(opts.get("rip_bitrate", 320)),
+                rip_workers=int(opts.get("rip_workers", 0)),
+                rip_lookup=bool(opts.get("rip_lookup", False)),
+                rip_read_offset=int(opts.get("rip_read_offset", 0)),
                 auto_blank=bool(opts.get("auto_blank", True)),
                 eject_after=bool(opts.get("eject_after", True)),
                 dummy=bool(opts.get("dummy", False)),
+                stream=bool(opts.get("stream", False)),
+                copy_devices=list(opts.get("copy_devices") or []),
+                checksums=opts.get("checksums"),
+                backup_set=opts.get("backup_set"),
+                backup_full=bool(opts.get("backup_full", False)),
+                span=opts.get("span"),
                 album_title=opts.get("album_title"),
                 album_performer=opts.get("album_performer"),
                 track_titles=opts.get("track_titles"),
                 track_performers=opts.get("track_performers"),
+                audio_workers=int(opts.get("audio_workers", 0)),
+                audio_stream=bool(opts.get("audio_stream", False)),
             ),
         )
         self.enqueue(job)
     def get_list(self) -> List[Job]:
-        lst: List[Job] = []
-        if self._current:
-            lst.append(self._current)
-        lst.extend(self._queue)
+        lst: List[Job] = [run.job for lane in self._lanes.values() for run in lane.runs]
+        lst.extend(sorted((j for lane in self._lanes.values() for j in lane.queue), key=lambda j: j.id))
         return lst
-    def _start_next(self):
-        if self._current or not self._queue:
-            return
-        job = self._queue.pop(0)
-        self._current = job
-        job.status = "RUNNING"
+    def get_lanes(self) -> Dict[str, Optional[Job]]:
+        lanes = {key: lane.current for key, lane in self._lanes.items()}
+        # Extra drives of a multi-copy job show up as busy even without a lane of their own.
+        for dev, job_id in self._claims.items():
+            if not lanes.get(dev):
+                lanes[dev] = self._find_run(job_id)[1].job
+        return lanes
+    def running_ids(self) -> List[str]:
+        # Every job with a worker: burning, and the next one preparing or ready behind it.
+        return [run.job.id for lane in self._lanes.values() for run in lane.runs]
+    def busy(self) -> bool:
+        return any(run.thread.isRunning() for lane in self._lanes.values() for run in lane.runs)
+    def shutdown(self, wait_ms: int = 2000):
+        for lane in self._lanes.values():
+            for run in lane.runs:
+                run.worker.cancel()
+        self._governor.poke()
+        for lane in self._lanes.values():
+            for run in lane.runs:
+                run.thread.quit()
+                run.thread.wait(wait_ms)
+    def _cache(self, job: Job) -> Optional[ImageCache]:
+        if not self.settings.get("image_cache_enabled", True):
+            return None
+        max_bytes = int(float(self.settings.get("image_cache_max_gb", 20)) * 1024 ** 3)
+        return ImageCache(Path(job.options.temp_dir) / "pyburn_cache", max_bytes)
+    def _manifest(self, job: Job) -> Optional[BackupManifest]:
+        if not job.options.backup_set:
+            return None
+        return BackupManifest(Path(self.settings.get("backup_manifest_file") or Path.home() / ".pyburn_backups.sqlite"))
+    def _metadata(self, job: Job) -> Optional[MusicBrainzClient]:
+        if job.job_type != JobType.RIP or not job.options.rip_lookup:
+            return None
+        return musicbrainz_client(self.settings.get("musicbrainz_url"), self.settings.get("musicbrainz_cache"),
+                                  float(self.settings.get("musicbrainz_cache_days", 30)))
+    def _checksums(self, job: Job) -> Optional[ChecksumDB]:
+        if job.job_type != JobType.RIP or not self.settings.get("accuraterip_db"):
+            return None
+        return checksum_db(Path(self.settings["accuraterip_db"]))
+    def _encoders(self, job: Job) -> Optional[SlotPool]:
+        if job.job_type != JobType.RIP:
+            return None
+        self._encoder_slots.set_limit(int(self.settings.get("rip_encoder_cap", 0)) or os.cpu_count() or 2)
+        return self._encoder_slots
+    def _pipelining(self) -> bool:
+        return bool(self.settings.get("pipeline_prepare", True))
+    def _pump(self, lane: _Lane):
+        if not lane.runs and lane.queue:
+            self._start_run(lane, lane.queue.pop(0))
+        if lane.runs and lane.runs[0].stage == "ready":
+            head = lane.runs[0]
+            if self._claim(head.job):
+                head.stage = "burn"
+                head.job.status = "RUNNING"
+                QMetaObject.invokeMethod(head.worker, "burn", Qt.ConnectionType.QueuedConnection)
+            elif head.job.status != "READY (waiting for drive)":
+                head.job.status = "READY (waiting for drive)"
+                self._status(head.job.id, head.job.status)
+        if (self._pipelining() and len(lane.runs) == 1 and lane.runs[0].stage == "burn" and lane.queue
+                and lane.queue[0].job_type not in (JobType.RIP, JobType.VERIFY)):
+            # Overlap the next job's CPU-bound prepare stage with this burn.
+            self._start_run(lane, lane.queue.pop(0))
+    def _claim(self, job: Job) -> bool:
+        # A job may only burn once every drive it writes to is free.
+        devices = job.devices
+        if any(self._claims.get(d, job.id) != job.id for d in devices):
+            return False
+        for d in devices:
+            self._claims[d] = job.id
+        return True
+    def _release(self, job: Job):
+        for d in [d for d, jid in self._claims.items() if jid == job.id]:
+            del self._claims[d]
+    def _start_run(self, lane: _Lane, job: Job):
+        job.status = "RUNNING" if not lane.runs else "PREPARING"
         job.progress = 0
-        self._log_lines = []
-        self._worker = BurnWorker(job, self.tools, simulate_if_missing=self.settings.get("simulate_when_missing_tools", True))
-        self._thread = QThread()
-        self._worker.moveToThread(self._thread)
-        self._worker.sig_status.connect(lambda s: self._status(job.id, s))
-        self._worker.sig_progress.connect(lambda p: self._progress(job.id, p))
-        self._worker.sig_log.connect(lambda line: self._log(job.id, line))
-        self._worker.sig_finished.connect(lambda ok, msg: self._done(job.id, ok, msg))
+        worker = BurnWorker(job, self.tools, simulate_if_missing=self.settings.get("simulate_when_missing_tools", True),
+                            governor=self._governor if self._pipelining() else None, cache=self._cache(job),
+                            manifest=self._manifest(job), metadata=self._metadata(job),
+                            checksums=self._checksums(job), encoders=self._encoders(job))
+        worker.is_head = not lane.runs
+        thread = QThread()
+        run = _Run(job, worker, thread)
+        lane.runs.append(run)
+        worker.moveToThread(thread)
+        worker.sig_status.connect(lambda s: self._status(job.id, s))
+        worker.sig_progress.connect(lambda p: self._progress(job.id, p))
+        worker.sig_log.connect(lambda line: self._log(job.id, line))
+        worker.sig_prepared.connect(lambda: self._prepared(job.id))
+        worker.sig_device.connect(lambda dev, s, p: self._device(job.id, dev, s, p))
+        worker.sig_finished.connect(lambda ok, msg: self._done(job.id, ok, msg))
         # Crash recovery: ensure cleanup if thread ends without sig_finished
-        self._thread.finished.connect(lambda: self._thread_cleanup(job.id))
-        self._thread.started.connect(self._worker.start)
+        thread.finished.connect(lambda: self._thread_cleanup(job.id))
+        thread.started.connect(worker.prepare)
         self.sig_job_started.emit(job.id)
+        self.sig_lane_update.emit(lane.key, job.id, job.status, 0)
         self.sig_queue_updated.emit()
-        self._thread.start()
+        thread.start()
+    def _prepared(self, job_id: str):
+        lane, run = self._find_run(job_id)
+        if not run:
+            return
+        run.stage = "ready"
+        if run is not lane.runs[0]:
+            run.job.status = "READY (waiting for drive)"
+            self._status(job_id, run.job.status)
+        self._pump(lane)
+    def _device(self, job_id: str, device: str, s: str, p: int):
+        # An empty status is a progress-only update; a status is logged once per change.
+        lane, run = self._find_run(job_id)
+        if run is None:
+            return
+        if s and run.devices.get(device) != s:
+            self._log(job_id, f"[{device}] {s}")
+        run.devices[device] = s or run.devices.get(device, run.job.status)
+        self.sig_lane_update.emit(device, job_id, run.devices[device], max(0, min(100, p)))
     def _thread_cleanup(self, job_id: str):
-        if self._current and self._current.id == job_id:
-            if self._current.status == "RUNNING":
-                self._log_lines.append("ERROR: Worker thread terminated unexpectedly")
-                self._done(job_id, False, "Worker crashed or was terminated")
+        lane, run = self._find_run(job_id)
+        if run:
+            run.log_lines.append("ERROR: Worker thread terminated unexpectedly")
+            self._done(job_id, False, "Worker crashed or was terminated")
     def _status(self, job_id: str, s: str):
-        if self._current and self._current.id == job_id:
-            self._current.status = s
-            self.sig_status_update.emit(job_id, s, self._current.progress)
+        lane, run = self._find_run(job_id)
+        if run:
+            run.job.status = s
+            self.sig_status_update.emit(job_id, s, run.job.progress)
+            if lane.key not in run.devices:  # a drive that reports itself keeps its own figures
+                self.sig_lane_update.emit(lane.key, job_id, s, run.job.progress)
     def _progress(self, job_id: str, p: int):
-        if self._current and self._current.id == job_id:
-            self._current.progress = max(0, min(100, p))
-            self.sig_status_update.emit(job_id, self._current.status, self._current.progress)
+        lane, run = self._find_run(job_id)
+        if run:
+            run.job.progress = max(0, min(100, p))
+            self.sig_status_update.emit(job_id, run.job.status, run.job.progress)
+            if lane.key not in run.devices:
+                self.sig_lane_update.emit(lane.key, job_id, run.job.status, run.job.progress)
     def _log(self, job_id: str, line: str):
-        self._log_lines.append(line)
+        lane, run = self._find_run(job_id)
+        if run:
+            run.log_lines.append(line)
         self.sig_log_line.emit(job_id, line)
     def _done(self, job_id: str, ok: bool, msg: str):
+        lane, run = self._find_run(job_id)
+        if run is None:
+            return
         log_path = None
         try:
             log_path = Path(self.settings.get("logs_dir")) / f"{job_id}.log"
-            log_path.write_text("\n".join(self._log_lines), encoding="utf-8")
+            log_path.write_text("\n".join(run.log_lines), encoding="utf-8")
         except Exception:
             log_path = None
-        if self._current and self._current.id == job_id:
-            entry = HistoryEntry(
-                id=job_id,
-                job_type=self._current.job_type.value,
-                device=self._current.device,
-                files=[str(p) for p in self._current.files],
-                options=self._current.to_dict()["options"],
-                created_at=self._current.created_at,
-                finished_at=datetime.now().isoformat(timespec="seconds"),
-                success=ok,
-                message=msg,
-                log_file=str(log_path) if log_path else None
-            )
-            self.history.add(entry)
-            self._current.status = "COMPLETED" if ok else "FAILED"
-            if ok:
-                self._current.progress = 100
-            self.sig_job_finished.emit(job_id, ok, msg)
-        if self._thread:
-            self._thread.quit()
-            self._thread.wait()
-        self._thread = None
-        self._worker = None
-        self._current = None
+        job = run.job
+        entry = HistoryEntry(
+            id=job_id,
+            job_type=job.job_type.value,
+            device=job.device,
+            files=[str(p) for p in job.files],
+            options=job.to_dict()["options"],
+            created_at=job.created_at,
+            finished_at=datetime.now().isoformat(timespec="seconds"),
+            success=ok,
+            message=msg,
+            log_file=str(log_path) if log_path else None
+        )
+        self.history.add(entry)
+        job.status = "COMPLETED" if ok else "FAILED"
+        if ok:
+            job.progress = 100
+        lane.runs.remove(run)
+        self._release(job)
+        self.sig_job_finished.emit(job_id, ok, msg)
+        run.thread.quit()
+        run.thread.wait()
+        if lane.runs:
+            lane.runs[0].worker.is_head = True
+        self._governor.poke()
+        self.sig_lane_update.emit(lane.key, lane.current.id if lane.current else "", lane.current.status if lane.current else "IDLE",
+                                  lane.current.progress if lane.current else 0)
         self.sig_queue_updated.emit()
-        self._start_next()
\ No newline at end of file
+        self._pump(lane)
+        for other in list(self._lanes.values()):
+            if other is not lane:
+                self._pump(other)
\ No newline at end of file
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List
+from .cdtoc import TocTrack
+# Per-disc record of finished rip tracks, kept in the output folder so a failed,
+# cancelled or crashed rip resumes at its first unfinished track. A track counts
+# as done only while each of its output files (one per format) still has the
+# recorded size and CRC-32.
+def file_crc(path: Path) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+class RipJournal:
+    def __init__(self, path: Path, settings: Dict):
+        # `settings` (format, bitrate...) must match for old entries to count.
+        self.path = Path(path)
+        self.settings = settings
+        self._lock = threading.Lock()
+        self.tracks: Dict[str, Dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("settings") == settings:
+                self.tracks = dict(data.get("tracks") or {})
+        except (OSError, ValueError):
+            self.tracks = {}
+    def complete(self, track: TocTrack) -> bool:
+        # True when the track was finished and all of its output files still check out.
+        e = self.tracks.get(str(track.number))
+        if not e or e.get("start") != track.start or e.get("length") != track.length or not e.get("files"):
+            return False
+        for f in e["files"]:
+            out = Path(f.get("file", ""))
+            try:
+                if out.stat().st_size != f.get("size") or file_crc(out) != f.get("file_crc"):
+                    return False
+            except OSError:
+                return False
+        return True
+    def record(self, track: TocTrack, pcm_crc: int, outs: List[Path], **checksums):
+        # `checksums` (AccurateRip v1/v2) are kept so a resumed rip can still be checked as a whole.
+        files = [{"file": str(o), "size": o.stat().st_size, "file_crc": file_crc(o)} for o in outs]
+        entry = {"start": track.start, "length": track.length, "crc": pcm_crc, "files": files, **checksums}
+        with self._lock:
+            self.tracks[str(track.number)] = entry
+            blob = json.dumps({"settings": self.settings, "tracks": self.tracks}, indent=1)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, self.path)
+    def remove(self):
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
\ No newline at end of file
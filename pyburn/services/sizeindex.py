@@ -0,0 +1,179 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import QObject, pyqtSignal
+from .isosize import DirNode, SECTOR, estimate_tree_sectors, file_entry, merge_trees, scan_dir
+# Per-root size cache shared by every FileListWidget and by the backend. A
+# root is scanned once (its top-level subdirectories fan out over a thread
+# pool); adding or removing one root never rescans the others. A cached root
+# is reused only while every directory it read keeps the mtime seen by the
+# scan; a root added to a list again, or read for a job, is scanned afresh.
+class _Root:
+    __slots__ = ("path", "stamp", "started", "dirs", "counters", "tree", "done")
+    def __init__(self, path: str):
+        self.path = path
+        self.stamp = _stamp(path)
+        self.started = time.monotonic()
+        self.dirs: Dict[str, int] = {}  # directory -> st_mtime_ns when it was listed
+        self.counters: List[List[int]] = []  # [bytes, files] per subtree, one writer each
+        self.tree = DirNode()
+        self.done = threading.Event()
+    @property
+    def bytes(self) -> int:
+        return sum(c[0] for c in list(self.counters))
+    @property
+    def files(self) -> int:
+        return sum(c[1] for c in list(self.counters))
+    def current(self) -> bool:
+        # False once a directory gained or lost an entry since the scan read it.
+        if not self.done.is_set():
+            return True
+        if self.stamp != _stamp(self.path):
+            return False
+        try:
+            return all(os.stat(d).st_mtime_ns == m for d, m in list(self.dirs.items()))
+        except OSError:
+            return False
+_CACHE: "OrderedDict[str, _Root]" = OrderedDict()  # least recently used first
+_LOCK = threading.Lock()
+MAX_ROOTS = 64
+MAX_FILES = 2_000_000  # scanned trees kept across all cached roots
+_POOL = ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 2) * 2), thread_name_prefix="pyburn-size")
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+def _scan(root: _Root):
+    # Runs on its own thread; only leaf work goes to the pool so pool threads never wait on each other.
+    try:
+        if not os.path.isdir(root.path):
+            cell = [0, 0]
+            root.counters.append(cell)
+            try:
+                st = os.stat(root.path)
+                root.tree.files[os.path.basename(root.path.rstrip("/"))] = (st.st_size, (st.st_dev, st.st_ino) if st.st_nlink > 1 else None, 0, st.st_mtime_ns)
+                cell[0], cell[1] = st.st_size, 1
+            except OSError:
+                pass
+            return
+        top = [0, 0]
+        root.counters.append(top)
+        subdirs: List[Tuple[str, DirNode]] = []
+        try:
+            root.dirs[root.path] = os.stat(root.path).st_mtime_ns
+            with os.scandir(root.path) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            child = root.tree.dirs[e.name] = DirNode()
+                            subdirs.append((e.path, child))
+                        else:
+                            f = root.tree.files[e.name] = file_entry(e)
+                            top[0] += f[0]; top[1] += 1
+                    except OSError:
+                        continue
+        except OSError:
+            return
+        futures = []
+        for path, node in subdirs:
+            cell = [0, 0]
+            root.counters.append(cell)
+            def count(size: int, cell=cell):
+                cell[0] += size; cell[1] += 1
+            futures.append(_POOL.submit(scan_dir, path, node, count, None, root.dirs))
+        for f in futures:
+            f.result()
+    finally:
+        root.done.set()
+def _evict():
+    # Caller holds _LOCK. Drops least recently used finished roots past either
+    # bound; widgets still showing an evicted root keep their own reference.
+    files = sum(r.files for r in _CACHE.values())
+    for path, r in list(_CACHE.items()):
+        if len(_CACHE) <= MAX_ROOTS and files <= MAX_FILES:
+            break
+        if r.done.is_set():
+            del _CACHE[path]
+            files -= r.files
+def _root_for(path: str, since: Optional[float] = None) -> _Root:
+    # The cached root for `path` if it is still current (and, with `since`, was
+    # scanned at or after that time.monotonic() value); otherwise a new scan.
+    with _LOCK:
+        root = _CACHE.get(path)
+    if root is not None and (since is None or root.started >= since) and root.current():
+        with _LOCK:
+            if path in _CACHE:
+                _CACHE.move_to_end(path)
+        return root
+    root = _Root(path)
+    with _LOCK:
+        _CACHE.pop(path, None)
+        _CACHE[path] = root
+        _evict()
+    threading.Thread(target=_scan, args=(root,), daemon=True).start()
+    return root
+def total_bytes(paths: Iterable[str], since: Optional[float] = None) -> int:
+    # Blocking total for the backend: current cached roots are free, others are scanned (and cached) now.
+    roots = [_root_for(str(p), since) for p in paths]
+    for r in roots:
+        r.done.wait()
+    return sum(r.bytes for r in roots)
+def scanned_trees(paths: Iterable[str], since: Optional[float] = None) -> List[Tuple[str, DirNode]]:
+    # Blocking like total_bytes: (root path, scanned tree) for every path, from the same cache.
+    roots = [_root_for(str(p), since) for p in paths]
+    for r in roots:
+        r.done.wait()
+    return [(r.path, r.tree) for r in roots]
+class SizeIndex(QObject):
+    # raw bytes, exact -J -R image bytes (None unless requested and settled), scan finished
+    sig_size = pyqtSignal(object, object, bool)
+    def __init__(self, estimate_image: bool = False):
+        super().__init__()
+        self.estimate_image = estimate_image
+        self._roots: Dict[str, _Root] = {}
+        self._gen = 0
+        self.done = True
+    def set_paths(self, paths: List[str]):
+        wanted = [str(p) for p in paths]
+        for p in list(self._roots):
+            if p not in wanted:
+                del self._roots[p]
+        for p in wanted:
+            if p not in self._roots:
+                self._roots[p] = _root_for(p, time.monotonic())  # (re-)added: always a fresh scan
+        self._gen += 1
+        self.done = False
+        gen = self._gen
+        roots = list(self._roots.values())
+        threading.Thread(target=self._follow, args=(gen, roots), daemon=True).start()
+    def _follow(self, gen: int, roots: List[_Root]):
+        # Rescans roots kept from the last selection whose directories changed,
+        # then streams partial totals every 100 ms until every root has settled.
+        for i, r in enumerate(roots):
+            if not r.current():
+                roots[i] = _root_for(r.path)
+                if gen == self._gen and self._roots.get(r.path) is r:
+                    self._roots[r.path] = roots[i]
+        while gen == self._gen and not all(r.done.is_set() for r in roots):
+            self.sig_size.emit(sum(r.bytes for r in roots), None, False)
+            time.sleep(0.1)
+        if gen != self._gen:
+            return
+        raw = sum(r.bytes for r in roots)
+        image = None
+        if self.estimate_image and roots:
+            tree = roots[0].tree if len(roots) == 1 else merge_trees([r.tree for r in roots])
+            image = estimate_tree_sectors(tree) * SECTOR
+        if gen != self._gen:
+            return
+        self.done = True
+        self.sig_size.emit(raw, image, True)
+    def trees(self) -> List[Tuple[str, DirNode]]:
+        # (root path, scanned tree) for every root of the current selection, in list order.
+        return [(p, r.tree) for p, r in self._roots.items()]
\ No newline at end of file
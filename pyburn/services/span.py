@@ -0,0 +1,392 @@
+from __future__ import annotations
+import json
+import os
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from .isosize import (
+    DirNode, FileCosts, SECTOR, DOT_RECORDS, ROOT_DOT_RECORDS, MAX_EXTENT, MAX_ISO_RECORD, MAX_JOLIET_RECORD,
+    dir_entry_cost, file_costs, file_entry_cost, estimate_tree_sectors, name_bytes, subtree_cost, root_cost,
+)
+# Multi-disc spanning: packs a selection that does not fit one disc onto as
+# few discs as it can. Whole directories go onto one disc whenever they fit
+# (first fit over the last few open discs); directories bigger than a disc
+# are descended into, and files bigger than a disc (or than one ISO9660
+# extent) are cut into numbered parts. The files of a descended directory go
+# in runs: as many as fit, found by bisecting prefix sums of their cached
+# costs. Partially filled directories are sized with an upper bound while
+# packing, then every disc is sized exactly.
+INDEX_NAME = "PYBURN_SPAN.TXT"
+_ISO_FILL = SECTOR - MAX_ISO_RECORD
+_JOL_FILL = SECTOR - MAX_JOLIET_RECORD
+_MAX_EXTENT = MAX_EXTENT
+_MIN_PART = 1024 * 1024
+_FIXED = 16 + 1 + 1 + 1 + 1 + 1  # system area and descriptors, version block, ER record
+_PAD = 150 + 15
+class _Dir:
+    __slots__ = ("iso", "jol", "ce", "dirs", "node")
+    def __init__(self, root: bool = False):
+        self.iso, self.jol = ROOT_DOT_RECORDS if root else DOT_RECORDS
+        self.ce = 0
+        self.dirs: Dict[str, _Dir] = {}
+        self.node = DirNode()
+    def bound(self, iso: int = 0, jol: int = 0, ce: int = 0) -> int:
+        return -(-(self.iso + iso) // _ISO_FILL) + -(-(self.jol + jol) // _JOL_FILL) + -(-(self.ce + ce) // SECTOR)
+class SpanDisc:
+    def __init__(self, reserve: int):
+        self.root = _Dir(root=True)
+        rec = file_entry_cost(INDEX_NAME)
+        self.root.iso += rec[0]; self.root.ce += rec[1]; self.root.jol += rec[2]
+        self.partial = self.root.bound()
+        self.whole = 0
+        self.data = reserve
+        self.links: Dict[Tuple[int, int], int] = {}
+        self.ptbl = 0
+        self.jptbl = 0
+        self.grafts: List[Tuple[str, str]] = []
+        self.runs: List[Tuple[str, str, List[str], int]] = []  # image dir, source dir, file names, their name bytes
+        self.chunks: List[Tuple[str, str, int, int]] = []
+        self.sectors = 0
+    @property
+    def bytes(self) -> int:
+        return (self.data + sum(self.links.values())) * SECTOR
+    @property
+    def part_bytes(self) -> int:
+        return sum(c[3] for c in self.chunks)
+    def used(self, partial: int = 0, whole: int = 0, data: int = 0, ptbl: int = 0, jptbl: int = 0) -> int:
+        total = _FIXED + 2 * -(-(10 + self.ptbl + ptbl) // SECTOR) + 2 * -(-(10 + self.jptbl + jptbl) // SECTOR)
+        return total + self.partial + partial + self.whole + whole + self.data + data + _PAD
+    def add(self, parts: List[str], rec: Tuple[int, int, int], limit: int, whole: int = 0, data: int = 0,
+            ptbl: int = 0, jptbl: int = 0, links: Optional[Dict[Tuple[int, int], int]] = None,
+            name: str = "", node: Optional[DirNode] = None, entry: Optional[tuple] = None) -> bool:
+        # Adds a directory subtree (`node`) or a file (`entry`) named `name` under
+        # parts if the upper-bound size still fits `limit`; rec is its record.
+        d, missing = self._reach(parts)
+        if not missing and (name in d.node.dirs or name in d.node.files):
+            return False  # same name from two roots: mkisofs would merge them, so keep them on different discs
+        chain = [dir_entry_cost(m) for m in missing]
+        recs = [(c[0], c[1], c[2]) for c in chain] + [rec]
+        pdelta = d.bound(recs[0][0], recs[0][2], recs[0][1]) - d.bound()
+        for r in recs[1:]:
+            pdelta += _Dir().bound(r[0], r[2], r[1])
+        ptbl += sum(c[3] for c in chain)
+        jptbl += sum(c[4] for c in chain)
+        if links:
+            data += sum(v for k, v in links.items() if k not in self.links)
+        if self.used(pdelta, whole, data, ptbl, jptbl) > limit:
+            return False
+        r = recs[0]
+        d.iso += r[0]; d.ce += r[1]; d.jol += r[2]
+        for m, r in zip(missing, recs[1:]):
+            nd = _Dir()
+            nd.iso += r[0]; nd.ce += r[1]; nd.jol += r[2]
+            d.dirs[m] = nd
+            d.node.dirs[m] = nd.node
+            d = nd
+        if node is not None:
+            d.node.dirs[name] = node
+        else:
+            d.node.files[name] = entry
+        self.partial += pdelta
+        self.whole += whole
+        self.data += data
+        self.ptbl += ptbl
+        self.jptbl += jptbl
+        if links:
+            self.links.update(links)
+        return True
+    def _reach(self, parts: List[str]) -> Tuple[_Dir, List[str]]:
+        # The deepest directory of `parts` already on the disc, and the names still missing below it.
+        d = self.root
+        i = 0
+        while i < len(parts) and parts[i] in d.dirs:
+            d = d.dirs[parts[i]]
+            i += 1
+        return d, parts[i:]
+    def add_run(self, parts: List[str], node: DirNode, fc: FileCosts, sums: Tuple[array, ...],
+                i: int, j: int, limit: int, src: str) -> int:
+        # Adds the longest prefix of files fc.names[i:j] of `node` that fits
+        # `limit`, all under parts; `sums` are prefix sums of fc's iso, ce, jol
+        # and sectors. Returns how many files went in.
+        d, missing = self._reach(parts)
+        chain = [dir_entry_cost(m) for m in missing]
+        ptbl = sum(c[3] for c in chain)
+        jptbl = sum(c[4] for c in chain)
+        if missing:
+            const = d.bound(chain[0][0], chain[0][2], chain[0][1]) - d.bound()
+            const += sum(_Dir().bound(c[0], c[2], c[1]) for c in chain[1:])
+            holder = _Dir()
+        else:
+            const = -d.bound()
+            holder = d
+        iso, ce, jol, sectors = sums
+        def fits(k: int) -> bool:
+            e = i + k
+            pdelta = const + holder.bound(iso[e] - iso[i], jol[e] - jol[i], ce[e] - ce[i])
+            return self.used(pdelta, 0, sectors[e] - sectors[i], ptbl, jptbl) <= limit
+        if not fits(1):
+            return 0
+        lo, hi = 1, j - i
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        k = lo
+        names = fc.names[i:i + k]
+        if not missing and (d.node.files or d.node.dirs):
+            # Same name from two roots: mkisofs would merge them, so keep them on different discs.
+            k = next((n for n, name in enumerate(names) if name in d.node.files or name in d.node.dirs), k)
+            if not k:
+                return 0
+            names = names[:k]
+        e = i + k
+        pdelta = const + holder.bound(iso[e] - iso[i], jol[e] - jol[i], ce[e] - ce[i])
+        if missing:
+            r = chain[0]
+            d.iso += r[0]; d.ce += r[1]; d.jol += r[2]
+            for n, m in enumerate(missing):
+                nd = _Dir()
+                if n + 1 < len(chain):
+                    r = chain[n + 1]
+                    nd.iso += r[0]; nd.ce += r[1]; nd.jol += r[2]
+                d.dirs[m] = nd
+                d.node.dirs[m] = nd.node
+                d = nd
+        fresh = not d.node.files
+        d.iso += iso[e] - iso[i]; d.ce += ce[e] - ce[i]; d.jol += jol[e] - jol[i]
+        d.node.files.update(zip(names, map(node.files.__getitem__, names)))
+        # A directory holding one run reuses the source's costs for the exact sizing at the end.
+        d.node.fcost = fc.slice(i, e, node.files) if fresh else None
+        self.partial += pdelta
+        self.data += sectors[e] - sectors[i]
+        self.ptbl += ptbl
+        self.jptbl += jptbl
+        self.runs.append(("/".join(parts), src, names, sum(fc.nbytes[i:e])))
+        return k
+class SpanPlan:
+    def __init__(self, discs: List[SpanDisc], capacity: int, roots: List[Tuple[str, DirNode]]):
+        self.discs = discs
+        self.capacity = capacity
+        self.roots = roots
+    def index_lines(self) -> List[str]:
+        lines: List[str] = []
+        for n, disc in enumerate(self.discs, start=1):
+            for rel, src in disc.grafts:
+                node = disc_node(disc, rel)
+                if node is None:
+                    lines.append(f"{n}\t{rel}")
+                    continue
+                stack = [(rel, node)]
+                while stack:
+                    base, nd = stack.pop()
+                    for fn in sorted(nd.files):
+                        lines.append(f"{n}\t{base}/{fn}")
+                    stack.extend((f"{base}/{dn}", nd.dirs[dn]) for dn in sorted(nd.dirs, reverse=True))
+            for rel, src, names, _ in disc.runs:
+                lines.extend(f"{n}\t{rel}/{name}" if rel else f"{n}\t{name}" for name in names)
+            for rel, src, off, length in disc.chunks:
+                lines.append(f"{n}\t{rel}\tpart of {src}\toffset {off}\tlength {length}")
+        return lines
+    def index_bytes(self) -> int:
+        # Size of index_lines() without building them, from the cached subtree costs.
+        total = 0
+        for n, disc in enumerate(self.discs, start=1):
+            for rel, src in disc.grafts:
+                node = disc_node(disc, rel)
+                head = len(str(n)) + 1 + name_bytes(rel)
+                if node is None:
+                    total += head + 1
+                    continue
+                c = subtree_cost(node)
+                total += c.paths + c.nfiles * (head + 2)
+            for rel, src, names, nbytes in disc.runs:
+                total += nbytes + len(names) * (len(str(n)) + 2 + (name_bytes(rel) + 1 if rel else 0))
+            for rel, src, off, length in disc.chunks:
+                total += len(f"{n}\t{rel}\tpart of {src}\toffset {off}\tlength {length}".encode("utf-8")) + 1
+        return total
+    def save(self, out_dir: Path, set_id: str, volume: str) -> Path:
+        # Writes span_<set>.txt (the index burned onto every disc) and span_<set>.json (the plan the jobs read).
+        out_dir.mkdir(parents=True, exist_ok=True)
+        index = out_dir / f"span_{set_id}.txt"
+        header = [f"# PyBurn spanning index - set {set_id}, volume {volume}, {len(self.discs)} discs",
+                  f"# created {datetime.now().isoformat(timespec='seconds')}",
+                  "# disc<TAB>path; split files list every part with its byte offset and length"]
+        index.write_text("\n".join(header + self.index_lines()) + "\n", encoding="utf-8")
+        plan = {
+            "set": set_id,
+            "volume": volume,
+            "capacity": self.capacity,
+            "index": str(index),
+            "discs": [{"grafts": d.grafts, "runs": [r[:3] for r in d.runs], "chunks": d.chunks, "sectors": d.sectors,
+                       "bytes": d.bytes, "parts": d.part_bytes}
+                      for d in self.discs],
+        }
+        path = out_dir / f"span_{set_id}.json"
+        path.write_text(json.dumps(plan), encoding="utf-8")
+        return path
+def disc_node(disc: SpanDisc, rel: str) -> Optional[DirNode]:
+    node = disc.root.node
+    for part in rel.split("/"):
+        node = node.dirs.get(part)
+        if node is None:
+            return None
+    return node
+def _index_reserve(roots: List[Tuple[str, DirNode]]) -> int:
+    total = 0
+    for path, tree in roots:
+        c = root_cost(tree)
+        total += c.paths + c.nfiles * 8
+    return -(-(total + 4096) // SECTOR)
+def plan_span(roots: List[Tuple[str, DirNode]], capacity_sectors: int, window: int = 8,
+              reserve: Optional[int] = None, cancelled: Callable[[], bool] = lambda: False) -> SpanPlan:
+    limit = capacity_sectors
+    if reserve is None:
+        reserve = _index_reserve(roots)
+    discs: List[SpanDisc] = [SpanDisc(reserve)]
+    if SpanDisc(reserve).used() >= limit:
+        raise ValueError("Disc is too small to hold even the spanning index")
+    def place(parts: List[str], name: str, rec, **kw) -> SpanDisc:
+        for disc in discs[-window:]:
+            if disc.add(parts, rec, limit, name=name, **kw):
+                return disc
+        disc = SpanDisc(reserve)
+        discs.append(disc)
+        if not disc.add(parts, rec, limit, name=name, **kw):
+            raise ValueError(f"{'/'.join(parts + [name])} does not fit on an empty disc")
+        return disc
+    def fresh_fits(parts: List[str], rec, **kw) -> bool:
+        return SpanDisc(reserve).add(parts, rec, limit, **kw)
+    def place_dir(parts: List[str], name: str, node: DirNode, src: str):
+        c = subtree_cost(node)
+        dc = dir_entry_cost(name)
+        kw = dict(whole=c.dir_sectors, data=c.data, ptbl=c.ptbl + dc[3], jptbl=c.jptbl + dc[4], links=c.links)
+        rec = (dc[0], dc[1], dc[2])
+        if fresh_fits(parts, rec, name=name, node=DirNode(), **kw):
+            disc = place(parts, name, rec, node=node, **kw)
+            disc.grafts.append(("/".join(parts + [name]), src))
+            return
+        if cancelled():
+            raise RuntimeError("cancelled")
+        sub = parts + [name]
+        for dn in sorted(node.dirs):
+            place_dir(sub, dn, node.dirs[dn], os.path.join(src, dn))
+        place_files(sub, node, src)
+    def place_files(parts: List[str], node: DirNode, src: str):
+        # Every file of `node`, in name order, in runs that each fill one disc;
+        # files over one extent, or too big for an empty disc, are cut up one at a time.
+        fc = file_costs(node)
+        n = len(fc.names)
+        big = fc.big
+        b = 0
+        i = 0
+        while i < n:
+            if cancelled():
+                raise RuntimeError("cancelled")
+            if b < len(big) and big[b] == i:
+                b += 1
+                place_file(parts, fc.names[i], node.files[fc.names[i]], os.path.join(src, fc.names[i]))
+                i += 1
+                continue
+            sums = fc.sums()
+            stop = big[b] if b < len(big) else n
+            k = 0
+            for disc in discs[-window:]:
+                k = disc.add_run(parts, node, fc, sums, i, stop, limit, src)
+                if k:
+                    break
+            if not k:
+                discs.append(SpanDisc(reserve))
+                k = discs[-1].add_run(parts, node, fc, sums, i, stop, limit, src)
+            if not k:
+                place_file(parts, fc.names[i], node.files[fc.names[i]], os.path.join(src, fc.names[i]))
+                k = 1
+            i += k
+    def place_file(parts: List[str], name: str, entry: tuple, src: str):
+        size, key, sl, _ = entry
+        sectors = -(-size // SECTOR)
+        rec = file_entry_cost(name, sl)
+        kw = dict(links={key: sectors}) if key is not None else dict(data=0 if sl else sectors)
+        if size <= _MAX_EXTENT and fresh_fits(parts, rec, name=name, entry=entry, **kw):
+            disc = place(parts, name, rec, entry=entry, **kw)
+            disc.grafts.append(("/".join(parts + [name]), src))
+            return
+        off = 0
+        part = 1
+        while off < size:
+            pname = f"{name}.{part:03d}"
+            prec = file_entry_cost(pname)
+            disc = discs[-1]
+            room = min((limit - disc.used()) * SECTOR - SECTOR, _MAX_EXTENT)
+            if room < _MIN_PART and room < size - off:
+                disc = SpanDisc(reserve)
+                discs.append(disc)
+                room = min((limit - disc.used()) * SECTOR - SECTOR, _MAX_EXTENT)
+            take = min(size - off, room)
+            while take > 0 and not disc.add(parts, prec, limit, data=-(-take // SECTOR), name=pname, entry=(take, None, 0, 0)):
+                take -= SECTOR
+            if take <= 0:
+                raise ValueError(f"Cannot place a part of {src}")
+            disc.chunks.append(("/".join(parts + [pname]), src, off, take))
+            off += take
+            part += 1
+    for path, tree in roots:
+        if os.path.isdir(path):
+            for dn in sorted(tree.dirs):
+                place_dir([], dn, tree.dirs[dn], os.path.join(path, dn))
+            place_files([], tree, path)
+        else:
+            for fn, entry in tree.files.items():
+                place_file([], fn, entry, path)
+    discs = [d for d in discs if d.grafts or d.runs or d.chunks]
+    plan = SpanPlan(discs, capacity_sectors, roots)
+    index_bytes = plan.index_bytes() + 4096
+    if -(-index_bytes // SECTOR) > reserve:
+        # Long chunk lines outgrew the estimate; plan again with the measured size.
+        return plan_span(roots, capacity_sectors, window, -(-index_bytes // SECTOR) + 1, cancelled)
+    for d in discs:
+        d.root.node.files[INDEX_NAME] = (reserve * SECTOR, None, 0, 0)
+        d.sectors = estimate_tree_sectors(d.root.node)
+        if d.sectors > capacity_sectors:
+            raise ValueError(f"Disc plan overflows: {d.sectors} > {capacity_sectors} sectors")
+    return plan
+def escape_graft(path: str) -> str:
+    # mkisofs -graft-points treats "=" as the separator; escape it and the escape character.
+    return path.replace("\\", "\\\\").replace("=", "\\=")
+def write_pathlist(grafts: List[Tuple[str, str]], path: Path) -> Path:
+    # One pathspec per line for `mkisofs -graft-points -path-list`; an empty
+    # image path places the source like a plain argument.
+    with open(path, "w", encoding="utf-8") as f:
+        for rel, src in grafts:
+            f.write(f"{escape_graft(rel)}={escape_graft(src)}\n" if rel else f"{escape_graft(src)}\n")
+    return path
+def disc_grafts(span: Dict, work_dir: Path, cancelled: Callable[[], bool] = lambda: False) -> Tuple[List[Tuple[str, str]], int]:
+    # Materializes one disc of a saved plan: cuts its file parts into
+    # work_dir/span_chunks and returns its (image path, source) grafts plus
+    # the bytes written for parts.
+    plan = json.loads(Path(span["plan"]).read_text(encoding="utf-8"))
+    disc = plan["discs"][span["disc"]]
+    grafts = [(INDEX_NAME, plan["index"])] + [(rel, src) for rel, src in disc["grafts"]]
+    for rel, src, names in disc.get("runs", []):
+        grafts.extend((f"{rel}/{name}" if rel else name, os.path.join(src, name)) for name in names)
+    chunk_dir = work_dir / "span_chunks"
+    written = 0
+    for rel, src, off, length in disc["chunks"]:
+        dest = chunk_dir / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(src, "rb") as fi, open(dest, "wb") as fo:
+            fi.seek(off)
+            left = length
+            while left > 0:
+                if cancelled():
+                    raise RuntimeError("cancelled")
+                buf = fi.read(min(left, 1024 * 1024))
+                if not buf:
+                    raise RuntimeError(f"{src} is shorter than planned")
+                fo.write(buf)
+                left -= len(buf)
+        written += length
+        grafts.append((rel, str(dest)))
+    return grafts, written
\ No newline at end of file
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+# Bounded chunk buffer shared by one producer and N readers; a chunk is
+# released once every attached reader has consumed it.
+class RingBuffer:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max(1, max_bytes)
+        self._chunks: Deque[bytes] = deque()
+        self._base = 0
+        self._bytes = 0
+        self._cursors: Dict[int, int] = {}
+        self._next_reader = 0
+        self._closed = False
+        self._aborted = False
+        self._cond = threading.Condition()
+    def attach(self) -> int:
+        with self._cond:
+            rid = self._next_reader
+            self._next_reader += 1
+            self._cursors[rid] = self._base
+            return rid
+    def detach(self, rid: int):
+        with self._cond:
+            self._cursors.pop(rid, None)
+            self._trim()
+            self._cond.notify_all()
+    def put(self, chunk: bytes) -> bool:
+        with self._cond:
+            while not self._aborted and self._cursors and self._bytes + len(chunk) > self.max_bytes and self._bytes > 0:
+                self._cond.wait(0.5)
+            if self._aborted:
+                return False
+            if not self._cursors:
+                return True
+            self._chunks.append(chunk)
+            self._bytes += len(chunk)
+            self._cond.notify_all()
+            return True
+    def get(self, rid: int) -> Optional[bytes]:
+        with self._cond:
+            while True:
+                if self._aborted or rid not in self._cursors:
+                    return None
+                idx = self._cursors[rid] - self._base
+                if idx < len(self._chunks):
+                    chunk = self._chunks[idx]
+                    self._cursors[rid] += 1
+                    self._trim()
+                    return chunk
+                if self._closed:
+                    return None
+                self._cond.wait(0.5)
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    def abort(self):
+        with self._cond:
+            self._aborted = True
+            self._chunks.clear()
+            self._bytes = 0
+            self._cond.notify_all()
+    @property
+    def buffered(self) -> int:
+        return self._bytes
+    def _trim(self):
+        low = min(self._cursors.values()) if self._cursors else self._base + len(self._chunks)
+        freed = False
+        while self._chunks and self._base < low:
+            self._bytes -= len(self._chunks.popleft())
+            self._base += 1
+            freed = True
+        if freed:
+            self._cond.notify_all()
+class SlotPool:
+    # Counting limit shared by concurrent jobs (encoder processes across rips).
+    # acquire(n) takes all n slots at once, so a job never sits on part of what
+    # it needs while waiting for the rest.
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._used = 0
+        self._cond = threading.Condition()
+    def set_limit(self, limit: int):
+        with self._cond:
+            self.limit = max(1, limit)
+            self._cond.notify_all()
+    def acquire(self, n: int, cancelled: Callable[[], bool] = lambda: False) -> int:
+        # Returns the slots taken (n, at most the whole limit), or 0 when cancelled.
+        with self._cond:
+            while True:
+                want = min(n, self.limit)
+                if cancelled():
+                    return 0
+                if self._used + want <= self.limit:
+                    self._used += want
+                    return want
+                self._cond.wait(0.5)
+    def release(self, n: int):
+        with self._cond:
+            self._used = max(0, self._used - n)
+            self._cond.notify_all()
+    @property
+    def used(self) -> int:
+        return self._used
\ No newline at end of file
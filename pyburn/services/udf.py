@@ -0,0 +1,164 @@
+from __future__ import annotations
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+from .iso9660 import SECTOR, BlockSource, DiscReader, IsoEntry
+# Read-only UDF reader (1.02 through 2.60, including the 2.50 metadata
+# partition used on Blu-ray and DVD-R with UDF 2.5): anchor, volume descriptor
+# sequence, file set, then File Entries and File Identifier Descriptors.
+# Virtual (VAT) partitions of packet-written discs are not supported.
+_TAG_AVDP, _TAG_PD, _TAG_LVD, _TAG_TD = 2, 5, 6, 8
+_TAG_FSD, _TAG_FID, _TAG_AED, _TAG_FE, _TAG_EFE = 256, 257, 258, 261, 266
+_FILE_DIR = 4
+def _u16(b: bytes, o: int) -> int:
+    return struct.unpack_from("<H", b, o)[0]
+def _u32(b: bytes, o: int) -> int:
+    return struct.unpack_from("<I", b, o)[0]
+def _dchars(b: bytes) -> str:
+    # OSTA compressed unicode: 8 = one byte per char, 16 = UTF-16BE.
+    if not b:
+        return ""
+    if b[0] == 16:
+        return b[1:].decode("utf-16-be", "replace")
+    return b[1:].decode("latin-1")
+def _dstring(b: bytes) -> str:
+    n = b[-1]
+    return _dchars(b[:n]).strip() if n else ""
+class UdfReader(DiscReader):
+    def __init__(self, source: BlockSource):
+        self.source = source
+        self._starts: Dict[int, int] = {}  # partition number -> first sector
+        self._maps: List[Tuple[str, int]] = []  # partition reference -> ("physical"|"metadata", partition number)
+        self._meta: List[Tuple[int, int]] = []  # metadata partition extents: (first sector, blocks)
+        self._meta_file: Optional[Tuple[int, int]] = None  # (partition number, block) of the metadata file
+        avdp = self.read_at(256 * SECTOR, SECTOR)
+        if len(avdp) < 24 or _u16(avdp, 0) != _TAG_AVDP:
+            raise ValueError("No UDF anchor volume descriptor")
+        length, loc = _u32(avdp, 16), _u32(avdp, 20)
+        lvd = None
+        for n in range(loc, loc + max(1, length // SECTOR)):
+            d = self.read_at(n * SECTOR, SECTOR)
+            tag = _u16(d, 0)
+            if tag == _TAG_PD:
+                self._starts[_u16(d, 22)] = _u32(d, 188)
+            elif tag == _TAG_LVD:
+                lvd = d
+            elif tag == _TAG_TD:
+                break
+        if lvd is None or not self._starts:
+            raise ValueError("Incomplete UDF volume descriptor sequence")
+        if _u32(lvd, 212) != SECTOR:
+            raise ValueError(f"Unsupported UDF logical block size {_u32(lvd, 212)}")
+        self.volume_id = _dstring(lvd[84:212])
+        self._read_maps(lvd[440:440 + _u32(lvd, 264)], _u32(lvd, 268))
+        fsd_block, fsd_part = _u32(lvd, 252), _u16(lvd, 256)
+        fsd = self.read_at(self._sector(fsd_part, fsd_block) * SECTOR, SECTOR)
+        if _u16(fsd, 0) != _TAG_FSD:
+            raise ValueError("No UDF file set descriptor")
+        self._root_icb = (_u16(fsd, 408), _u32(fsd, 404))
+    def _read_maps(self, table: bytes, count: int):
+        i = 0
+        for _ in range(count):
+            kind, ln = table[i], table[i + 1]
+            if kind == 1:
+                self._maps.append(("physical", _u16(table, i + 4)))
+            elif kind == 2:
+                ident = table[i + 5:i + 28].rstrip(b"\x00")
+                part = _u16(table, i + 38)
+                if ident == b"*UDF Metadata Partition":
+                    self._maps.append(("metadata", part))
+                    self._meta_file = (part, _u32(table, i + 40))
+                elif ident == b"*UDF Sparable Partition":
+                    self._maps.append(("physical", part))
+                else:
+                    raise ValueError(f"Unsupported UDF partition type {ident.decode('ascii', 'replace')}")
+            i += ln
+        if self._meta_file is not None:
+            # The metadata partition's blocks are the data of its metadata file, which lives in the physical partition.
+            part, block = self._meta_file
+            start = self._starts[part]
+            offset = (start + block) * SECTOR
+            _, _, runs = self._file_entry(self.read_at(offset, SECTOR), offset, -1, start)
+            self._meta = [(off // SECTOR, ln // SECTOR) for off, ln in runs if off >= 0]
+    def _sector(self, ref: int, block: int) -> int:
+        kind, part = self._maps[ref]
+        if kind == "physical":
+            return self._starts[part] + block
+        for first, count in self._meta:
+            if block < count:
+                return first + block
+            block -= count
+        raise ValueError("UDF metadata block out of range")
+    def _ads(self, data: bytes, kind: int, ref: int) -> Iterator[Tuple[int, int, int, int]]:
+        # (extent type, length, partition reference, block) for short (0) and long (1) allocation descriptors.
+        step = 8 if kind == 0 else 16
+        for i in range(0, len(data) - step + 1, step):
+            raw = _u32(data, i)
+            ext, length = raw >> 30, raw & 0x3FFFFFFF
+            if length == 0:
+                break
+            block = _u32(data, i + 4)
+            part = ref if kind == 0 else _u16(data, i + 8)
+            yield ext, length, part, block
+    def _file_entry(self, fe: bytes, fe_offset: int, ref: int, phys_start: Optional[int] = None) -> Tuple[int, int, List[Tuple[int, int]]]:
+        # (file type, size, byte runs) of a File Entry or Extended File Entry.
+        tag = _u16(fe, 0)
+        if tag == _TAG_FE:
+            ea, ad_len, head = _u32(fe, 168), _u32(fe, 172), 176
+        elif tag == _TAG_EFE:
+            ea, ad_len, head = _u32(fe, 208), _u32(fe, 212), 216
+        else:
+            raise ValueError(f"Expected a UDF file entry, found tag {tag}")
+        ftype = fe[27]
+        size = struct.unpack_from("<Q", fe, 56)[0]
+        kind = _u16(fe, 34) & 7
+        start = head + ea
+        if kind == 3:
+            return ftype, size, [(fe_offset + start, min(size, ad_len))]
+        if kind not in (0, 1):
+            raise ValueError("Extended allocation descriptors are not supported")
+        runs: List[Tuple[int, int]] = []
+        data = fe[start:start + ad_len]
+        left = size
+        while data is not None:
+            nxt = None
+            for ext, length, part, block in self._ads(data, kind, ref):
+                if ext == 3:  # the list continues in an Allocation Extent Descriptor
+                    sector = phys_start + block if phys_start is not None else self._sector(part, block)
+                    aed = self.read_at(sector * SECTOR, length)
+                    nxt = aed[24:24 + _u32(aed, 20)] if _u16(aed, 0) == _TAG_AED else None
+                    break
+                n = min(length, left)
+                if n <= 0:
+                    break
+                if ext == 0:
+                    sector = phys_start + block if phys_start is not None else self._sector(part, block)
+                    runs.append((sector * SECTOR, n))
+                else:
+                    runs.append((-1, n))  # allocated or unallocated but not recorded: reads as zeros
+                left -= n
+            data = nxt
+        return ftype, size, runs
+    def _entry(self, path: str, ref: int, block: int) -> IsoEntry:
+        sector = self._sector(ref, block)
+        ftype, size, runs = self._file_entry(self.read_at(sector * SECTOR, SECTOR), sector * SECTOR, ref)
+        first = next((off // SECTOR for off, _ in runs if off >= 0), sector)
+        return IsoEntry(path, first, size, ftype == _FILE_DIR, runs)
+    def _root(self) -> IsoEntry:
+        return self._entry("", *self._root_icb)
+    def _children(self, d: IsoEntry) -> Iterator[IsoEntry]:
+        data = self.read_file(d)
+        found: List[Tuple[int, int, str]] = []
+        i = 0
+        while i + 38 <= len(data):
+            if _u16(data, i) != _TAG_FID:
+                break
+            chars, l_fi = data[i + 18], data[i + 19]
+            ref, block = _u16(data, i + 28), _u32(data, i + 24)
+            l_iu = _u16(data, i + 36)
+            name = _dchars(data[i + 38 + l_iu:i + 38 + l_iu + l_fi])
+            if not chars & 0x0C:  # skip deleted entries and the parent link
+                found.append((ref, block, f"{d.path}/{name}" if d.path else name))
+            i += (38 + l_iu + l_fi + 3) & ~3
+        # File Entries are read in disc order so a drive seeks forward only.
+        for ref, block, path in sorted(found, key=lambda x: self._sector(x[0], x[1])):
+            yield self._entry(path, ref, block)
\ No newline at end of file
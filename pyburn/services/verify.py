@@ -1,11 +1,59 @@
 from __future__ import annotations
+import bisect
 import hashlib
+import os
+import random
 import subprocess
+import threading
 import time
 from pathlib import Path
-from typing import Callable, Optional, Set
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 from .exec import ProcessRunner
+from .iso9660 import open_disc
 from ..core.tools import ToolFinder
+SAMPLE_SECTORS = 32  # sectors per sampled range (64 KiB)
+CONFIDENCE = 0.95
+class SampleSet:
+    # Random, read-order-sorted byte ranges of an image and the bytes expected
+    # there. Expected bytes come from the image file or are captured from the
+    # stream as it is burned, so streamed burns can be sampled too.
+    def __init__(self, size: int, count: int, sectors: int = SAMPLE_SECTORS, seed: Optional[int] = None):
+        self.size = size
+        blocks = max(1, size // (sectors * 2048))
+        rng = random.Random(seed)
+        picks = sorted(rng.sample(range(blocks), min(count, blocks)))
+        self.ranges: List[Tuple[int, int]] = [(b * sectors * 2048, min(sectors * 2048, size - b * sectors * 2048)) for b in picks]
+        self._starts = [r[0] for r in self.ranges]
+        self.expected: Dict[int, bytearray] = {off: bytearray() for off, _ in self.ranges}
+    def feed(self, offset: int, chunk: bytes):
+        # Called with consecutive stream chunks; copies out the sampled bytes.
+        end = offset + len(chunk)
+        i = max(0, bisect.bisect_right(self._starts, offset) - 1)
+        while i < len(self.ranges) and self.ranges[i][0] < end:
+            start, length = self.ranges[i]
+            lo, hi = max(start, offset), min(start + length, end)
+            if lo < hi:
+                self.expected[start] += chunk[lo - offset:hi - offset]
+            i += 1
+    def load(self, image: Path):
+        with open(image, "rb") as f:
+            for start, length in self.ranges:
+                f.seek(start)
+                self.expected[start] = bytearray(f.read(length))
+    def capture(self) -> "SampleSet":
+        # The same ranges with nothing captured yet, for collecting what a readback returns.
+        s = SampleSet.__new__(SampleSet)
+        s.size, s.ranges, s._starts = self.size, self.ranges, self._starts
+        s.expected = {off: bytearray() for off, _ in self.ranges}
+        return s
+    def coverage(self) -> Tuple[float, float]:
+        # (fraction of the image read, damaged fraction ruled out at CONFIDENCE):
+        # if more than that share of ranges were bad, a clean sample this size
+        # would have happened less than 5% of the time.
+        n = len(self.ranges)
+        read = sum(r[1] for r in self.ranges) / max(1, self.size)
+        bound = 1.0 - (1.0 - CONFIDENCE) ** (1.0 / n) if n else 1.0
+        return read, bound
 class VerificationTools:
     def __init__(self, tools: ToolFinder, runner: ProcessRunner):
         self.tools = tools
@@ -18,56 +66,185 @@ class VerificationTools:
                     raise RuntimeError("Verification cancelled")
                 h.update(chunk)
         return h.hexdigest()
-    def _monitor_file_growth(self, target: Path, total: int, phase_emit: Callable[[int], None], timeout: float = 120.0):
-        start = time.time()
-        last = -1
-        while not self.runner.cancelled:
-            if time.time() - start > timeout:
-                break
-            time.sleep(0.1)
-            if not target.exists():
-                continue
-            try:
-                cur = target.stat().st_size
-            except Exception:
-                cur = 0
-            if total > 0:
-                pct = int(min(100, max(0, (cur / total) * 100)))
-                if pct != last:
-                    phase_emit(pct)
-                    last = pct
-            if cur >= total:
-                break
+    def _hash_device(self, device: str, size: int, on_log: Callable[[str], None],
+                     phase_emit: Callable[[int], None]) -> Tuple[str, float]:
+        # One sequential pass over the first `size` bytes of the disc, hashed as
+        # it arrives; returns the digest and the read rate in MB/s.
+        h = hashlib.sha256()
+        state = [size, -1]
+        def take(chunk: bytes):
+            if state[0] <= 0:
+                return
+            part = chunk[:state[0]]
+            h.update(part)
+            state[0] -= len(part)
+            pct = int((size - state[0]) * 100 / max(1, size))
+            if pct != state[1]:
+                state[1] = pct
+                phase_emit(pct)
+        t0 = time.monotonic()
+        if device.startswith("/") and os.access(device, os.R_OK):
+            with open(device, "rb", buffering=0) as f:
+                while state[0] > 0:
+                    if self.runner.cancelled:
+                        raise RuntimeError("Verification cancelled")
+                    chunk = f.read(min(4 * 1024 * 1024, state[0]))
+                    if not chunk:
+                        break
+                    take(chunk)
+        else:
+            readom = self.tools.find("readom")
+            if not readom:
+                raise RuntimeError("No way to read the device back")
+            sectors = (size + 2047) // 2048
+            self.runner.run_pipeline([readom, f"dev={device}", f"sectors=0-{sectors}", "f=-"], [],
+                                     on_chunk=take, on_stderr=on_log, check=True)
+        if self.runner.cancelled:
+            raise RuntimeError("Verification cancelled")
+        if state[0] > 0:
+            raise RuntimeError("Readback size mismatch")
+        rate = size / 1e6 / max(1e-6, time.monotonic() - t0)
+        on_log(f"Read back {size} bytes at {rate:.1f} MB/s")
+        return h.hexdigest(), rate
+    def verify_digest(self, device: str, size: int, expected: str,
+                      on_status: Callable[[str], None], on_log: Callable[[str], None],
+                      phase_emit: Callable[[int], None]) -> bool:
+        on_status("Verification: readback hash...")
+        try:
+            got, rate = self._hash_device(device, size, on_log, phase_emit)
+        except Exception as e:
+            on_status(f"Verification error: {e}")
+            return False
+        if got != expected:
+            on_log(f"Checksum mismatch: image {expected}, disc {got}")
+            on_status("Verification failed: checksum mismatch.")
+            return False
+        phase_emit(100)
+        on_status(f"Verification OK (readback hash, {rate:.1f} MB/s).")
+        return True
+    def _read_ranges(self, device: str, samples: SampleSet, on_log: Callable[[str], None],
+                     phase_emit: Callable[[int], None]) -> Iterator[Tuple[int, int, bytes]]:
+        # (start, length, bytes read) for every sampled range in disc order, all
+        # through one open of the device: seeks on a direct handle, or else one
+        # readom run from the first sampled sector to the last, keeping only the sampled bytes.
+        n = max(1, len(samples.ranges))
+        if device.startswith("/") and os.access(device, os.R_OK):
+            with open(device, "rb", buffering=0) as f:
+                for i, (start, length) in enumerate(samples.ranges):
+                    if self.runner.cancelled:
+                        raise RuntimeError("Verification cancelled")
+                    f.seek(start)
+                    yield start, length, f.read(length)
+                    phase_emit(int((i + 1) * 100 / n))
+            return
+        readom = self.tools.find("readom")
+        if not readom:
+            raise RuntimeError("No way to read the device back")
+        if not samples.ranges:
+            return
+        got = samples.capture()
+        first = samples.ranges[0][0] // 2048
+        start, length = samples.ranges[-1]
+        last = (start + length + 2047) // 2048
+        pos = [first * 2048, -1]
+        def take(chunk: bytes):
+            got.feed(pos[0], chunk)
+            pos[0] += len(chunk)
+            pct = int((pos[0] // 2048 - first) * 100 / max(1, last - first))
+            if pct != pos[1]:
+                pos[1] = pct
+                phase_emit(min(pct, 100))
+        self.runner.run_pipeline([readom, f"dev={device}", f"sectors={first}-{last}", "f=-"], [],
+                                 on_chunk=take, on_stderr=on_log, check=True)
+        if self.runner.cancelled:
+            raise RuntimeError("Verification cancelled")
+        for start, length in samples.ranges:
+            yield start, length, bytes(got.expected[start])
+    def verify_sampled(self, device: str, samples: SampleSet,
+                       on_status: Callable[[str], None], on_log: Callable[[str], None],
+                       phase_emit: Callable[[int], None]) -> bool:
+        # Reads only the sampled ranges, in disc order, and compares them with the image.
+        on_status(f"Verification: sampling {len(samples.ranges)} ranges...")
+        t0 = time.monotonic()
+        try:
+            for start, length, got in self._read_ranges(device, samples, on_log, phase_emit):
+                if got != bytes(samples.expected[start]):
+                    on_log(f"Sample mismatch at sector {start // 2048} ({length} bytes)")
+                    on_status(f"Verification failed: sampled data differs at sector {start // 2048}.")
+                    return False
+        except Exception as e:
+            on_status(f"Verification error: {e}")
+            return False
+        read, bound = samples.coverage()
+        elapsed = max(1e-6, time.monotonic() - t0)
+        on_log(f"Sampled {len(samples.ranges)} ranges ({read:.2%} of the image) in {elapsed:.1f}s; "
+               f"{CONFIDENCE:.0%} confidence that under {bound:.2%} of the disc is damaged")
+        phase_emit(100)
+        on_status(f"Verification OK (sampled, {CONFIDENCE:.0%} confidence < {bound:.2%} damaged).")
+        return True
     def verify(self, iso_path: Path, device: str, temp_dir: Path,
                on_status: Callable[[str], None], on_log: Callable[[str], None],
-               phase_emit: Callable[[int], None]) -> bool:
-        readom = self.tools.find("readom")
-        # Level 1: readback
-        if readom:
-            on_status("Verification: readback (size/hash)...")
-            verify_iso = temp_dir / "pyburn_verify.iso"
-            ok = False
+               phase_emit: Callable[[int], None], expected: Optional[str] = None) -> bool:
+        # Level 1: streaming readback hash, any image size. `expected` is the hash
+        # taken while the image was mastered; without it (e.g. a cached image) the
+        # image file is hashed alongside the disc read. The listing compares below
+        # are only for when the readback cannot start; a read error is a failure.
+        direct = device.startswith("/") and os.access(device, os.R_OK)
+        size = None
+        if direct or self.tools.find("readom"):
             try:
-                import threading
-                t = threading.Thread(target=self._monitor_file_growth, args=(verify_iso, max(1, iso_path.stat().st_size), phase_emit), daemon=True)
-                t.start()
-                self.runner.run_stream([readom, f"dev={device}", f"f={verify_iso}"], on_stdout=on_log, on_stderr=on_log, check=True)
-                t.join(timeout=0.2)
-                phase_emit(100)
-                if not verify_iso.exists() or verify_iso.stat().st_size < iso_path.stat().st_size:
-                    raise RuntimeError("Readback size mismatch")
-                if iso_path.stat().st_size < 100 * 1024 * 1024:
-                    if self._sha256(iso_path) != self._sha256(verify_iso):
-                        raise RuntimeError("Checksum mismatch")
-                ok = True
-                on_status("Verification OK (readback).")
-                return ok
+                size = iso_path.stat().st_size
+                if direct:
+                    os.close(os.open(device, os.O_RDONLY))
+            except OSError as e:
+                size = None
+                on_log(f"Readback cannot start ({e}); trying listing compare.")
+        if size is not None:
+            image_hash = [expected]
+            hasher = None
+            if expected is None:
+                def hash_image():
+                    try:
+                        image_hash[0] = self._sha256(iso_path)
+                    except Exception as e:
+                        on_log(f"Could not hash {iso_path.name}: {e}")
+                hasher = threading.Thread(target=hash_image, daemon=True)
+                hasher.start()
+            on_status("Verification: readback hash...")
+            try:
+                got, rate = self._hash_device(device, size, on_log, phase_emit)
             except Exception as e:
-                on_log(f"Readback verify failed ({e}); trying listing compare.")
-            finally:
-                try: verify_iso.unlink(missing_ok=True)
-                except Exception: pass
-        # Level 2: isoinfo listing
+                on_log(f"Readback failed: {e}")
+                on_status(f"Verification failed: {e}")
+                return False
+            if hasher:
+                hasher.join()
+            if image_hash[0] is not None:
+                if got != image_hash[0]:
+                    on_log(f"Checksum mismatch: image {image_hash[0]}, disc {got}")
+                    on_status("Verification failed: checksum mismatch.")
+                    return False
+                phase_emit(100)
+                on_status(f"Verification OK (readback hash, {rate:.1f} MB/s).")
+                return True
+            on_log("No image hash to compare the readback with; trying listing compare.")
+        # Level 2: tree diff (paths, sizes and extents) with the built-in ISO9660/UDF reader
+        on_status("Verification: directory tree compare...")
+        try:
+            image, disc = self._tree(str(iso_path)), self._tree(device)
+            missing = [p for p in image if p not in disc]
+            changed = [p for p in image if p in disc and disc[p] != image[p]]
+            for p in (missing + changed)[:20]:
+                on_log(f"{'Missing' if p in missing else 'Different'} on disc: {p}")
+            if missing or changed:
+                on_status(f"Verification failed: {len(missing)} missing, {len(changed)} different entries.")
+                return False
+            on_status(f"Verification OK (tree compare, {len(image)} entries).")
+            phase_emit(100)
+            return True
+        except Exception as e:
+            on_log(f"Tree compare failed ({e}); trying isoinfo listing.")
+        # Level 3: isoinfo listing
         isoinfo = self.tools.find("isoinfo")
         if not isoinfo:
             on_status("Warning: Verification tools unavailable.")
@@ -87,4 +264,7 @@ class VerificationTools:
             return True
         except Exception as e:
             on_status(f"Verification error: {e}")
-            return False
\ No newline at end of file
+            return False
+    def _tree(self, source: str) -> Dict[str, Tuple[bool, int, int]]:
+        with open_disc(source) as r:
+            return {e.path: (e.is_dir, e.size, e.lba) for e in r.walk()}
\ No newline at end of file
@@ -50,15 +50,12 @@ def self_test():
                   options=JobOptions(temp_dir=Path(cfg.settings["temp_dir"]), speed="Auto")))
     start = time.time()
     timeout = 30.0
-    while q.get_list() or (q._thread and q._thread.isRunning()):
+    while q.get_list() or q.busy():
         app.processEvents()
         time.sleep(0.05)
         if time.time() - start > timeout:
             print("ERROR: Self-test timed out; cancelling current job and shutting down.")
-            q.cancel_current()
-            if q._thread:
-                q._thread.quit()
-                q._thread.wait(2000)
+            q.shutdown(2000)
             break
     try: dummy.unlink()
     except Exception: pass
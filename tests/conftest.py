@@ -0,0 +1,4 @@
+import os
+import sys
+# The tests import the pyburn package straight from the checkout.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import random
+import struct
+import zlib
+import pytest
+from pyburn.services import accuraterip
+from pyburn.services.accuraterip import (SKIP_SAMPLES, ChecksumDB, TrackChecksum, accuraterip_id, check_rip,
+                                         cddb_id, parse_dbar)
+from pyburn.services.cdtoc import DiscToc, TocTrack
+# libdiscid's 22-track test disc; its published FreeDB ID is 370fce16.
+LEADOUT = 303602
+OFFSETS = [150, 9700, 25887, 39297, 53795, 63735, 77517, 94877, 107270, 123552, 135522,
+           148422, 161197, 174790, 192022, 205545, 218010, 228700, 239590, 255470, 266932, 288750]
+def disc() -> DiscToc:
+    starts = [o - 150 for o in OFFSETS]
+    ends = starts[1:] + [LEADOUT - 150]
+    return DiscToc([TocTrack(i + 1, s, e - s) for i, (s, e) in enumerate(zip(starts, ends))])
+def test_disc_ids():
+    assert cddb_id(disc()) == 0x370FCE16
+    # id1 sums the track LBAs and the lead-out; id2 weights them by track number (LBA 0 counts as 1).
+    lbas = [o - 150 for o in OFFSETS] + [LEADOUT - 150]
+    id1 = sum(lbas)
+    id2 = sum(max(lba, 1) * n for n, lba in enumerate(lbas, 1))
+    assert accuraterip_id(disc()) == f"dBAR-022-{id1:08x}-{id2:08x}-370fce16"
+def reference(data: bytes, first: bool, last: bool):
+    # AccurateRip v1/v2 one sample at a time, straight from the definition.
+    count = len(data) // 4
+    v1 = v2 = 0
+    for i in range(count):
+        mult = i + 1
+        if (first and mult < SKIP_SAMPLES - 1) or (last and mult > count - SKIP_SAMPLES):
+            continue
+        p = int.from_bytes(data[i * 4:i * 4 + 4], "little") * mult
+        v1 += p & 0xFFFFFFFF
+        v2 += (p & 0xFFFFFFFF) + (p >> 32)
+    return v1 & 0xFFFFFFFF, v2 & 0xFFFFFFFF
+def checksum(data: bytes, first: bool, last: bool, chunks) -> TrackChecksum:
+    c = TrackChecksum(len(data) // 4, first, last)
+    pos = 0
+    for size in chunks:
+        c.feed(memoryview(data)[pos:pos + size])
+        pos += size
+    c.feed(data[pos:])
+    return c
+@pytest.fixture
+def samples():
+    return random.Random(7).randbytes(4 * (2 * SKIP_SAMPLES + 1000))
+@pytest.mark.parametrize("first,last", [(False, False), (True, False), (False, True), (True, True)])
+def test_track_checksum_matches_reference(samples, first, last, monkeypatch):
+    want = reference(samples, first, last)
+    monkeypatch.setattr(accuraterip, "_SLICE", 1000)
+    chunks = [7, 1001, 3, 4096, 2, 11762]  # splits samples across feeds
+    got = [checksum(samples, first, last, chunks)]
+    monkeypatch.setattr(accuraterip, "np", None)
+    got.append(checksum(samples, first, last, chunks))
+    for c in got:
+        assert (c.v1, c.v2) == want
+        assert c.crc == zlib.crc32(samples)
+def dbar_block(id1: int, id2: int, cddb: int, tracks) -> bytes:
+    return struct.pack("<BIII", len(tracks), id1, id2, cddb) + b"".join(
+        struct.pack("<BII", conf, crc, 0) for conf, crc in tracks)
+def test_parse_dbar():
+    blob = dbar_block(1, 2, 3, [(5, 0xAAAA), (4, 0xBBBB)]) + dbar_block(1, 2, 3, [(2, 0xCCCC), (1, 0xDDDD)])
+    assert parse_dbar(blob + b"\x02\x00") == {
+        "dBAR-002-00000001-00000002-00000003": [[[5, 0xAAAA], [4, 0xBBBB]], [[2, 0xCCCC], [1, 0xDDDD]]],
+    }
+def test_database_import_and_check(tmp_path, samples):
+    toc = DiscToc([TocTrack(1, 0, 30), TocTrack(2, 30, 40)])
+    key = accuraterip_id(toc)
+    ids = [int(part, 16) for part in key.split("-")[2:]]
+    track = checksum(samples, True, False, [])
+    bin_path = tmp_path / f"{key}.bin"
+    bin_path.write_bytes(dbar_block(*ids, [(12, track.v2), (3, 0x1234)]) + dbar_block(*ids, [(2, track.v1), (9, 0x5678)]))
+    db = ChecksumDB(tmp_path / "db.json")
+    assert db.import_file(bin_path) == 2
+    assert db.import_file(bin_path) == 0
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"dBAR-001-00000001-00000002-00000003": [[[1, 1]]]}))
+    assert ChecksumDB(tmp_path / "db.json").import_file(other) == 1
+    summary, lines = check_rip(ChecksumDB(tmp_path / "db.json"), toc,
+                               {1: (track.v1, track.v2, track.crc), 2: (0, 0, 0)})
+    assert summary == "AccurateRip: 1/2 tracks accurate (confidence 14-14)"
+    assert "accurately ripped (v2, confidence 14)" in lines[1]
+    assert "NOT matched" in lines[2]
\ No newline at end of file
@@ -0,0 +1,64 @@
+import io
+import wave
+from pyburn.services.audioinfo import FRAME_BYTES
+from pyburn.services.cdtoc import DiscToc, TocTrack, parse_toc, split_stream, wav_header
+# The 22-track disc from libdiscid's test suite, as MusicBrainz offsets (pregap included).
+LEADOUT = 303602
+OFFSETS = [150, 9700, 25887, 39297, 53795, 63735, 77517, 94877, 107270, 123552, 135522,
+           148422, 161197, 174790, 192022, 205545, 218010, 228700, 239590, 255470, 266932, 288750]
+def msf(sectors: int) -> str:
+    return f"[{sectors // 4500:02d}:{sectors // 75 % 60:02d}.{sectors % 75:02d}]"
+def paranoia_query() -> str:
+    # What "cdparanoia -Q" prints (on stderr) for that disc.
+    starts = [o - 150 for o in OFFSETS]
+    ends = starts[1:] + [LEADOUT - 150]
+    rows = [f"{i + 1:3d}.  {e - s:7d} {msf(e - s)}  {s:7d} {msf(s)}    no   no  2"
+            for i, (s, e) in enumerate(zip(starts, ends))]
+    return ("cdparanoia III release 10.2 (September 11, 2008)\n\n"
+            "Table of contents (audio tracks only):\n"
+            "track        length               begin        copy pre ch\n"
+            "===========================================================\n"
+            + "\n".join(rows)
+            + f"\nTOTAL   {LEADOUT - 300:7d} {msf(LEADOUT - 300)}    (audio only)\n")
+def test_parse_cdparanoia_query():
+    toc = parse_toc(paranoia_query())
+    assert (toc.first, toc.last, len(toc.tracks)) == (1, 22, 22)
+    assert toc.tracks[1] == TocTrack(2, 9550, 16187)
+    assert toc.leadout == LEADOUT - 150
+    assert toc.span() == "1-22"
+    assert toc.offset(toc.tracks[2]) == 25737 * FRAME_BYTES
+def test_musicbrainz_toc():
+    toc = parse_toc(paranoia_query())
+    assert toc.musicbrainz_toc() == " ".join(str(v) for v in [1, 22, LEADOUT] + OFFSETS)
+def test_no_tracks_in_junk():
+    assert parse_toc("cdparanoia: unable to open disc\n").tracks == []
+def run_split(toc: DiscToc, data: bytes, chunk: int, cancelled=lambda: False):
+    events, parts = [], {}
+    def on_data(t, view):
+        parts[t.number] = parts.get(t.number, b"") + bytes(view)
+    total = split_stream(io.BytesIO(data), toc, lambda t: events.append(("start", t.number)), on_data,
+                         lambda t: events.append(("end", t.number)), chunk, cancelled)
+    return total, events, parts
+def test_split_cuts_at_track_boundaries():
+    toc = DiscToc([TocTrack(1, 0, 2), TocTrack(2, 2, 1), TocTrack(3, 3, 3)])
+    tracks = {n: bytes([n]) * (length * FRAME_BYTES) for n, length in ((1, 2), (2, 1), (3, 3))}
+    data = b"".join(tracks.values())
+    for chunk in (1000, FRAME_BYTES, len(data) + 7):
+        total, events, parts = run_split(toc, data, chunk)
+        assert total == len(data)
+        assert events == [("start", 1), ("end", 1), ("start", 2), ("end", 2), ("start", 3), ("end", 3)]
+        assert parts == tracks
+def test_short_stream_leaves_last_track_open():
+    toc = DiscToc([TocTrack(1, 0, 1), TocTrack(2, 1, 2)])
+    total, events, parts = run_split(toc, bytes(FRAME_BYTES + 100), 512)
+    assert total == FRAME_BYTES + 100
+    assert events == [("start", 1), ("end", 1), ("start", 2)]
+    assert len(parts[2]) == 100
+def test_cancel_stops_splitting():
+    toc = DiscToc([TocTrack(1, 0, 4)])
+    assert run_split(toc, bytes(4 * FRAME_BYTES), 1000, lambda: True) == (0, [], {})
+def test_wav_header():
+    pcm = bytes(range(256)) * 4
+    with wave.open(io.BytesIO(wav_header(len(pcm)) + pcm)) as w:
+        assert (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()) == (2, 2, 44100, 256)
+        assert w.readframes(256) == pcm
\ No newline at end of file
@@ -0,0 +1,29 @@
+import hashlib
+import pytest
+from pyburn.services.checksums import graft_files, parse_sums, write_sums
+def test_round_trip_with_awkward_names(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    names = ["plain.txt", "with space.txt", "back\\slash.txt", "new\nline.txt", "ünï.txt"]
+    for i, name in enumerate(names):
+        (src / name).write_bytes(b"x" * i)
+    out = tmp_path / "SUMS"
+    assert write_sums(graft_files([("dir", str(src))]), out, "blake2b", workers=2) == len(names)
+    algo, sums = parse_sums(out.read_text(encoding="utf-8"))
+    assert algo == "blake2b"
+    assert sums == {f"dir/{name}": hashlib.blake2b(b"x" * i).hexdigest() for i, name in enumerate(names)}
+def test_reads_sha256sum_lines():
+    digest = hashlib.sha256(b"abc").hexdigest()
+    text = f"{digest.upper()} *bin.dat\n{digest}  text.txt\n\n# comment\n\\{digest} *a\\\\b\\nc\n"
+    algo, sums = parse_sums(text)
+    assert algo == "sha256"
+    assert sums == {"bin.dat": digest, "text.txt": digest, "a\\b\nc": digest}
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        parse_sums("# PyBurn checksums v1 md5\n")
+def test_graft_files_places_plain_arguments_at_the_root(tmp_path):
+    (tmp_path / "d" / "sub").mkdir(parents=True)
+    (tmp_path / "d" / "sub" / "f").write_bytes(b"12")
+    (tmp_path / "single").write_bytes(b"123")
+    files = sorted(graft_files([("", str(tmp_path / "d")), ("", str(tmp_path / "single")), ("x/y", str(tmp_path / "single"))]))
+    assert [(rel, size) for rel, _, size in files] == [("single", 3), ("sub/f", 2), ("x/y", 3)]
\ No newline at end of file
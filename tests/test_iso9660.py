@@ -0,0 +1,92 @@
+from pyburn.services.iso9660 import SECTOR, BlockSource, IsoReader, open_disc
+# A hand-built image: Rock Ridge names over short ISO names, a Joliet tree, a
+# file split over two extents and a directory relocated through rr_moved.
+ROOT, SUB, JROOT, JSUB, MOVED, DEEP = 20, 21, 22, 23, 24, 25
+README, DATA, BIG1, BIG2, LEAF = 26, 27, 28, 29, 30
+def both(n: int) -> bytes:
+    return n.to_bytes(4, "little") + n.to_bytes(4, "big")
+def record(fi: bytes, lba: int, size: int, is_dir: bool = False, su: bytes = b"", more: bool = False) -> bytes:
+    body = bytes([0]) + both(lba) + both(size) + bytes(7) + bytes([(2 if is_dir else 0) | (0x80 if more else 0)])
+    body += bytes(2) + b"\x01\x00\x00\x01" + bytes([len(fi)]) + fi + (b"" if len(fi) & 1 else b"\x00") + su
+    body += b"\x00" * (len(body) & 1)
+    return bytes([len(body) + 1]) + body
+def nm(name: str) -> bytes:
+    raw = name.encode("utf-8")
+    return b"NM" + bytes([5 + len(raw), 1, 0]) + raw
+def directory(lba: int, parent: int, entries, root_su: bytes = b"") -> bytes:
+    return record(b"\x00", lba, SECTOR, True, root_su) + record(b"\x01", parent, SECTOR, True) + b"".join(entries)
+def joliet(name: str) -> bytes:
+    return name.encode("utf-16-be")
+def volume_descriptor(kind: int, volume: bytes, root: bytes, escape: bytes = b"") -> bytes:
+    vd = bytearray(SECTOR)
+    vd[0], vd[1:6], vd[6] = kind, b"CD001", 1
+    vd[40:40 + len(volume)] = volume
+    vd[80:88] = both(32)
+    vd[88:88 + len(escape)] = escape
+    vd[156:190] = root
+    return bytes(vd)
+def build(path):
+    img = bytearray(32 * SECTOR)
+    def put(lba: int, data: bytes):
+        img[lba * SECTOR:lba * SECTOR + len(data)] = data
+    sp = b"SP" + bytes([7, 1]) + b"\xbe\xef" + bytes([0])
+    put(16, volume_descriptor(1, b"TESTVOL".ljust(32), record(b"\x00", ROOT, SECTOR, True)))
+    put(17, volume_descriptor(2, joliet("Jolie".ljust(16)), record(b"\x00", JROOT, SECTOR, True), b"%/E"))
+    put(18, b"\xffCD001\x01")
+    put(ROOT, directory(ROOT, ROOT, [
+        record(b"BIG.;1", BIG1, SECTOR, su=nm("big.bin"), more=True),
+        record(b"BIG.;1", BIG2, 100, su=nm("big.bin")),
+        record(b"README.TXT;1", README, 11, su=nm("Read me first.txt")),
+        record(b"RR_MOVED", MOVED, SECTOR, True, nm("rr_moved")),
+        record(b"SUB", SUB, SECTOR, True, nm("sub")),
+    ], sp))
+    put(SUB, directory(SUB, ROOT, [
+        record(b"DATA.BIN;1", DATA, 5, su=nm("data.bin")),
+        record(b"DEEP", 0, 0, su=nm("deep") + b"CL\x0c\x01" + both(DEEP)),
+    ]))
+    put(MOVED, directory(MOVED, ROOT, [record(b"DEEP", DEEP, SECTOR, True, nm("deep") + b"RE\x04\x01")]))
+    put(DEEP, directory(DEEP, MOVED, [record(b"LEAF.TXT;1", LEAF, 4, su=nm("leaf.txt"))]))
+    put(JROOT, directory(JROOT, JROOT, [
+        record(joliet("Read me first.txt;1"), README, 11),
+        record(joliet("sub"), JSUB, SECTOR, True),
+    ]))
+    put(JSUB, directory(JSUB, JROOT, [record(joliet("data.bin;1"), DATA, 5)]))
+    put(README, b"hello world")
+    put(DATA, b"12345")
+    put(BIG1, b"a" * SECTOR)
+    put(BIG2, b"b" * 100)
+    put(LEAF, b"leaf")
+    path.write_bytes(bytes(img))
+    return str(path)
+def test_rock_ridge_tree(tmp_path):
+    with open_disc(build(tmp_path / "t.iso")) as r:
+        assert isinstance(r, IsoReader)
+        assert r.volume_id == "TESTVOL"
+        listing = {e.path: e.is_dir for e in r.walk()}
+    assert listing == {
+        "big.bin": False, "Read me first.txt": False, "rr_moved": True, "sub": True,
+        "sub/data.bin": False, "sub/deep": True, "sub/deep/leaf.txt": False,
+    }
+def test_files_read_back(tmp_path):
+    with IsoReader.open(build(tmp_path / "t.iso")) as r:
+        files = r.files()
+        assert r.read_file(files["Read me first.txt"]) == b"hello world"
+        assert r.read_file(r.find("sub/deep/leaf.txt")) == b"leaf"
+        big = files["big.bin"]
+        assert big.size == SECTOR + 100
+        assert big.runs() == [(BIG1 * SECTOR, SECTOR), (BIG2 * SECTOR, 100)]
+        assert r.read_file(big) == b"a" * SECTOR + b"b" * 100
+        assert r.find("sub/missing") is None
+def test_joliet_tree(tmp_path):
+    with IsoReader.open(build(tmp_path / "t.iso"), joliet=True) as r:
+        assert r.volume_id == "Jolie"
+        assert sorted(r.files()) == ["Read me first.txt", "sub/data.bin"]
+        assert r.read_file(r.find("sub/data.bin")) == b"12345"
+def test_device_reads_go_through_the_block_cache(tmp_path):
+    path = build(tmp_path / "t.iso")
+    with open(path, "rb") as f:
+        src = BlockSource(f)
+        src._map.close()
+        src._map = None  # read like a block device
+        r = IsoReader(src)
+        assert r.read_file(r.find("sub/data.bin")) == b"12345"
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import pytest
+from pyburn.core.tools import ToolFinder
+from pyburn.services.isosize import (
+    SECTOR, DirNode, estimate_image_bytes, estimate_tree_sectors, joliet_len, merge_trees, scan_paths, _relocated,
+)
+def chain(levels: int) -> DirNode:
+    root = DirNode()
+    d = root
+    for i in range(levels):
+        d = d.dirs.setdefault(f"d{i}", DirNode())
+        d.files["f.txt"] = (10, None, 0, 0)
+    return root
+def test_joliet_length_counts_utf16_units():
+    assert joliet_len("abc") == 3
+    assert joliet_len("café") == 4
+    assert joliet_len("a\U0001F600b") == 4  # outside the BMP: a surrogate pair
+    assert joliet_len("\U0001F600" * 40) == 64  # truncated to 64 units
+def test_non_bmp_names_cost_more_joliet_space():
+    bmp, astral = DirNode(), DirNode()
+    for i in range(200):
+        bmp.files[f"{i:03d}" + "x" * 30] = (1, None, 0, 0)
+        astral.files[f"{i:03d}" + "\U0001F600" * 30] = (1, None, 0, 0)
+    assert estimate_tree_sectors(astral, pad=False) > estimate_tree_sectors(bmp, pad=False)
+def test_deep_directories_are_relocated():
+    assert _relocated(chain(7)) == []
+    moved = _relocated(chain(8))
+    assert [name for _, name, _ in moved] == ["d7"]  # level nine, the root being level one
+    # Once moved, a directory counts from root/rr_moved, so the next move is six levels further down.
+    assert [name for _, name, _ in _relocated(chain(15))] == ["d7", "d13"]
+def test_relocation_adds_rr_moved():
+    # Each extra level costs an ISO directory, a Joliet directory and a data sector;
+    # the first relocation also adds the RR_MOVED directory.
+    sizes = [estimate_tree_sectors(chain(n), pad=False) for n in (6, 7, 8)]
+    assert sizes[1] - sizes[0] == 3
+    assert sizes[2] - sizes[1] == 4
+def test_hard_links_are_stored_once():
+    one, two = DirNode(), DirNode()
+    one.files["a"] = (SECTOR * 10, (1, 42), 0, 0)
+    two.files["a"] = (SECTOR * 10, (1, 42), 0, 0)
+    two.files["b"] = (SECTOR * 10, (1, 42), 0, 0)
+    assert estimate_tree_sectors(two, pad=False) == estimate_tree_sectors(one, pad=False)
+def test_padded_image_is_whole_blocks():
+    assert estimate_tree_sectors(chain(3)) % 16 == 0
+def test_merge_shares_unique_subtrees():
+    a, b = chain(2), DirNode()
+    b.files["x"] = (1, None, 0, 0)
+    merged = merge_trees([a, b])
+    assert merged.dirs["d0"] is a.dirs["d0"]
+    assert set(merged.files) == {"x"}
+def fixture_tree(root):
+    # Small files, names over the Joliet limit, non-BMP names, a hard link,
+    # a symlink, a directory deeper than eight levels and enough entries to
+    # spill records over several sectors.
+    os.makedirs(root)
+    for i in range(300):
+        with open(os.path.join(root, f"file_{i:04d}.dat"), "wb") as f:
+            f.write(b"x" * (i * 37))
+    with open(os.path.join(root, "n" * 100 + ".txt"), "wb") as f:
+        f.write(b"long")
+    with open(os.path.join(root, "emoji_\U0001F600\U0001F680.txt"), "wb") as f:
+        f.write(b"astral")
+    os.link(os.path.join(root, "file_0010.dat"), os.path.join(root, "hardlink.dat"))
+    os.symlink("file_0001.dat", os.path.join(root, "link"))
+    deep = os.path.join(root, *[f"level{i}" for i in range(11)])
+    os.makedirs(deep)
+    with open(os.path.join(deep, "bottom.txt"), "wb") as f:
+        f.write(b"deep")
+@pytest.mark.skipif(not ToolFinder().find("mkisofs"), reason="mkisofs/genisoimage not installed")
+def test_estimate_matches_mkisofs(tmp_path):
+    # The same comparison `python -m pyburn.services.isosize PATH` prints.
+    root = str(tmp_path / "tree")
+    fixture_tree(root)
+    p = subprocess.run([ToolFinder().find("mkisofs"), "-quiet", "-print-size", "-J", "-R", "-V", "TEST", root],
+                       capture_output=True, text=True)
+    got = next(int(x) for x in reversed(p.stdout.split()) if x.isdigit())
+    assert estimate_image_bytes([root]) == got * SECTOR
+def test_scan_matches_fixture(tmp_path):
+    root = str(tmp_path / "tree")
+    fixture_tree(root)
+    tree = scan_paths([root])
+    assert len(tree.files) == 304
+    assert tree.files["link"][2] > 0  # symlinks cost their SL entry, not data
+    assert tree.files["hardlink.dat"][1] == tree.files["file_0010.dat"][1]
+    assert _relocated(tree) and _relocated(tree)[0][1] == "level7"
\ No newline at end of file
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import sqlite3
+import pytest
+from pyburn.services import manifest
+from pyburn.services.manifest import BackupManifest
+@pytest.fixture
+def source(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    for name in ("a.txt", "b.txt", "sub/c.txt"):
+        (src / name).write_text(name)
+    return src
+def commit(m: BackupManifest, delta) -> None:
+    m.hash_staged(delta.session, lambda size: None, lambda: False)
+    m.commit(delta.session)
+def test_first_session_stages_everything(tmp_path, source):
+    m = BackupManifest(tmp_path / "m.db")
+    delta = m.diff("set", [source], "job1", "VOL")
+    assert (delta.files, delta.bytes, delta.removed, delta.previous) == (3, 19, 0, 0)
+    assert sorted(rel for _, rel, _ in m.staged(delta.session)) == ["a.txt", "b.txt", "sub/c.txt"]
+def test_later_sessions_stage_only_changes(tmp_path, source):
+    m = BackupManifest(tmp_path / "m.db")
+    commit(m, m.diff("set", [source], "job1", "VOL"))
+    assert m.sessions("set") == 1
+    (source / "a.txt").write_text("changed size")
+    os.utime(source / "b.txt", ns=(0, 12345))
+    (source / "sub" / "c.txt").unlink()
+    (source / "d.txt").write_text("new")
+    delta = m.diff("set", [source], "job2", "VOL")
+    assert sorted(rel for _, rel, _ in m.staged(delta.session)) == ["a.txt", "b.txt", "d.txt"]
+    assert (delta.removed, delta.previous) == (1, 1)
+def test_unchanged_tree_stages_nothing(tmp_path, source):
+    m = BackupManifest(tmp_path / "m.db")
+    commit(m, m.diff("set", [source], "job1", "VOL"))
+    delta = m.diff("set", [source], "job2", "VOL")
+    assert delta.files == 0
+def test_full_run_starts_the_set_over(tmp_path, source):
+    m = BackupManifest(tmp_path / "m.db")
+    commit(m, m.diff("set", [source], "job1", "VOL"))
+    delta = m.diff("set", [source], "job2", "VOL", full=True)
+    assert (delta.files, delta.previous) == (3, 0)
+    commit(m, delta)
+    assert m.sessions("set") == 1
+def test_uncommitted_session_is_replaced(tmp_path, source):
+    m = BackupManifest(tmp_path / "m.db")
+    first = m.diff("set", [source], "job1", "VOL")
+    second = m.diff("set", [source], "job2", "VOL")
+    assert second.files == 3
+    assert list(m.staged(first.session)) == []
+def test_hash_staged_batches(tmp_path, source, monkeypatch):
+    monkeypatch.setattr(manifest, "_BATCH", 2)
+    m = BackupManifest(tmp_path / "m.db")
+    delta = m.diff("set", [source], "job1", "VOL")
+    seen = []
+    m.hash_staged(delta.session, seen.append, lambda: False)
+    assert sorted(seen) == [5, 5, 9]
+    with sqlite3.connect(tmp_path / "m.db") as db:
+        rows = db.execute("SELECT path, sha256 FROM staged WHERE session=?", (delta.session,)).fetchall()
+    assert len(rows) == 3
+    for path, digest in rows:
+        assert digest == hashlib.sha256(open(path, "rb").read()).hexdigest()
\ No newline at end of file
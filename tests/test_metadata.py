@@ -0,0 +1,31 @@
+import time
+from pyburn.services.cdtoc import DiscToc, TocTrack
+from pyburn.services.metadata import MetadataCache, disc_id
+def toc_from(first: int, leadout: int, offsets) -> DiscToc:
+    # A DiscToc from MusicBrainz-style offsets (150-sector pregap included).
+    starts = [o - 150 for o in offsets]
+    ends = starts[1:] + [leadout - 150]
+    return DiscToc([TocTrack(first + i, s, e - s) for i, (s, e) in enumerate(zip(starts, ends))])
+def test_published_disc_id():
+    # libdiscid's test disc and the ID MusicBrainz lists for it.
+    toc = toc_from(1, 303602, [150, 9700, 25887, 39297, 53795, 63735, 77517, 94877, 107270, 123552, 135522,
+                               148422, 161197, 174790, 192022, 205545, 218010, 228700, 239590, 255470,
+                               266932, 288750])
+    assert disc_id(toc) == "xUp1F2NkfP8s8jaeFn_Av3jNEI4-"
+def test_disc_id_depends_on_first_track_number():
+    a = toc_from(1, 20000, [150, 10000])
+    b = toc_from(2, 20000, [150, 10000])
+    assert len(disc_id(a)) == 28
+    assert disc_id(a) != disc_id(b)
+def test_cache_keeps_misses_for_less_time(tmp_path):
+    path = tmp_path / "mb.json"
+    cache = MetadataCache(path, ttl=100, miss_ttl=10)
+    cache.put("hit", {"title": "Album"})
+    cache.put("miss", None)
+    cache = MetadataCache(path, ttl=100, miss_ttl=10)
+    assert cache.get("hit") == (True, {"title": "Album"})
+    assert cache.get("miss") == (True, None)
+    cache._data["hit"][0] = cache._data["miss"][0] = time.time() - 50
+    assert cache.get("hit") == (True, {"title": "Album"})
+    assert cache.get("miss") == (False, None)
+    assert cache.get("unknown") == (False, None)
\ No newline at end of file
@@ -0,0 +1,10 @@
+from pyburn.services.progress import ProgressTools
+def test_ffmpeg_duration_from_banner():
+    line = "  Duration: 01:03:12.34, start: 0.000000, bitrate: 1411 kb/s"
+    assert abs(ProgressTools.parse_ffmpeg_duration(line) - 3792.34) < 1e-6
+    assert ProgressTools.parse_ffmpeg_duration("  Duration: N/A, bitrate: N/A") is None
+def test_ffmpeg_time_from_progress_pipe():
+    assert ProgressTools.parse_ffmpeg_time("out_time_us=12345678") == 12.345678
+    assert ProgressTools.parse_ffmpeg_time("out_time_ms=2000000") == 2.0
+    assert ProgressTools.parse_ffmpeg_time("out_time=00:00:12.345678") is None
+    assert ProgressTools.parse_ffmpeg_time("progress=continue") is None
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+import pytest
+from pyburn.services.isosize import SECTOR, DirNode
+from pyburn.services.span import INDEX_NAME, disc_grafts, plan_span
+def folders(count: int, files: int, size: int) -> DirNode:
+    root = DirNode()
+    for i in range(count):
+        d = root.dirs[f"dir{i:02d}"] = DirNode()
+        for j in range(files):
+            d.files[f"f{j:04d}.dat"] = (size, None, 0, 0)
+    return root
+def flat(files: int, size: int) -> DirNode:
+    root = DirNode()
+    d = root.dirs["flat"] = DirNode()
+    for j in range(files):
+        d.files[f"f{j:05d}.dat"] = (size, None, 0, 0)
+    return root
+def placed(plan):
+    # (disc number, image path) of every file the plan lists, from the index.
+    return [tuple(line.split("\t")[:2]) for line in plan.index_lines()]
+def test_whole_folders_stay_together(tmp_path):
+    plan = plan_span([(str(tmp_path), folders(6, 10, 100 * SECTOR))], 2500)
+    assert len(plan.discs) > 1
+    where = {}
+    for disc, path in placed(plan):
+        where.setdefault(path.split("/")[0], set()).add(disc)
+    assert all(len(discs) == 1 for discs in where.values())
+    assert sum(len(d.grafts) for d in plan.discs) == 6
+def test_split_folder_goes_in_runs(tmp_path):
+    plan = plan_span([(str(tmp_path), flat(2000, 3 * SECTOR))], 2000)
+    assert len(plan.discs) >= 3
+    names = [name for d in plan.discs for _, _, run, _ in d.runs for name in run]
+    assert names == sorted(flat(2000, 1).dirs["flat"].files)  # each file once, in name order
+    for d in plan.discs:
+        assert d.sectors <= 2000
+def test_index_size_matches_lines(tmp_path):
+    root = flat(500, 5 * SECTOR)
+    root.files["é.txt"] = (1, None, 0, 0)
+    root.dirs["ä"] = folders(1, 3, 1)
+    plan = plan_span([(str(tmp_path), root)], 1500)
+    assert plan.index_bytes() == sum(len(line.encode("utf-8")) + 1 for line in plan.index_lines())
+def test_same_name_from_two_roots_is_not_merged(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir(); b.mkdir()
+    plan = plan_span([(str(a), flat(300, 4 * SECTOR)), (str(b), flat(300, 4 * SECTOR))], 1000)
+    for d in plan.discs:
+        paths = [f"{rel}/{name}" for rel, _, run, _ in d.runs for name in run]
+        assert len(paths) == len(set(paths))
+    assert sum(len(run) for d in plan.discs for _, _, run, _ in d.runs) == 600
+def test_file_bigger_than_a_disc_is_cut(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    size = 9 * 1024 * 1024 + 123
+    with open(src / "big.bin", "wb") as f:
+        f.write(os.urandom(size))
+    tree = DirNode()
+    tree.files["big.bin"] = (size, None, 0, 0)
+    plan = plan_span([(str(src), tree)], 2000)
+    chunks = [c for d in plan.discs for c in d.chunks]
+    assert len(chunks) == len(plan.discs) > 1
+    assert sum(c[3] for c in chunks) == size
+    path = plan.save(tmp_path / "plan", "1", "SET")
+    data = b""
+    for i in range(len(plan.discs)):
+        grafts, written = disc_grafts({"plan": str(path), "disc": i}, tmp_path / f"work{i}")
+        assert grafts[0][0] == INDEX_NAME
+        for rel, part in grafts[1:]:
+            data += open(part, "rb").read()
+    assert data == open(src / "big.bin", "rb").read()
+def test_saved_runs_expand_to_grafts(tmp_path):
+    plan = plan_span([(str(tmp_path), flat(1000, 3 * SECTOR))], 2000)
+    path = plan.save(tmp_path / "plan", "1", "SET")
+    grafts, _ = disc_grafts({"plan": str(path), "disc": 1}, tmp_path / "work")
+    run = plan.discs[1].runs[0]
+    assert grafts[1] == (f"flat/{run[2][0]}", os.path.join(str(tmp_path), "flat", run[2][0]))
+    assert len(grafts) == 1 + sum(len(r[2]) for r in plan.discs[1].runs)
+def test_cancel_stops_planning(tmp_path):
+    with pytest.raises(RuntimeError):
+        plan_span([(str(tmp_path), flat(1000, 3 * SECTOR))], 2000, cancelled=lambda: True)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import struct
+from pyburn.services.iso9660 import SECTOR, open_disc
+from pyburn.services.udf import UdfReader
+# A hand-built UDF volume: anchor at 256, one physical partition at sector 300,
+# a root with a plain file, a subdirectory with a UTF-16 name held in an
+# Extended File Entry, an embedded file and a file ending in an unrecorded extent.
+PART = 300
+def tag(ident: int, body: bytes) -> bytes:
+    return struct.pack("<H", ident) + body[2:]
+def short_ad(length: int, block: int, ext: int = 0) -> bytes:
+    return struct.pack("<II", (ext << 30) | length, block)
+def file_entry(ftype: int, size: int, ads: bytes, embedded: bool = False, extended: bool = False) -> bytes:
+    fe = bytearray(SECTOR)
+    fe[27] = ftype
+    struct.pack_into("<H", fe, 34, 3 if embedded else 0)
+    struct.pack_into("<Q", fe, 56, size)
+    ea, head = (208, 216) if extended else (168, 176)
+    struct.pack_into("<II", fe, ea, 0, len(ads))
+    fe[head:head + len(ads)] = ads
+    return tag(266 if extended else 261, bytes(fe))
+def fid(name: str, block: int, chars: int = 0) -> bytes:
+    raw = b"" if chars & 0x08 else (b"\x08" + name.encode("latin-1") if name.isascii() else b"\x10" + name.encode("utf-16-be"))
+    f = bytearray(38) + raw
+    f[18], f[19] = chars, len(raw)
+    struct.pack_into("<IIH", f, 20, SECTOR, block, 0)
+    f += bytes(-len(f) % 4)
+    return tag(257, bytes(f))
+def build(path):
+    img = bytearray((PART + 20) * SECTOR)
+    def put(sector: int, data: bytes):
+        img[sector * SECTOR:sector * SECTOR + len(data)] = data
+    avdp = bytearray(SECTOR)
+    struct.pack_into("<II", avdp, 16, 3 * SECTOR, 32)
+    put(256, tag(2, bytes(avdp)))
+    pd = bytearray(SECTOR)
+    struct.pack_into("<H", pd, 22, 0)
+    struct.pack_into("<I", pd, 188, PART)
+    put(32, tag(5, bytes(pd)))
+    lvd = bytearray(SECTOR)
+    vol = b"\x08UDFVOL"
+    lvd[84:84 + len(vol)] = vol
+    lvd[211] = len(vol)
+    struct.pack_into("<I", lvd, 212, SECTOR)
+    struct.pack_into("<IIH", lvd, 248, SECTOR, 0, 0)  # file set descriptor at block 0
+    struct.pack_into("<II", lvd, 264, 6, 1)
+    lvd[440:446] = bytes([1, 6]) + struct.pack("<HH", 1, 0)
+    put(33, tag(6, bytes(lvd)))
+    put(34, tag(8, bytes(SECTOR)))
+    fsd = bytearray(SECTOR)
+    struct.pack_into("<IIH", fsd, 400, SECTOR, 1, 0)
+    put(PART, tag(256, bytes(fsd)))
+    root = fid("", 1, 0x0A) + fid("hello.txt", 3) + fid("Dïr", 5, 0x02)
+    put(PART + 1, file_entry(4, len(root), short_ad(len(root), 2)))
+    put(PART + 2, root)
+    put(PART + 3, file_entry(5, 5, short_ad(5, 4)))
+    put(PART + 4, b"hello")
+    sub = fid("", 1, 0x0A) + fid("note", 7) + fid("sparse.bin", 8)
+    put(PART + 5, file_entry(4, len(sub), short_ad(len(sub), 6), extended=True))
+    put(PART + 6, sub)
+    put(PART + 7, file_entry(5, 3, b"abc", embedded=True))
+    put(PART + 8, file_entry(5, SECTOR + 10, short_ad(SECTOR, 9) + short_ad(10, 0, ext=1)))
+    put(PART + 9, b"s" * SECTOR)
+    path.write_bytes(bytes(img))
+    return str(path)
+def test_udf_tree(tmp_path):
+    with open_disc(build(tmp_path / "u.img")) as r:
+        assert isinstance(r, UdfReader)
+        assert r.volume_id == "UDFVOL"
+        assert {e.path: e.is_dir for e in r.walk()} == {
+            "hello.txt": False, "Dïr": True, "Dïr/note": False, "Dïr/sparse.bin": False,
+        }
+def test_udf_file_data(tmp_path):
+    with open_disc(build(tmp_path / "u.img"), udf=True) as r:
+        files = r.files()
+        assert r.read_file(files["hello.txt"]) == b"hello"
+        assert files["hello.txt"].lba == PART + 4
+        assert r.read_file(files["Dïr/note"]) == b"abc"
+        assert r.read_file(r.find("Dïr/sparse.bin")) == b"s" * SECTOR + bytes(10)
\ No newline at end of file